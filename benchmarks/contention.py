@@ -0,0 +1,98 @@
+"""Press-path throughput while GUI-like readers poll engine snapshots.
+
+Runs the engine flat out (interval 0) on the recording backend and a fake
+focus provider, then adds reader threads that call snapshot() every
+millisecond. With lock-free reads the orders/second figure should stay
+flat as readers are added.
+
+The engine's state lock is wrapped to count acquisitions while orders go
+out. The press path and snapshot() must not take it at all; if anything
+does, the run reports it and exits with status 1.
+
+    python benchmarks/contention.py [--seconds 1.0] [--readers 0,1,4,16]
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import Engine  # noqa: E402
+from input_backend import RecordingBackend  # noqa: E402
+from window_focus import FocusTracker, FakeFocusProvider  # noqa: E402
+
+
+class CountingLock:
+    """Stands in for Engine.lock and counts how often it is taken."""
+
+    def __init__(self, cond):
+        self._cond = cond
+        self.acquired = 0
+
+    def __enter__(self):
+        self.acquired += 1
+        return self._cond.__enter__()
+
+    def __exit__(self, *exc):
+        return self._cond.__exit__(*exc)
+
+    def __getattr__(self, name):
+        return getattr(self._cond, name)  # wait / notify_all for the scheduler and writers
+
+
+def measure(readers, seconds):
+    focus = FocusTracker(FakeFocusProvider(foreground=1)).start()
+    engine = Engine(RecordingBackend(), focus, interval=0.0)
+    lock = engine.lock = CountingLock(engine.lock)
+    engine.set_target(1)
+    engine.set_mode("coffee")
+
+    stop = threading.Event()
+    reads = [0] * readers
+
+    def reader(i):
+        while not stop.is_set():
+            engine.snapshot()
+            reads[i] += 1
+            time.sleep(0.001)
+
+    threads = [threading.Thread(target=reader, args=(i,), daemon=True) for i in range(readers)]
+    for t in threads:
+        t.start()
+
+    engine.start()
+    time.sleep(0.1)  # warm up
+    before, locked = sum(engine.totals().values()), lock.acquired
+    time.sleep(seconds)
+    after, locked = sum(engine.totals().values()), lock.acquired - locked
+    engine.pause()
+    stop.set()
+    for t in threads:
+        t.join()
+    return (after - before) / seconds, sum(reads) / (seconds + 0.1), locked
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=1.0)
+    parser.add_argument("--readers", default="0,1,4,16")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    locked_runs = 0
+    print(f"{'readers':>7}  {'orders/s':>10}  {'vs 0':>6}  {'reads/s':>9}  {'lock taken':>10}")
+    for n in (int(x) for x in args.readers.split(",")):
+        rate, read_rate, locked = measure(n, args.seconds)
+        baseline = baseline or rate
+        locked_runs += locked > 0
+        print(f"{n:>7}  {rate:>10.0f}  {rate / baseline:>6.2f}  {read_rate:>9.0f}  {locked:>10}")
+    if locked_runs:
+        print("⚠️ The press path or snapshot() took the engine lock")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,395 @@
+"""Engine benchmark suite: cadence error, wakeups, throughput, hotkey and control latency, startup.
+
+Cadence error and wakeups per hour come from simulation.py (virtual time,
+so an hour takes milliseconds and the numbers are deterministic). Real-time
+cadence error, throughput at interval 0 and hotkey-to-effect latency run
+the real scheduler thread against the recording backend; control latency
+is the round trip of one command over the local control channel. The
+fleet footprint is the memory and CPU of simulated fleet.py workers.
+Watchdog recovery hangs the input backend on purpose and times how long
+the engine takes to notice and to get orders going again. Startup is the
+wall time of a fresh interpreter running `main.py --help` and the import
+time of main (python -X importtime), so slow imports show up in --compare.
+
+Results are saved to benchmarks/results/<git revision>.json; pass
+--compare REV to print the change against an earlier run.
+
+    python benchmarks/suite.py [--seconds 1.0] [--compare abc1234] [--no-save]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import threading
+import subprocess
+from statistics import mean, median
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from control import ControlServer, ControlClient  # noqa: E402
+from engine import Engine  # noqa: E402
+from fleet import Fleet, WorkerSpec, RUNNING  # noqa: E402
+from input_backend import RecordingBackend  # noqa: E402
+from recipes import RecipeRegistry  # noqa: E402
+from scheduler import SystemClock, TIMING_MODES, DEFAULT_ADAPTIVE  # noqa: E402
+from simulation import Simulation  # noqa: E402
+from window_focus import FocusTracker, FakeFocusProvider  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+HOUR = 3600.0
+
+
+def spacing_errors(times, interval):
+    return [abs(b - a - interval) for a, b in zip(times, times[1:])]
+
+
+# ---------- Virtual time ----------
+def sim_cadence(interval=5.0):
+    """One target for an hour: order count and spacing error on virtual time."""
+    t0 = time.perf_counter()
+    sim = Simulation(interval=interval).add_targets("coffee").start().run(HOUR)
+    elapsed = time.perf_counter() - t0
+    errors = spacing_errors(sim.order_times(), interval)
+    return {
+        "orders": len(sim.order_times()),
+        "expected": int(HOUR / interval),
+        "max_error_s": max(errors),
+        "wakeups": sim.clock.wakeups,
+        "sim_seconds_per_hour": elapsed,
+    }
+
+
+def sim_wakeups():
+    """Scheduler wakeups per simulated hour in typical situations."""
+    scenarios = {
+        "stopped": lambda sim: sim.add_targets("coffee", [1]),
+        "paused": lambda sim: sim.add_targets("coffee", [1]).start().at(0.0, sim.engine.pause),
+        "running_5s": lambda sim: sim.add_targets("coffee", [1]).start(),
+        "unfocused": lambda sim: sim.add_targets("coffee", [1]).start().at(0.0, sim.focus_window, 2),
+        "switching_3x5s": lambda sim: sim.add_targets("coffee").start().at(0.0, sim.engine.set_switch_focus, True),
+    }
+    result = {}
+    for name, setup in scenarios.items():
+        windows = ("CPJ 1", "CPJ 2", "CPJ 3") if name.startswith("switching") else ("CPJ 1", "Other")
+        sim = Simulation(windows=windows, interval=5.0)
+        setup(sim)
+        sim.run(HOUR)
+        result[name] = sim.clock.wakeups
+    return result
+
+
+class SlowGame(RecordingBackend):
+    """Recording backend that only "accepts" orders spaced at least `capacity` apart."""
+
+    def __init__(self, clock, capacity):
+        super().__init__(clock)
+        self.capacity = capacity
+        self.report = None
+        self.accepted = []
+
+    def send(self, steps):
+        super().send(steps)
+        now = self.clock()
+        ok = not self.accepted or now - self.accepted[-1] >= self.capacity
+        if ok:
+            self.accepted.append(now)
+        self.report(1, ok)
+
+
+def sim_adaptive(capacity=1.2):
+    """Adaptive cadence against a game that keeps up with one order per `capacity` s."""
+    sim = Simulation(interval=DEFAULT_ADAPTIVE.ceiling, backend=lambda now: SlowGame(now, capacity))
+    sim.backend.report = sim.engine.report
+    sim.engine.set_adaptive(DEFAULT_ADAPTIVE)
+    sim.add_targets("coffee").start().run(HOUR)
+    start = HOUR - 600  # judge the last 10 minutes, after convergence
+    sent = [t for t in sim.order_times() if t >= start]
+    accepted = [t for t in sim.backend.accepted if t >= start]
+    return {
+        "capacity_s": capacity,
+        "mean_spacing_s": 600 / len(sent),
+        "accepted_share": len(accepted) / len(sent),
+        "accepted_vs_capacity": len(accepted) * capacity / 600,
+    }
+
+
+# ---------- Real time ----------
+def _real_engine(interval, timing="efficient"):
+    focus = FocusTracker(FakeFocusProvider(foreground=1)).start()
+    backend = RecordingBackend(time.perf_counter)
+    engine = Engine(backend, focus, interval=interval, clock=SystemClock(timing))
+    engine.set_target(1)
+    engine.set_mode("coffee")
+    return engine, backend
+
+
+def real_cadence(interval=0.02, orders=100, rounds=3):
+    """Spacing error and CPU use of the real scheduler thread per timing mode.
+
+    The modes take turns for `rounds` runs each, so a burst of load on the
+    machine hits all of them alike, and the gaps are pooled: with one run of
+    100 orders, p99 was just the single worst gap.
+    """
+    errors = {mode: [] for mode in TIMING_MODES}
+    cpu = dict.fromkeys(TIMING_MODES, 0.0)
+    for _ in range(rounds):
+        for mode in TIMING_MODES:
+            engine, backend = _real_engine(interval, mode)
+            cpu0 = time.process_time()
+            engine.start()
+            time.sleep(interval * (orders + 1))
+            engine.pause()
+            cpu[mode] += time.process_time() - cpu0
+            engine.clock.close()
+            errors[mode] += spacing_errors([ts for ts, _ in backend.sent], interval)
+    result = {}
+    for mode, errs in errors.items():
+        errs.sort()
+        result[mode] = {
+            "interval_s": interval,
+            "gaps": len(errs),
+            "median_error_s": median(errs),
+            "p95_error_s": errs[int(len(errs) * 0.95) - 1],
+            "p99_error_s": errs[int(len(errs) * 0.99) - 1],
+            "max_error_s": errs[-1],
+            "cpu_percent": cpu[mode] / (rounds * interval * (orders + 1)) * 100,
+        }
+    return result
+
+
+def throughput(seconds):
+    """Orders per second with interval 0."""
+    engine, backend = _real_engine(0.0)
+    engine.start()
+    time.sleep(0.1)  # warm up
+    before = len(backend.sent)
+    time.sleep(seconds)
+    after = len(backend.sent)
+    engine.pause()
+    return {"orders_per_s": (after - before) / seconds}
+
+
+def hotkey_latency(samples=100):
+    """Time from a hotkey callback (Delete = start) to the first key sent."""
+    engine, backend = _real_engine(0.0)
+    start = engine.commands.hotkey(engine.start)
+    latencies = []
+    for _ in range(samples):
+        engine.pause()
+        time.sleep(0.002)  # let an in-flight order finish
+        backend.clear()
+        t0 = time.perf_counter()
+        start()
+        while not backend.sent:
+            time.sleep(0)
+        latencies.append(backend.sent[0][0] - t0)
+    engine.pause()
+    engine.commands.stop()
+    latencies.sort()
+    return {
+        "median_s": median(latencies),
+        "p99_s": latencies[int(len(latencies) * 0.99) - 1],
+        "mean_s": mean(latencies),
+        "callback_us": engine.commands.hook_latency.total_ns / max(engine.commands.hook_latency.count, 1) / 1000,
+    }
+
+
+def control_latency(samples=1000):
+    """Round trip of one command (pause) over the control channel, and of a batch of 10."""
+    engine, _ = _real_engine(1.0)
+    server = ControlServer(engine).start()
+    client = ControlClient(server.address)
+    single, batch = [], []
+    for _ in range(samples):
+        t0 = time.perf_counter()
+        client.call("pause")
+        single.append(time.perf_counter() - t0)
+    for _ in range(samples // 10):
+        t0 = time.perf_counter()
+        client.batch([("status", {})] * 10)
+        batch.append(time.perf_counter() - t0)
+    client.close()
+    server.stop()
+    single.sort()
+    return {
+        "median_s": median(single),
+        "p99_s": single[int(len(single) * 0.99) - 1],
+        "batch10_median_s": median(batch),
+    }
+
+
+def fleet_footprint(workers=4, interval=0.05, seconds=2.0):
+    """Resident memory and CPU per simulated fleet worker, and the cost of reading the board."""
+    specs = [WorkerSpec(f"W{i}", "coffee", interval, None, False, True, False) for i in range(workers)]
+    fleet = Fleet(specs, RecipeRegistry.load().names()).start()
+    try:
+        deadline = time.monotonic() + 30.0
+        while not all(s.state == RUNNING for s in fleet.read()) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        before, t0 = fleet.read(), time.monotonic()
+        time.sleep(seconds)
+        after, elapsed = fleet.read(), time.monotonic() - t0
+        r0 = time.perf_counter()
+        for _ in range(1000):
+            fleet.read()
+        read_s = (time.perf_counter() - r0) / 1000
+    finally:
+        fleet.stop()
+    return {
+        "workers": workers,
+        "interval_s": interval,
+        "rss_mb_per_worker": mean(s.rss for s in after) / 2 ** 20,
+        "cpu_percent_per_worker": mean(a.cpu - b.cpu for a, b in zip(after, before)) / elapsed * 100,
+        "orders_per_s_per_worker": mean(a.orders - b.orders for a, b in zip(after, before)) / elapsed,
+        "read_fleet_s": read_s,
+    }
+
+
+class HangingBackend(RecordingBackend):
+    """Records like RecordingBackend, but blocks in send() on chosen order numbers."""
+
+    name = "hanging"
+
+    def __init__(self, clock, hang_at=()):
+        super().__init__(clock)
+        self.hang_at = set(hang_at)
+        self.calls = 0
+        self.hung = []  # clock time each hang began
+        self.release = threading.Event()
+
+    def send(self, steps):
+        self.calls += 1
+        if self.calls in self.hang_at:
+            self.hung.append(self.clock())
+            self.release.wait()
+        super().send(steps)
+
+
+def watchdog_recovery(budget=0.2, stalls=5, interval=0.02):
+    """Stall detection latency (beyond the budget) and time to the next order after a hung send."""
+    focus = FocusTracker(FakeFocusProvider(foreground=1)).start()
+    backend = HangingBackend(time.perf_counter, hang_at=range(10, 10 + 10 * stalls, 10))
+    engine = Engine(backend, focus, interval=interval, clock=SystemClock("balanced"), stall_budget=budget)
+    detected = []
+    engine.events.add_listener(lambda e: detected.append(time.perf_counter()) if e.kind == "stalled" else None)
+    engine.set_target(1)
+    engine.set_mode("coffee")
+    engine.start()
+    deadline = time.monotonic() + stalls * (budget + 1.0) + 2.0
+    while len(backend.hung) < stalls or len(detected) < stalls:
+        if time.monotonic() > deadline:
+            break
+        time.sleep(0.01)
+    time.sleep(interval * 5)
+    engine.pause()
+    time.sleep(interval * 2)
+    kept = sum(engine.totals().values()) == len(backend.sent)  # hung sends are not recorded yet
+    backend.release.set()
+    engine.events.close()
+    latency = [d - h - budget for h, d in zip(backend.hung, detected)]
+    sent = [ts for ts, _ in backend.sent]
+    recovery = [min(t for t in sent if t > d) - d for d in detected if any(t > d for t in sent)]
+    return {
+        "budget_s": budget,
+        "stalls": len(detected),
+        "detect_after_budget_median_s": median(latency) if latency else None,
+        "detect_after_budget_max_s": max(latency) if latency else None,
+        "recovery_median_s": median(recovery) if recovery else None,
+        "counts_match_orders": kept,
+    }
+
+
+def startup(runs=5):
+    """Cold start of the helper: `main.py --help` wall time and `import main` as -X importtime reports it."""
+    main_py = os.path.join(ROOT, "main.py")
+    wall, imports, modules = [], [], 0
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, main_py, "--help"], cwd=ROOT, capture_output=True, check=True)
+        wall.append(time.perf_counter() - t0)
+        err = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=ROOT,
+                             capture_output=True, text=True, check=True).stderr
+        lines = [line.split("|") for line in err.splitlines() if line.startswith("import time:")]
+        rows = [(int(cumulative), name.strip()) for _, cumulative, name in lines[1:]]  # [0] is the header
+        imports.append(next(us for us, name in rows if name == "main") / 1e6)
+        modules = len(rows)
+    return {
+        "help_wall_median_s": median(wall),
+        "import_main_median_s": median(imports),
+        "modules_imported": modules,
+    }
+
+
+# ---------- Results ----------
+def revision():
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], cwd=ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def flatten(results, prefix=""):
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(current, previous):
+    cur, prev = flatten(current), flatten(previous)
+    print(f"\n{'metric':<40}  {'before':>12}  {'now':>12}  {'change':>8}")
+    for key, now in cur.items():
+        before = prev.get(key)
+        if before is None:
+            continue
+        change = f"{(now - before) / before * 100:+.1f}%" if before else "—"
+        print(f"{key:<40}  {before:>12.6g}  {now:>12.6g}  {change:>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=1.0, help="duration of the throughput run")
+    parser.add_argument("--compare", metavar="REV", help="compare with benchmarks/results/REV.json")
+    parser.add_argument("--no-save", action="store_true", help="do not write a results file")
+    args = parser.parse_args(argv)
+
+    results = {
+        "revision": revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "sim_cadence": sim_cadence(),
+        "sim_wakeups_per_hour": sim_wakeups(),
+        "sim_adaptive": sim_adaptive(),
+        "real_cadence": real_cadence(),
+        "throughput": throughput(args.seconds),
+        "hotkey_latency": hotkey_latency(),
+        "control_latency": control_latency(),
+        "fleet_footprint": fleet_footprint(),
+        "watchdog_recovery": watchdog_recovery(),
+        "startup": startup(),
+    }
+    print(json.dumps(results, indent=2))
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{results['revision']}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Saved {os.path.relpath(path, ROOT)}")
+
+    if args.compare:
+        with open(os.path.join(RESULTS_DIR, f"{args.compare}.json"), "r", encoding="utf-8") as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import threading
+from queue import SimpleQueue
+from time import perf_counter_ns
+
+
+class LatencyStats:
+    """Running count / mean / max of a duration in nanoseconds."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def add(self, ns):
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def summary(self):
+        if not self.count:
+            return "no samples"
+        mean_us = self.total_ns / self.count / 1000
+        return f"{self.count} calls, avg {mean_us:.1f} µs, max {self.max_ns / 1000:.1f} µs"
+
+
+class CommandQueue:
+    """Moves hotkey work off the keyboard hook thread.
+
+    Callbacks built with hotkey() only append (fn, args) to a SimpleQueue
+    and return; a dispatcher thread runs the commands in order. The hook
+    never waits on engine locks, Tk or win32, so its latency stays flat no
+    matter how slow the UI is. `hook_latency` records how long each
+    callback took.
+    """
+
+    def __init__(self):
+        self._queue = SimpleQueue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.hook_latency = LatencyStats()
+
+    def post(self, fn, *args):
+        """Queue fn(*args) to run on the dispatcher thread."""
+        self._ensure_started()
+        self._queue.put((fn, args))
+
+    def hotkey(self, fn, *args):
+        """Return a zero-argument callback for keyboard.add_hotkey that queues fn(*args)."""
+        self._ensure_started()
+        put = self._queue.put
+        latency = self.hook_latency
+        item = (fn, args)
+
+        def callback():
+            t0 = perf_counter_ns()
+            put(item)
+            latency.add(perf_counter_ns() - t0)
+
+        return callback
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put((None, ()))
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            fn, args = self._queue.get()
+            if fn is None:
+                return
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"⚠️ Command {getattr(fn, '__name__', fn)} failed: {e}")
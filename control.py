@@ -0,0 +1,391 @@
+"""Local control channel for running helpers (scripts, fleets of clients).
+
+Every instance listens on its own Unix socket (named pipe on Windows),
+named after its process id, via multiprocessing.connection. Requests and
+replies are compact JSON messages::
+
+    -> {"id": 1, "cmd": "mode", "args": {"mode": "pizza"}}
+    <- {"id": 1, "ok": true, "result": true}
+    -> {"id": 2, "batch": [{"cmd": "mode", "args": {"mode": "coffee"}}, {"cmd": "start"}]}
+    <- {"id": 2, "ok": true, "results": [{"ok": true, "result": true}, {"ok": true, "result": null}]}
+    -> {"id": 3, "cmd": "subscribe", "args": {"kinds": ["order"]}}
+    <- {"id": 3, "ok": true, "result": null}, then {"event": "order", "ts": ..., "fields": {...}} per event
+
+Commands run directly on the connection's thread (the engine's controls
+are thread-safe), so a round trip costs a socket hop and a JSON parse.
+
+Command line::
+
+    python control.py list
+    python control.py [--pid PID ...] status | start | pause | mode coffee | interval 2.5
+    python control.py [--pid PID ...] watch [KIND ...]
+"""
+import os
+import sys
+import json
+import time
+import glob
+import tempfile
+import argparse
+import threading
+from queue import Queue, Empty, Full
+from multiprocessing.connection import Listener, Client
+
+PREFIX = "cpj-order-helper-"
+# Events a subscriber may fall behind by before newer ones are dropped
+SUBSCRIBER_BACKLOG = 4096
+
+
+def address_for(pid):
+    """This platform's control address for process `pid`."""
+    if sys.platform == "win32":
+        return rf"\\.\pipe\{PREFIX}{pid}"
+    return os.path.join(tempfile.gettempdir(), f"{PREFIX}{pid}.sock")
+
+
+def find_instances():
+    """{pid: address} of every helper listening on this machine."""
+    if sys.platform == "win32":
+        names = [rf"\\.\pipe\{n}" for n in os.listdir("\\\\.\\pipe\\") if n.startswith(PREFIX)]
+    else:
+        names = glob.glob(os.path.join(tempfile.gettempdir(), f"{PREFIX}*.sock"))
+    found = {}
+    for name in names:
+        pid = os.path.basename(name)[len(PREFIX):].split(".")[0]
+        if pid.isdigit():
+            found[int(pid)] = name
+    return dict(sorted(found.items()))
+
+
+def _dumps(msg):
+    return json.dumps(msg, separators=(",", ":"), default=str).encode("utf-8")
+
+
+# ======================= Server =======================
+class ControlServer:
+    """Serves the control protocol for one engine on `address` (default: per pid)."""
+
+    def __init__(self, engine, address=None):
+        self.engine = engine
+        self.address = address or address_for(os.getpid())
+        self.family = "AF_PIPE" if sys.platform == "win32" else "AF_UNIX"
+        self._listener = None
+        self._subscribers = ()  # [queue, kinds, dropped] per streaming connection; replaced, never mutated
+        self._sub_lock = threading.Lock()
+        self.commands = {
+            "ping": lambda: "pong",
+            "status": self.status,
+            "metrics": self.metrics,
+            "start": engine.start,
+            "pause": engine.pause,
+            "mode": lambda mode, hwnd=None: engine.set_mode(mode, hwnd),
+            "interval": self._set_interval,
+            "switch": lambda enabled: engine.set_switch_focus(bool(enabled)),
+            "timing": engine.set_timing,
+            "reset": engine.reset_counters,
+            "plan": self._set_plan,
+        }
+
+    def start(self):
+        if self.family == "AF_UNIX" and os.path.exists(self.address):
+            os.unlink(self.address)  # left over from a crashed process with the same pid
+        self._listener = Listener(self.address, self.family)
+        if self.family == "AF_UNIX":
+            os.chmod(self.address, 0o600)
+        self.engine.events.add_listener(self._on_event)
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        return self
+
+    def stop(self):
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.close()  # also removes the Unix socket file
+
+    # ---------- Commands ----------
+    def status(self):
+        snap = self.engine.snapshot()
+        plan = snap.plan
+        return {
+            "pid": os.getpid(),
+            "state": snap.state,
+            "switch_focus": snap.switch_focus,
+            "interval": snap.default_interval,
+            "totals": snap.totals,
+            "verified": snap.verified,
+            "targets": [
+                {"hwnd": t.hwnd, "title": self.engine.focus.title(t.hwnd), "mode": t.mode,
+                 "interval": t.interval, "effective": t.effective, "orders": sum(t.counts.values())}
+                for t in snap.targets
+            ],
+            "plan": plan._asdict() if plan else None,
+            "health": snap.health._asdict() if snap.health else None,
+        }
+
+    def metrics(self):
+        return self.engine.metrics.snapshot()
+
+    def _set_interval(self, seconds, hwnd=None):
+        from engine import MIN_INTERVAL
+        seconds = float(seconds)
+        if seconds < MIN_INTERVAL:
+            raise ValueError(f"interval must be at least {MIN_INTERVAL} s")
+        self.engine.set_interval(seconds, hwnd)
+
+    def _set_plan(self, text=None):
+        from plans import parse_plan, format_plan
+        if not text:
+            self.engine.set_plan(None)
+            return None
+        plan = parse_plan(text, modes=self.engine.recipes.names())
+        self.engine.set_plan(plan)
+        return format_plan(plan)
+
+    def call(self, request):
+        """Run one {"cmd", "args"} request; returns the reply without an id."""
+        if not isinstance(request, dict):
+            return {"ok": False, "error": "a request must be a JSON object"}
+        fn = self.commands.get(request.get("cmd"))
+        if fn is None:
+            return {"ok": False, "error": f"unknown command {request.get('cmd')!r}"}
+        try:
+            return {"ok": True, "result": fn(**(request.get("args") or {}))}
+        except (TypeError, ValueError) as e:
+            return {"ok": False, "error": str(e)}
+        except Exception as e:
+            return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+    # ---------- Connections ----------
+    def _accept_loop(self):
+        while self._listener is not None:
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                return  # closed by stop()
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        try:
+            while True:
+                msg = json.loads(conn.recv_bytes())
+                if not isinstance(msg, dict):
+                    conn.send_bytes(_dumps({"id": None, "ok": False, "error": "a request must be a JSON object"}))
+                    continue
+                if msg.get("cmd") == "subscribe":
+                    conn.send_bytes(_dumps({"id": msg.get("id"), "ok": True, "result": None}))
+                    args = msg.get("args")
+                    self._stream(conn, args.get("kinds") if isinstance(args, dict) else None)
+                    return
+                if "batch" in msg:
+                    batch = msg["batch"]
+                    if isinstance(batch, list):
+                        reply = {"ok": True, "results": [self.call(r) for r in batch]}
+                    else:
+                        reply = {"ok": False, "error": '"batch" must be a list'}
+                else:
+                    reply = self.call(msg)
+                reply["id"] = msg.get("id")
+                conn.send_bytes(_dumps(reply))
+        except (EOFError, OSError, ValueError):
+            pass  # client went away or sent garbage
+        finally:
+            conn.close()
+
+    def _stream(self, conn, kinds):
+        queue = Queue(SUBSCRIBER_BACKLOG)
+        entry = [queue, frozenset(kinds) if kinds else None, 0]  # queue, kinds, dropped
+        with self._sub_lock:
+            self._subscribers = self._subscribers + (entry,)
+        try:
+            while True:
+                try:
+                    event = queue.get(timeout=1.0)
+                except Empty:
+                    if conn.poll():
+                        return  # subscribers only listen; data here means the client hung up
+                    continue
+                msg = {"event": event.kind, "ts": event.ts, "fields": event.fields}
+                if entry[2]:
+                    msg["dropped"], entry[2] = entry[2], 0
+                conn.send_bytes(_dumps(msg))
+        finally:
+            with self._sub_lock:
+                self._subscribers = tuple(e for e in self._subscribers if e is not entry)
+
+    def _on_event(self, event):
+        # On the event writer thread: hand off, never block on a slow client
+        for entry in self._subscribers:
+            if entry[1] is None or event.kind in entry[1]:
+                try:
+                    entry[0].put_nowait(event)
+                except Full:
+                    entry[2] += 1
+
+
+# ======================= Client =======================
+class ControlClient:
+    """One connection to a running helper."""
+
+    def __init__(self, address):
+        self.address = address
+        self.conn = Client(address, "AF_PIPE" if sys.platform == "win32" else "AF_UNIX")
+        self._next_id = 0
+
+    def send(self, cmd, **args):
+        """Send a request without waiting; pair with receive() to pipeline many instances."""
+        self._next_id += 1
+        msg = {"id": self._next_id, "cmd": cmd}
+        if args:
+            msg["args"] = args
+        self.conn.send_bytes(_dumps(msg))
+
+    def send_batch(self, requests):
+        """Send [(cmd, args), ...] as one message; the reply carries `results` in order."""
+        self._next_id += 1
+        self.conn.send_bytes(_dumps({"id": self._next_id, "batch": [{"cmd": c, "args": a} for c, a in requests]}))
+
+    def receive(self):
+        return json.loads(self.conn.recv_bytes())
+
+    def call(self, cmd, **args):
+        """Run one command; returns its result or raises RuntimeError with the server's message."""
+        self.send(cmd, **args)
+        reply = self.receive()
+        if not reply["ok"]:
+            raise RuntimeError(reply["error"])
+        return reply["result"]
+
+    def batch(self, requests):
+        self.send_batch(requests)
+        return self.receive()["results"]
+
+    def events(self, kinds=None):
+        """Subscribe and yield event messages; the connection is used up by this."""
+        self.send("subscribe", **({"kinds": list(kinds)} if kinds else {}))
+        self.receive()
+        while True:
+            yield self.receive()
+
+    def close(self):
+        self.conn.close()
+
+
+# ======================= Command line =======================
+def _connect(pids):
+    instances = find_instances()
+    if pids:
+        missing = [p for p in pids if p not in instances]
+        if missing:
+            print(f"⚠️ No helper with pid {', '.join(map(str, missing))}")
+        instances = {p: a for p, a in instances.items() if p in pids}
+    clients = {}
+    for pid, address in instances.items():
+        try:
+            clients[pid] = ControlClient(address)
+        except ConnectionRefusedError:
+            os.unlink(address)  # stale socket of a helper that did not exit cleanly
+        except OSError:
+            pass
+    return clients
+
+
+def _parse_command(words, parser):
+    cmd, rest = words[0], words[1:]
+    if cmd in ("mode", "interval", "switch", "timing") and len(rest) != 1:
+        parser.error(f"{cmd} takes exactly one argument")
+    if cmd == "mode":
+        return cmd, {"mode": rest[0]}
+    if cmd == "interval":
+        try:
+            return cmd, {"seconds": float(rest[0])}
+        except ValueError:
+            parser.error(f"interval: {rest[0]!r} is not a number of seconds")
+    if cmd == "switch":
+        if rest[0].lower() not in ("on", "off", "1", "0", "true", "false"):
+            parser.error(f"switch takes on or off, not {rest[0]!r}")
+        return cmd, {"enabled": rest[0].lower() in ("on", "1", "true")}
+    if cmd == "timing":
+        return cmd, {"mode": rest[0]}
+    if cmd == "plan":
+        return cmd, {"text": " ".join(rest)} if rest else {}
+    return cmd, {}
+
+
+def _print_status(pid, status):
+    totals = " ".join(f"{m}={n}" for m, n in status["totals"].items())
+    print(f"{pid:>7}  {status['state']:<8}  {totals}  targets={len(status['targets'])}")
+    plan = status.get("plan")
+    if plan:
+        quota = f"/{plan['orders']}" if plan["orders"] is not None else ""
+        print(f"{'':>7}  plan step {plan['step'] + 1}/{plan['steps']}: {plan['done']}{quota}")
+
+
+def _watch(clients, kinds):
+    from events import Event, format_event
+
+    def pump(pid, client):
+        for msg in client.events(kinds):
+            line = format_event(Event(msg["ts"], msg["event"], msg["fields"]))
+            print(f"[{pid}] {line}" + (f"  ({msg['dropped']} dropped)" if msg.get("dropped") else ""))
+
+    threads = [threading.Thread(target=pump, args=item, daemon=True) for item in clients.items()]
+    for t in threads:
+        t.start()
+    try:
+        while any(t.is_alive() for t in threads):
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drive and monitor running auto-order helpers.")
+    parser.add_argument("--pid", type=int, action="append", default=[], help="only this instance (repeatable)")
+    parser.add_argument("--json", action="store_true", help="print raw replies")
+    parser.add_argument("command", nargs="+",
+                        help="list | status | metrics | start | pause | reset | mode NAME | interval SECONDS"
+                             " | switch on|off | timing MODE | plan [TEXT] | watch [KIND ...]"
+                             " (join commands with ';' to batch them)")
+    args = parser.parse_args(argv)
+
+    if args.command[0] == "list":
+        for pid, address in find_instances().items():
+            print(f"{pid:>7}  {address}")
+        return 0
+    words = " ".join(args.command).split(";")
+    requests = [_parse_command(w.split(), parser) for w in words if w.strip()]  # bad arguments exit here
+    clients = _connect(args.pid)
+    if not clients:
+        print("⚠️ No running helpers found")
+        return 1
+    if args.command[0] == "watch":
+        _watch(clients, args.command[1:])
+        return 0
+
+    # Pipeline: send to every instance first, then collect the replies
+    t0 = time.perf_counter()
+    for client in clients.values():
+        client.send_batch(requests)
+    replies = {pid: client.receive() for pid, client in clients.items()}
+    elapsed = time.perf_counter() - t0
+    failed = 0
+    for pid, reply in replies.items():
+        for (cmd, _), result in zip(requests, reply["results"]):
+            if args.json:
+                print(json.dumps({"pid": pid, "cmd": cmd, **result}))
+            elif not result["ok"]:
+                failed += 1
+                print(f"{pid:>7}  ⚠️ {cmd}: {result['error']}")
+            elif cmd == "status":
+                _print_status(pid, result["result"])
+            elif cmd == "metrics":
+                print(f"{pid:>7}  {result['result']['summary']}")
+            else:
+                print(f"{pid:>7}  ✅ {cmd}")
+    print(f"{len(clients)} instance(s), {len(requests)} command(s) in {elapsed * 1000:.2f} ms")
+    for client in clients.values():
+        client.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
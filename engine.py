@@ -0,0 +1,875 @@
+"""Headless order engine shared by the CLI (main.py) and the Tk GUI (interactive.py).
+
+Importing this module is cheap: the input backend (pyautogui / SendInput)
+is only created when the first order is sent, and nothing here touches
+tkinter or the keyboard hook.
+
+Typical use::
+
+    engine = create_engine(interval=1.0)
+    engine.set_target(hwnd)      # add a game window (or re-select it)
+    engine.set_mode("coffee")    # recipe name from recipes.json
+    engine.start()               # start / resume
+    engine.pause()
+
+Every control method is thread-safe and wakes the scheduler thread.
+Reads (snapshot(), totals(), the state properties) never take a lock.
+Orders, skips and control changes are reported on `engine.events`
+(see events.py); the worker never prints or writes files itself.
+Timing histograms live in `engine.metrics` (see metrics.py). All timing
+goes through `engine.clock`, so simulation.py can run the same loop on
+virtual time. A run plan (see plans.py) switches modes and stops the
+engine on quotas and stop times. A Watchdog restarts the scheduler thread
+when it dies or hangs in a focus switch or key emission; counts survive.
+"""
+import threading
+from queue import SimpleQueue
+from collections import namedtuple
+
+from commands import CommandQueue
+from events import EventLog, ConsoleSink, JsonlFileSink
+from metrics import Metrics
+from scheduler import Cadence, SystemClock, SimulationDone, DEFAULT_TIMING, AimdController
+from recipes import RecipeRegistry
+from plans import format_plan
+
+DEFAULT_INTERVAL = 5.0
+# Shortest cadence the front ends accept; below ~0.1 s use the "precise" timing mode
+MIN_INTERVAL = 0.02
+# Time a client needs after being brought to the foreground before it takes keys
+FOCUS_SETTLE_SECONDS = 0.05
+# Seconds a focus switch or an order's keys may overrun their expected time
+# before the watchdog declares the scheduler stalled and restarts it
+STALL_BUDGET = 2.0
+# Restarts in a row without an order in between before the watchdog pauses the engine
+MAX_IDLE_RESTARTS = 3
+# Orders in a row the input backend may fail to send before the engine pauses
+MAX_SEND_FAILURES = 5
+# Longest wait for Engine.input_lock before an order is skipped
+INPUT_LOCK_TIMEOUT = 10.0
+
+# Engine configuration; replaced as a whole on every change, never mutated.
+# `count_base` holds the counter values at the last reset, per (hwnd, mode);
+# `adaptive` is a scheduler.AdaptiveConfig while the cadence tunes itself;
+# `plan` is an ActivePlan while a run plan is loaded.
+EngineState = namedtuple(
+    "EngineState",
+    ["version", "running", "paused", "switch_focus", "default_interval", "selected", "targets", "count_base",
+     "adaptive", "plan"],
+)
+# One game client window: its recipe (None until a mode is picked) and cadence
+Target = namedtuple("Target", ["hwnd", "recipe", "interval"])
+# The current plan step turned into fire times when it began: `plan` is the
+# plans.RunPlan, `base` the orders sent at that point; the step ends once
+# _orders_sent() reaches `last` (quota) or the clock reaches `deadline`
+# (Unix time `ends`). `interval` overrides every cadence in "over" steps.
+ActivePlan = namedtuple("ActivePlan", ["plan", "base", "last", "deadline", "ends", "interval"])
+
+# Read-only views handed to front ends; `version` grows on every state change or order.
+# `verified` is (confirmed, unconfirmed) when screen checks are on, else None.
+EngineSnapshot = namedtuple(
+    "EngineSnapshot",
+    ["version", "state", "selected", "switch_focus", "default_interval", "targets", "totals", "verified", "plan",
+     "health"],
+)
+# `effective` is the interval actually in use (differs from `interval` in adaptive mode)
+TargetView = namedtuple("TargetView", ["hwnd", "mode", "interval", "counts", "effective"])
+# Run plan progress: step index of `steps`, orders done of the step's quota `orders`
+# (None = no quota), and the Unix time the step ends at the latest (or None)
+PlanView = namedtuple("PlanView", ["step", "steps", "mode", "done", "orders", "ends"])
+# Scheduler restarts so far and the last one's cause: the `phase` it hung in
+# ("focus", "keys" or "crashed"), for how many `seconds`, at Unix time `at`;
+# `halted` once the watchdog paused the engine after MAX_IDLE_RESTARTS (until start())
+HealthView = namedtuple("HealthView", ["stalls", "phase", "seconds", "at", "halted"])
+
+
+class CounterShard:
+    """Order counters written by exactly one producer thread.
+
+    The owner increments without locking; readers take a dict.copy()
+    (atomic under the GIL) and sum the shards.
+    """
+
+    __slots__ = ("counts", "orders")
+
+    def __init__(self):
+        self.counts = {}  # (hwnd, mode) -> orders sent by this producer
+        self.orders = 0
+
+    def add(self, key):
+        n = self.counts.get(key, 0) + 1
+        self.counts[key] = n
+        self.orders += 1
+        return n
+
+
+class Heartbeat:
+    """What one scheduler thread is doing, for the watchdog.
+
+    `busy` is (phase, started, deadline) on the engine clock while the
+    thread is inside a call that can hang (switching focus, sending keys),
+    else None. Only the owning thread writes it, as one tuple.
+    """
+
+    __slots__ = ("generation", "busy")
+
+    def __init__(self, generation):
+        self.generation = generation
+        self.busy = None
+
+
+class Watchdog:
+    """Calls engine.check_worker() every `period` seconds on a daemon thread."""
+
+    def __init__(self, engine, period):
+        self.engine = engine
+        self.period = period
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="engine-watchdog", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.period):
+            self.engine.check_worker()
+
+
+class Engine:
+    """Drives any number of target windows from one scheduler thread.
+
+    Configuration lives in an immutable EngineState swapped atomically by
+    the (rare) writers under `lock`, which is also the Condition the
+    scheduler sleeps on. Order counters live in per-producer CounterShards,
+    so the press path never waits on the GUI, the hotkey dispatcher or
+    readers. With `switch_focus` off, only the target in the foreground
+    gets orders; with it on, the scheduler brings each due target to the
+    foreground in turn, interleaving the clients.
+
+    The scheduler thread reports a Heartbeat around calls that can hang.
+    If one overruns its deadline by `stall_budget` seconds, or the thread
+    dies, the watchdog starts a fresh thread (a new generation with its
+    own counter shard; the old thread exits if it ever returns).
+    `stall_budget` None turns the watchdog off. `input_lock` (any lock
+    with acquire(block, timeout), e.g. a multiprocessing.Lock) is held
+    around each focus switch and key send, for engines in other processes.
+    """
+
+    def __init__(self, backend, focus, recipes=None, interval=DEFAULT_INTERVAL, events=None, metrics=None,
+                 clock=None, verifier=None, stats=None, stall_budget=STALL_BUDGET, input_lock=None):
+        # An InputBackend, or a backend name / None to create one on the first order
+        if backend is None or isinstance(backend, str):
+            self.backend_name, self._backend = backend, None
+            self._owns_backend = True  # recreated after a stall
+        else:
+            self.backend_name, self._backend = backend.name, backend
+            self._owns_backend = False
+        self.focus = focus
+        self.recipes = recipes if recipes is not None else RecipeRegistry()
+        self.lock = threading.Condition()  # writers + scheduler sleep
+        self._changes = threading.Condition()  # snapshot watchers sleep here
+        self.state = EngineState(0, False, False, False, float(interval), None, (), {}, None, None)
+        self._focus_seq = 0  # bumped on focus events so a parked scheduler re-checks
+        self._shards = ()
+        self._thread = None
+        self._generation = 0  # bumped when the watchdog replaces the scheduler thread
+        self._heartbeat = None  # Heartbeat of the current scheduler thread
+        self.stall_budget = stall_budget
+        self.input_lock = input_lock
+        self.watchdog = None
+        self._health = None  # HealthView after the first restart
+        self._recovering = None  # clock time of the last restart, until the new thread runs
+        self._idle_restarts = 0  # restarts in a row with no order sent in between
+        self._orders_at_restart = 0
+        self.commands = CommandQueue()  # hotkey work is queued here, off the hook thread
+        self.events = events if events is not None else EventLog()
+        self.metrics = metrics if metrics is not None else Metrics(enabled=False)
+        self.clock = clock if clock is not None else SystemClock()
+        self.verifier = verifier  # verify.OrderVerifier, or None to send blind
+        self.stats = stats  # stats.StatsStore fed from the event stream, or None
+        if stats is not None:
+            self.events.add_sink(stats)
+        self._feedback = SimpleQueue()  # (hwnd, ok) for the adaptive controllers
+        self._effective = {}  # hwnd -> interval in use, written by the scheduler thread
+        if verifier is not None:
+            verifier.add_listener(lambda hwnd, _mode, ok: self.report(hwnd, ok))
+        self._last_focus = focus.foreground
+        focus.add_listener(self._on_focus_change)
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            from input_backend import create_backend
+            self._backend = create_backend(self.backend_name)
+        return self._backend
+
+    # ---------- State (lock-free reads) ----------
+    @property
+    def running(self):
+        return self.state.running
+
+    @property
+    def paused(self):
+        return self.state.paused
+
+    @property
+    def switch_focus(self):
+        return self.state.switch_focus
+
+    @property
+    def default_interval(self):
+        return self.state.default_interval
+
+    @property
+    def selected(self):
+        return self.state.selected
+
+    @property
+    def targets(self):
+        """hwnd -> Target, in display order."""
+        return {t.hwnd: t for t in self.state.targets}
+
+    def _update(self, **changes):
+        # Caller holds self.lock: publish a new state, then wake everyone
+        st = self.state
+        self.state = st._replace(version=st.version + 1, **changes)
+        self.lock.notify_all()
+        self._signal_change()
+
+    def _signal_change(self):
+        with self._changes:
+            self._changes.notify_all()
+
+    @staticmethod
+    def _find(st, hwnd):
+        for t in st.targets:
+            if t.hwnd == hwnd:
+                return t
+        return None
+
+    # ---------- Targets ----------
+    def set_target(self, hwnd):
+        """Add a window as a target (or re-select it); returns its Target."""
+        if not hwnd:
+            return None
+        with self.lock:
+            st = self.state
+            target = self._find(st, hwnd)
+            if target is not None:
+                self._update(selected=hwnd)
+                return target
+            target = Target(hwnd, self._plan_recipe(st), st.default_interval)
+            # A window that comes back starts counting from zero again
+            base = dict(st.count_base)
+            for key, n in self._aggregate().items():
+                if key[0] == hwnd:
+                    base[key] = n
+            self._update(selected=hwnd, targets=st.targets + (target,), count_base=base)
+        self.events.emit("target_added", hwnd=hwnd, title=self.focus.title(hwnd))
+        return target
+
+    def remove_target(self, hwnd):
+        with self.lock:
+            st = self.state
+            targets = tuple(t for t in st.targets if t.hwnd != hwnd)
+            selected = st.selected
+            if selected == hwnd:
+                selected = targets[-1].hwnd if targets else None
+            self._update(targets=targets, selected=selected)
+        self.events.emit("target_removed", hwnd=hwnd)
+
+    def select(self, hwnd):
+        with self.lock:
+            if self._find(self.state, hwnd) is not None:
+                self._update(selected=hwnd)
+
+    # ---------- Counters ----------
+    def _new_shard(self):
+        shard = CounterShard()
+        with self.lock:
+            self._shards = self._shards + (shard,)
+        return shard
+
+    def _aggregate(self):
+        """Raw (hwnd, mode) -> count summed over every producer shard."""
+        total = {}
+        for shard in self._shards:
+            for key, n in shard.counts.copy().items():
+                total[key] = total.get(key, 0) + n
+        return total
+
+    def _orders_sent(self):
+        return sum(shard.orders for shard in self._shards)
+
+    # ---------- Snapshots ----------
+    def snapshot(self):
+        """Consistent EngineSnapshot of everything a front end displays (no locking)."""
+        st = self.state
+        version = st.version + self._orders_sent()
+        raw = self._aggregate()
+        base = st.count_base
+        names = self.recipes.names()
+        totals = {m: 0 for m in names}
+        views = []
+        for t in st.targets:
+            counts = {}
+            for m in names:
+                key = (t.hwnd, m)
+                n = raw.get(key, 0) - base.get(key, 0)
+                counts[m] = n
+                totals[m] += n
+            if st.plan is not None and st.plan.interval is not None:
+                effective = st.plan.interval
+            elif st.adaptive:
+                effective = self._effective.get(t.hwnd, t.interval)
+            else:
+                effective = t.interval
+            views.append(TargetView(t.hwnd, t.recipe.name if t.recipe else None, t.interval, counts, effective))
+        return EngineSnapshot(
+            version, self._state_name(st), st.selected, st.switch_focus,
+            st.default_interval, tuple(views), totals,
+            self.verifier.counts() if self.verifier is not None else None,
+            self._plan_view(st.plan),
+            self._health,
+        )
+
+    @property
+    def version(self):
+        return self.state.version + self._orders_sent()
+
+    def wait_for_change(self, version, timeout=None):
+        """Block until `version` is out of date (or timeout); returns the current version."""
+        with self._changes:
+            self._changes.wait_for(lambda: self.version != version, timeout)
+        return self.version
+
+    # ---------- Controls ----------
+    def set_mode(self, mode, hwnd=None):
+        """Set the recipe of one target (default: the selected one)."""
+        if mode not in self.recipes:
+            raise ValueError(f"Unknown mode {mode!r}")
+        recipe = self.recipes[mode]
+        with self.lock:
+            st = self.state
+            target = self._find(st, st.selected if hwnd is None else hwnd)
+            if target is None:
+                return False
+            self._update(targets=tuple(t._replace(recipe=recipe) if t is target else t for t in st.targets))
+        self.events.emit("mode_changed", hwnd=target.hwnd, mode=mode)
+        return True
+
+    def add_recipe(self, recipe):
+        """Register a recipe (or replace the one with its name); targets using it pick up the new one."""
+        with self.lock:
+            self.recipes.add(recipe)
+            st = self.state
+            self._update(targets=tuple(
+                t._replace(recipe=recipe) if t.recipe is not None and t.recipe.name == recipe.name else t
+                for t in st.targets
+            ))
+        self.events.emit("recipe_added", mode=recipe.name, keys=recipe.keys_text)
+
+    def mode_of(self, hwnd=None):
+        st = self.state
+        target = self._find(st, st.selected if hwnd is None else hwnd)
+        return target.recipe.name if target and target.recipe else None
+
+    def set_interval(self, seconds, hwnd=None):
+        """Set one target's cadence, or every target's (and the default) if hwnd is None."""
+        seconds = float(seconds)
+        with self.lock:
+            st = self.state
+            if hwnd is None:
+                targets = tuple(t._replace(interval=seconds) for t in st.targets)
+                self._update(default_interval=seconds, targets=targets)
+            else:
+                targets = tuple(t._replace(interval=seconds) if t.hwnd == hwnd else t for t in st.targets)
+                self._update(targets=targets)
+        self.events.emit("interval_changed", hwnd=hwnd, interval=seconds)
+
+    @property
+    def timing(self):
+        return self.clock.mode
+
+    def set_timing(self, mode):
+        """Pick a timing mode from scheduler.TIMING_MODES (CPU use vs. cadence accuracy)."""
+        with self.lock:
+            self.clock.set_mode(mode)
+            self.lock.notify_all()  # re-plan the current wait with the new spin window
+        self.events.emit("timing_changed", mode=mode)
+
+    @property
+    def adaptive(self):
+        return self.state.adaptive
+
+    def set_adaptive(self, config):
+        """Tune each target's interval from feedback (a scheduler.AdaptiveConfig), or None for fixed cadences."""
+        with self.lock:
+            self._update(adaptive=config)
+        self.events.emit("adaptive", enabled=config is not None,
+                         **({"floor": config.floor, "ceiling": config.ceiling} if config else {}))
+
+    def report(self, hwnd, ok):
+        """Feedback for the adaptive cadence: an order to `hwnd` did (not) go through."""
+        self._feedback.put((hwnd, ok))
+
+    # ---------- Run plan ----------
+    @property
+    def plan(self):
+        """The loaded plans.RunPlan with its current progress (for saving), or None."""
+        active = self.state.plan
+        if active is None:
+            return None
+        return active.plan._replace(done=active.plan.done + self._orders_sent() - active.base)
+
+    def set_plan(self, plan):
+        """Load a plans.RunPlan, resuming at its step and progress; None drops the plan.
+
+        The current step's mode is applied to every target right away; the
+        engine stops by itself after the last step.
+        """
+        if plan is not None:
+            for step in plan.steps:
+                if step.mode is not None and step.mode not in self.recipes:
+                    raise ValueError(f"Unknown mode {step.mode!r}")
+        with self.lock:
+            if plan is None:
+                self._update(plan=None)
+            else:
+                self._update(**self._plan_changes(self.state, plan, apply_mode=True))
+        if plan is None:
+            self.events.emit("plan_cleared")
+        else:
+            self.events.emit("plan_started", step=plan.step + 1, steps=len(plan.steps), plan=format_plan(plan))
+
+    def _plan_recipe(self, st):
+        active = st.plan
+        if active is None:
+            return None
+        mode = active.plan.steps[active.plan.step].mode
+        return self.recipes[mode] if mode is not None else None
+
+    def _plan_changes(self, st, plan, apply_mode=False):
+        # Caller holds self.lock: turn the plan's current step into fire times
+        step = plan.steps[plan.step]
+        wall, now = self.clock.wall(), self.clock.now()
+        if plan.started is None:
+            plan = plan._replace(started=wall)
+        changes = {}
+        targets = st.targets
+        if apply_mode and step.mode is not None:
+            recipe = self.recipes[step.mode]
+            targets = changes["targets"] = tuple(t._replace(recipe=recipe) for t in targets)
+        ends = step.until
+        if step.spread is not None:
+            window_end = plan.started + step.spread
+            ends = window_end if ends is None else min(ends, window_end)
+        base = self._orders_sent()
+        left = None if step.orders is None else max(step.orders - plan.done, 0)
+        interval = None
+        if step.spread is not None:
+            # Every active target shares the remaining orders over the remaining window
+            lanes = sum(1 for t in targets if t.recipe is not None) if st.switch_focus else 1
+            interval = max(ends - wall, 0.0) * max(lanes, 1) / max(left, 1)
+        changes["plan"] = ActivePlan(
+            plan, base, None if left is None else base + left,
+            None if ends is None else now + (ends - wall), ends, interval,
+        )
+        return changes
+
+    def _plan_view(self, active):
+        if active is None:
+            return None
+        plan = active.plan
+        step = plan.steps[plan.step]
+        return PlanView(plan.step, len(plan.steps), step.mode, plan.done + self._orders_sent() - active.base,
+                        step.orders, active.ends)
+
+    def _advance_plan(self, active, reason):
+        """Move on from the step `active` describes (scheduler thread); stop after the last one."""
+        with self.lock:
+            st = self.state
+            if st.plan is not active:
+                return  # replaced meanwhile
+            plan = active.plan
+            if plan.step + 1 >= len(plan.steps):
+                self._update(plan=None, running=False, paused=False)
+                plan = None
+            else:
+                plan = plan._replace(step=plan.step + 1, done=0, started=None)
+                self._update(**self._plan_changes(st, plan, apply_mode=True))
+        if plan is None:
+            self.events.emit("plan_done", reason=reason)
+        else:
+            self.events.emit("plan_step", step=plan.step + 1, steps=len(plan.steps),
+                             mode=plan.steps[plan.step].mode, reason=reason)
+
+    def set_switch_focus(self, enabled):
+        with self.lock:
+            self._update(switch_focus=bool(enabled))
+        self.events.emit("switch_focus", enabled=bool(enabled))
+
+    def start(self):
+        """Start or resume; the scheduler thread is created on first use."""
+        with self.lock:
+            if self._thread is None and self.clock.threaded:
+                self._spawn_worker()
+                if self.stall_budget is not None:
+                    self.watchdog = Watchdog(self, max(self.stall_budget / 4, 0.05)).start()
+            st = self.state
+            resumed = st.running
+            changes = {}
+            if st.plan is not None:
+                # Re-plan the step from now (spread windows, lanes) with the progress so far
+                changes = self._plan_changes(st, self.plan)
+            if self._health is not None and self._health.halted:
+                self._health = self._health._replace(halted=False)
+                self._idle_restarts = 0
+            self._update(running=True, paused=False, **changes)
+        self.events.emit("resumed" if resumed else "started")
+
+    def pause(self):
+        with self.lock:
+            self._update(paused=True)
+        self.events.emit("paused")
+
+    def reset_counters(self):
+        with self.lock:
+            if self.verifier is not None:
+                self.verifier.reset()
+            self._update(count_base=self._aggregate())
+        self.events.emit("counters_reset")
+
+    def totals(self):
+        """Order counts per mode summed over all targets."""
+        return self.snapshot().totals
+
+    def state_name(self):
+        return self._state_name(self.state)
+
+    @staticmethod
+    def _state_name(st):
+        if not st.running:
+            return "Stopped"
+        return "Paused" if st.paused else "Running"
+
+    # ---------- Scheduler ----------
+    def _on_focus_change(self, hwnd):
+        # Wake the scheduler so targets park or resume as they lose/gain focus
+        with self.lock:
+            self._focus_seq += 1
+            self.lock.notify_all()
+        st = self.state
+        lost, self._last_focus = self._last_focus, hwnd
+        if lost is None or lost == hwnd or st.switch_focus or not st.running or st.paused:
+            return
+        target = self._find(st, lost)
+        if target is not None and target.recipe is not None:
+            self.metrics.inc("focus_lost")
+            self.events.emit("waiting_focus", hwnd=lost, title=self.focus.title(lost))
+
+    def _next_due(self, st, cadences, controllers):
+        """(target, cadence, seconds until due) for the earliest eligible target."""
+        if not st.running or st.paused:
+            return None, None, None
+        spread = st.plan.interval if st.plan is not None else None
+        best, best_cadence, best_delay = None, None, None
+        for t in st.targets:
+            if t.recipe is None:
+                continue
+            if not st.switch_focus and not self.focus.is_focused(t.hwnd):
+                continue
+            interval = t.interval
+            if spread is not None:
+                interval = spread
+            elif st.adaptive is not None:
+                ctl = controllers.get(t.hwnd)
+                if ctl is None:
+                    ctl = controllers[t.hwnd] = AimdController(st.adaptive, t.interval)
+                elif ctl.config is not st.adaptive:
+                    ctl.reconfigure(st.adaptive)
+                interval = ctl.interval
+                if self._effective.get(t.hwnd) != interval:
+                    self._effective[t.hwnd] = interval
+            cadence = cadences.get(t.hwnd)
+            if cadence is None:
+                cadence = cadences[t.hwnd] = Cadence(interval, self.clock.now)
+            elif cadence.interval != interval:
+                cadence.set_interval(interval)
+            delay = cadence.due_in()
+            if best is None or delay < best_delay:
+                best, best_cadence, best_delay = t, cadence, delay
+        return best, best_cadence, best_delay
+
+    def _spawn_worker(self):
+        # Caller holds self.lock
+        beat = self._heartbeat = Heartbeat(self._generation)
+        self._thread = threading.Thread(target=self.run, args=(beat,), name=f"engine-{beat.generation}",
+                                        daemon=True)
+        self._thread.start()
+
+    def run(self, beat=None):
+        """The scheduler loop; start() runs it on a daemon thread.
+
+        Simulations with a non-threaded clock call it directly; it returns
+        when the clock raises SimulationDone. On a threaded clock an
+        exception is reported as an "error" event and the watchdog starts
+        a new thread.
+        """
+        if beat is None:
+            beat = self._heartbeat = Heartbeat(self._generation)
+        try:
+            self._run(beat)
+        except SimulationDone:
+            pass
+        except Exception as e:
+            if not self.clock.threaded:
+                raise
+            self.events.emit("error", message=f"Scheduler failed: {e!r}")
+
+    def check_worker(self):
+        """Restart the scheduler thread if it died or overran a deadline; returns the cause or None."""
+        thread, beat = self._thread, self._heartbeat
+        if thread is None or beat is None:
+            return None
+        now = self.clock.now()
+        busy = beat.busy
+        if busy is not None and now > busy[2]:
+            phase, seconds = busy[0], now - busy[1]
+        elif not thread.is_alive():
+            phase, seconds = "crashed", 0.0
+        else:
+            return None
+        self.events.emit("stalled", phase=phase, seconds=round(seconds, 3), generation=beat.generation)
+        with self.lock:
+            if self._heartbeat is not beat:
+                return None  # replaced meanwhile
+            sent = self._orders_sent()
+            self._idle_restarts = 1 if sent != self._orders_at_restart else self._idle_restarts + 1
+            self._orders_at_restart = sent
+            # Restarting again and again without getting an order out only hides the fault
+            halted = self._idle_restarts >= MAX_IDLE_RESTARTS
+            self._generation += 1
+            self._health = HealthView((self._health.stalls if self._health else 0) + 1, phase, seconds,
+                                      self.clock.wall(), halted)
+            if self._owns_backend:
+                self._backend = None  # a hung input library gets a fresh backend on the next order
+            self._recovering = now
+            self._spawn_worker()
+            if halted:
+                self._update(paused=True)
+            else:
+                self._update()
+        if halted:
+            self.events.emit("error", message=f"Scheduler restarted {self._idle_restarts} times without sending"
+                                              " an order; paused (check the input backend, then Start)")
+        return phase
+
+    def _run(self, beat):
+        generation = beat.generation
+        shard = self._new_shard()
+        cadences = {}  # hwnd -> Cadence, owned by this thread
+        controllers = {}  # hwnd -> AimdController while adaptive
+        reported = set()  # hwnds with explicit feedback (screen checks); others judge by key timing
+        feedback = self._feedback
+        last_sent = {}  # hwnd -> clock time of the last order, for spacing stats
+        metrics = self.metrics
+        verifier = self.verifier
+        clock = self.clock.now
+        budget = self.stall_budget if self.stall_budget is not None else float("inf")
+        send_failures = 0  # orders in a row the backend raised on
+        if self._recovering is not None and generation == self._generation:
+            self.events.emit("worker_restarted", generation=generation,
+                             recovered_in=round(clock() - self._recovering, 6))
+            self._recovering = None
+        while True:
+            if self._generation != generation:
+                return  # the watchdog replaced this thread
+            st = self.state
+            seq = self._focus_seq
+            while not feedback.empty():
+                hwnd, ok = feedback.get()
+                reported.add(hwnd)
+                ctl = controllers.get(hwnd)
+                if ctl is None or st.adaptive is None:
+                    continue
+                if ok:
+                    ctl.success()
+                else:
+                    ctl.failure()
+            target, cadence, delay = self._next_due(st, cadences, controllers)
+            active = st.plan
+            if active is not None and st.running:
+                if active.last is not None and self._orders_sent() >= active.last:
+                    self._advance_plan(active, "quota")
+                    continue
+                if active.deadline is not None:
+                    left = active.deadline - clock()
+                    if left <= 0:
+                        self._advance_plan(active, "time")
+                        continue
+                    if target is None or left < delay:
+                        target, delay = None, left  # wake up for the step's end
+            timed = metrics.enabled
+            if target is None or delay > 0:
+                t0 = clock() if timed else 0.0
+                with self.lock:
+                    if timed:
+                        metrics["lock_wait"].record(clock() - t0)
+                    # Sleep only if nothing changed since we looked
+                    if self.state is st and self._focus_seq == seq:
+                        self.clock.wait(self.lock, delay)  # None = until the next state change
+                if len(cadences) > len(st.targets):
+                    live = {t.hwnd for t in st.targets}
+                    for hwnd in [h for h in cadences if h not in live]:
+                        del cadences[hwnd]
+                        controllers.pop(hwnd, None)
+                        self._effective.pop(hwnd, None)
+                continue
+
+            hwnd = target.hwnd
+            recipe = target.recipe
+            key = (hwnd, recipe.name)
+            t0 = clock() if timed else 0.0
+            # Window switch + keys are one unit: with other processes driving other clients
+            # (fleet.py), keys must not land in a window another process just raised
+            lock = self.input_lock
+            if lock is not None and not lock.acquire(True, INPUT_LOCK_TIMEOUT):
+                cadence.fire()
+                metrics.inc("skipped")
+                self.events.emit("skipped", hwnd=hwnd, title=self.focus.title(hwnd),
+                                 mode=recipe.name, reason="input held by another process")
+                continue
+            try:
+                if not self.focus.is_focused(hwnd):
+                    if not st.switch_focus:
+                        continue
+                    now = clock()
+                    beat.busy = ("focus", now, now + FOCUS_SETTLE_SECONDS + budget)
+                    switched = self._bring_to_front(hwnd)
+                    beat.busy = None
+                    if not switched:
+                        cadence.fire()  # skip this slot rather than retry in a loop
+                        metrics.inc("skipped")
+                        ctl = controllers.get(hwnd)  # None while a spread plan step sets the pace
+                        if st.adaptive is not None and ctl is not None:
+                            ctl.failure()
+                        self.events.emit("skipped", hwnd=hwnd, title=self.focus.title(hwnd),
+                                         mode=recipe.name, reason="could not switch")
+                        continue
+
+                # A spread plan step overrides the cadence, so no controller is tuning it then
+                ctl = controllers.get(hwnd) if st.adaptive is not None else None
+                adaptive = ctl is not None
+                if timed or adaptive:
+                    t1 = clock()
+                    if timed:
+                        metrics["focus_check"].record(t1 - t0)
+                # Orders of every generation, so "every"/"offset" steps stay in step across restarts
+                sent = sum(s.counts.get(key, 0) for s in self._shards)
+                now = clock()
+                beat.busy = ("keys", now, now + recipe.duration(sent) + budget)
+                try:
+                    self.backend.send(recipe.actions(sent))
+                except Exception as e:
+                    # e.g. SendInput blocked by an elevated game, or a key the backend can't send
+                    beat.busy = None
+                    cadence.fire()
+                    metrics.inc("skipped")
+                    if adaptive:
+                        ctl.failure()
+                    self.events.emit("skipped", hwnd=hwnd, title=self.focus.title(hwnd),
+                                     mode=recipe.name, reason=f"keys failed: {e}")
+                    send_failures += 1
+                    if send_failures >= MAX_SEND_FAILURES:
+                        send_failures = 0
+                        self.pause()
+                        self.events.emit("error", message=f"{MAX_SEND_FAILURES} orders in a row could not be sent"
+                                                          f" ({e}); paused")
+                    continue
+                beat.busy = None
+                send_failures = 0
+            finally:
+                if lock is not None:
+                    lock.release()
+            shard.add(key)
+            metrics.inc("orders")
+            if verifier is not None:
+                verifier.submit(hwnd, recipe.name, clock())
+            if adaptive:
+                # Slow key emission backs off; without other feedback a fast one counts as success
+                if not ctl.keys_sent(clock() - t1) and hwnd not in reported:
+                    ctl.success()
+            if timed:
+                emission = clock() - t1
+                metrics["key_emission"].record(emission)
+                metrics["replay_error"].record(abs(emission - recipe.duration(sent)))
+                prev = last_sent.get(hwnd)
+                last_sent[hwnd] = t1
+                # Gaps over two intervals are pauses or focus loss, not jitter
+                interval = cadence.interval  # in use: adaptive or plan-spread, not just the configured one
+                if prev is not None and t1 - prev < 2 * interval:
+                    metrics["order_interval"].record(t1 - prev)
+                    metrics["order_jitter"].record(abs(t1 - prev - interval))
+            cadence.fire()
+            self._signal_change()
+            n = sent + 1 - st.count_base.get(key, 0)
+            self.events.emit(
+                "order", hwnd=hwnd, mode=recipe.name, keys=recipe.keys_text, n=n, interval=cadence.interval,
+                title=self.focus.title(hwnd) if len(st.targets) > 1 else None,
+            )
+
+    def _bring_to_front(self, hwnd):
+        try:
+            if not self.focus.activate(hwnd):
+                return False
+        except Exception as e:
+            self.events.emit("error", hwnd=hwnd, message=f"Could not switch to {self.focus.title(hwnd)}: {e}")
+            return False
+        self.clock.sleep(FOCUS_SETTLE_SECONDS)
+        return True
+
+
+def create_engine(interval=DEFAULT_INTERVAL, backend=None, recipes=None, focus=None,
+                  log_path=None, console=True, metrics=False, timing=DEFAULT_TIMING, verify=True,
+                  stats_path=None, input_lock=None):
+    """Build an Engine with the Win32 focus tracker and recipes.json.
+
+    `backend` may be an InputBackend instance or a backend name; either way
+    the heavy input library is only imported when the first order goes out.
+    Events go to a rate-limited console sink and, if `log_path` is given,
+    to a rotating JSON-lines file. `metrics` turns on the timing histograms;
+    `timing` is a scheduler.TIMING_MODES name. With `verify`, recipes that
+    have a "verify" block get their orders confirmed on screen (needs NumPy).
+    `stats_path` keeps per-minute order counts in that SQLite file.
+    `input_lock` is passed on to the Engine (see there).
+    """
+    if focus is None:
+        from window_focus import create_tracker
+        focus = create_tracker()
+    if recipes is None:
+        recipes = RecipeRegistry.load()
+    events = EventLog()
+    if console:
+        events.add_sink(ConsoleSink())
+    if log_path:
+        events.add_sink(JsonlFileSink(log_path))
+    metrics = Metrics(enabled=metrics)
+    verifier = None
+    if verify and any(r.verify for r in recipes):
+        from verify import OrderVerifier
+        try:
+            verifier = OrderVerifier.from_recipes(recipes, focus, events=events, metrics=metrics)
+        except ImportError as e:
+            print(f"⚠️ Order verification needs NumPy and mss or Pillow ({e}); sending blind")
+    stats = None
+    if stats_path:
+        from stats import StatsStore
+        stats = StatsStore(stats_path, title_of=focus.title)
+    return Engine(backend, focus, recipes, interval=interval, events=events,
+                  metrics=metrics, clock=SystemClock(timing), verifier=verifier, stats=stats,
+                  input_lock=input_lock)
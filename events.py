@@ -0,0 +1,213 @@
+import os
+import json
+import time
+import threading
+from queue import SimpleQueue, Empty
+from collections import namedtuple
+
+# One structured record: wall-clock time, kind ("order", "skipped", "paused", ...) and fields
+Event = namedtuple("Event", ["ts", "kind", "fields"])
+
+_STOP = object()
+
+
+class EventLog:
+    """Structured event stream with a background writer.
+
+    emit() only appends to a SimpleQueue, so the worker never waits on
+    console or disk I/O. The writer thread drains the queue in batches and
+    hands each batch to every sink. With no sinks attached emit() is a
+    no-op.
+    """
+
+    def __init__(self, sinks=(), batch_size=256, flush_interval=0.5):
+        self.sinks = list(sinks)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue = SimpleQueue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._listeners = []
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+
+    def add_listener(self, fn):
+        """Call fn(event) on the writer thread for every event (e.g. to stream them elsewhere)."""
+        self._listeners.append(fn)
+
+    def emit(self, kind, **fields):
+        if not self.sinks and not self._listeners:
+            return
+        if self._thread is None:
+            self._start()
+        self._queue.put(Event(time.time(), kind, fields))
+
+    def close(self):
+        """Flush everything queued so far and stop the writer."""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join(timeout=5.0)
+            self._thread = None
+        for sink in self.sinks:
+            sink.close()
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        pending_flush = False
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval if pending_flush else None)
+            except Empty:
+                # Quiet period: push buffered output to disk/console
+                for sink in self.sinks:
+                    sink.flush()
+                pending_flush = False
+                continue
+            batch = [] if first is _STOP else [first]
+            stop = first is _STOP
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            if batch:
+                for sink in self.sinks:
+                    try:
+                        sink.write(batch)
+                    except Exception as e:
+                        self.dropped += len(batch)
+                        print(f"⚠️ Event sink {type(sink).__name__} failed: {e}")
+                for fn in self._listeners:
+                    for event in batch:
+                        try:
+                            fn(event)
+                        except Exception as e:
+                            print(f"⚠️ Event listener {getattr(fn, '__qualname__', fn)} failed on {event.kind}: {e}")
+                pending_flush = True
+            if stop:
+                for sink in self.sinks:
+                    sink.flush()
+                return
+
+
+# ======================= Sinks =======================
+def format_event(event):
+    """Human-readable one-liner, matching the old console output for orders."""
+    f = event.fields
+    if event.kind == "order":
+        where = f" @ {f['title']}" if f.get("title") else ""
+        return f"Pressed {f['keys']} - [ {f['n']} ]{where}"
+    if event.kind == "skipped":
+        return f"⏭️ Skipped order for {f.get('title', f.get('hwnd'))}: {f.get('reason')}"
+    if event.kind == "order_unconfirmed":
+        return f"❓ {f.get('mode')} order not confirmed on screen (match {f.get('match', 0):.0%})"
+    if event.kind == "waiting_focus":
+        return f"💤 Waiting for {f.get('title', f.get('hwnd'))} to regain focus"
+    if event.kind == "error":
+        return f"⚠️ {f.get('message')}"
+    if event.kind == "plan_step":
+        mode = f" → {f['mode']}" if f.get("mode") else ""
+        return f"📋 Plan step {f.get('step')}/{f.get('steps')}{mode} ({f.get('reason')} reached)"
+    if event.kind == "plan_done":
+        return f"🏁 Plan finished ({f.get('reason')} reached) — stopped"
+    if event.kind == "stalled":
+        return f"🐶 Scheduler stuck in {f.get('phase')} for {f.get('seconds')} s — restarting it"
+    if event.kind == "worker_restarted":
+        return f"🐶 Scheduler restarted in {f.get('recovered_in', 0) * 1000:.0f} ms; counts kept"
+    extras = " ".join(f"{k}={v}" for k, v in f.items())
+    return f"• {event.kind} {extras}".rstrip()
+
+
+# Control events (paused, mode_changed, ...) are already echoed by the front ends
+CONSOLE_KINDS = ("order", "skipped", "waiting_focus", "order_unconfirmed", "error", "plan_step", "plan_done",
+                 "stalled", "worker_restarted")
+
+
+class ConsoleSink:
+    """Prints events, at most `max_per_second` lines; the rest are summarised."""
+
+    def __init__(self, max_per_second=10.0, kinds=CONSOLE_KINDS, stream=None):
+        self.max_per_second = float(max_per_second)
+        self.kinds = frozenset(kinds) if kinds else None
+        self.stream = stream
+        self._tokens = self.max_per_second
+        self._last = time.monotonic()
+        self._suppressed = 0
+
+    def write(self, batch):
+        now = time.monotonic()
+        self._tokens = min(self.max_per_second, self._tokens + (now - self._last) * self.max_per_second)
+        self._last = now
+        lines = []
+        for event in batch:
+            if self.kinds is not None and event.kind not in self.kinds:
+                continue
+            if self._tokens < 1.0:
+                self._suppressed += 1
+                continue
+            self._tokens -= 1.0
+            if self._suppressed:
+                lines.append(f"… {self._suppressed} more events")
+                self._suppressed = 0
+            lines.append(format_event(event))
+        if lines:
+            print("\n".join(lines), file=self.stream)
+
+    def flush(self):
+        if self._suppressed:
+            print(f"… {self._suppressed} more events", file=self.stream)
+            self._suppressed = 0
+
+    def close(self):
+        self.flush()
+
+
+class JsonlFileSink:
+    """Appends events as JSON lines, rotating at `max_bytes` (path.1 … path.N)."""
+
+    def __init__(self, path, max_bytes=5 * 1024 * 1024, backups=3):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._file = open(path, "a", encoding="utf-8")
+        self._size = self._file.tell()
+
+    def write(self, batch):
+        data = "".join(
+            json.dumps({"ts": round(e.ts, 6), "event": e.kind, **e.fields}, ensure_ascii=False) + "\n"
+            for e in batch
+        )
+        if self._size and self._size + len(data) > self.max_bytes:
+            self._rotate()
+        self._file.write(data)
+        self._size += len(data)
+
+    def _rotate(self):
+        self._file.close()
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._size = 0
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
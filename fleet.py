@@ -0,0 +1,446 @@
+"""Run many clients as a supervised fleet of small worker processes.
+
+Each worker is a headless engine for one window (no Tk, no hotkeys, no
+console output) that reports through a fixed-size slot in one shared
+memory block instead of pipes or prints::
+
+    seq | pid state mode orders skipped heartbeat cpu rss | cmd_seq cmd
+
+The worker is the only writer of its status fields and publishes them
+twice a second under a sequence lock (seq is odd while a write is in
+progress, so readers retry instead of seeing half an update; a slot left
+odd by a worker that died mid-write is read as its last good status). The
+supervisor writes only the command word; a worker picks up a new cmd_seq
+on its next heartbeat. Reading the whole fleet is a memcpy per slot, so
+the dashboard costs next to nothing however many workers there are.
+
+With --switch, workers take turns: a worker holds a fleet-wide lock
+while it raises its window and sends an order's keys, so keys never
+land in a window another worker just brought to the front.
+
+Workers that die are restarted (their counts carry over) up to
+MAX_RESTARTS times. Each worker also listens on the control channel, so
+control.py can drive single workers or the whole fleet.
+
+    python fleet.py --worker "CPJ 1:coffee" --worker "CPJ 2:pizza:2.5"
+    python fleet.py --simulate --worker "A" --worker "B"   # fake windows, no keys sent
+"""
+import os
+import sys
+import time
+import struct
+import argparse
+import multiprocessing
+from collections import namedtuple
+from multiprocessing.shared_memory import SharedMemory
+
+# Seconds between worker status updates (and command polls)
+HEARTBEAT_SECONDS = 0.5
+# A worker whose heartbeat is older than this many periods shows as stale
+STALE_HEARTBEATS = 4
+# Restarts per worker before it is left as failed
+MAX_RESTARTS = 5
+DEFAULT_WORKER_INTERVAL = 1.0
+
+# Reads of a slot that is mid-write before the last consistent status is used instead
+READ_RETRIES = 100
+
+STATES = ("starting", "waiting", "stopped", "paused", "running", "exited", "failed")
+STARTING, WAITING, STOPPED, PAUSED, RUNNING, EXITED, FAILED = range(len(STATES))
+CMD_START, CMD_PAUSE, CMD_QUIT = 1, 2, 3
+
+_SEQ = struct.Struct("<Q")
+_STATUS = struct.Struct("<QQQQQddQ")
+_COMMAND = struct.Struct("<QQ")
+_STATUS_AT = _SEQ.size
+_COMMAND_AT = _STATUS_AT + _STATUS.size
+SLOT_SIZE = 96  # 88 bytes used, padded so slots stay 8-byte aligned
+
+# What one worker runs; `interval` None uses the engine default
+WorkerSpec = namedtuple("WorkerSpec", ["title", "mode", "interval", "backend", "switch", "simulate", "control"])
+# One slot as read by the supervisor; `mode` indexes the fleet's mode names (-1 = none)
+WorkerStatus = namedtuple("WorkerStatus", ["pid", "state", "mode", "orders", "skipped", "heartbeat", "cpu", "rss"])
+
+
+# ---------- Shared memory ----------
+class Board:
+    """Fixed-layout slots in a shared memory buffer, one per worker."""
+
+    def __init__(self, buf):
+        self.buf = buf
+        self._last = {}  # slot -> last consistent WorkerStatus read
+
+    def publish(self, i, status):
+        """Write slot i's status (worker side; one writer per slot)."""
+        base = i * SLOT_SIZE
+        # A worker that died mid-write left seq odd; the next even value after it ends that write
+        seq = (_SEQ.unpack_from(self.buf, base)[0] | 1) + 1
+        _SEQ.pack_into(self.buf, base, seq - 1)  # odd: write in progress
+        mode = status.mode + 1  # stored unsigned, 0 = none
+        _STATUS.pack_into(self.buf, base + _STATUS_AT, status.pid, status.state, mode, status.orders,
+                          status.skipped, status.heartbeat, status.cpu, status.rss)
+        _SEQ.pack_into(self.buf, base, seq)
+
+    def read(self, i):
+        """Consistent WorkerStatus of slot i (retries while the worker is mid-write).
+
+        If the slot stays mid-write (its worker died while publishing), the
+        last consistent status is returned; its heartbeat ages, so the
+        worker shows as stale.
+        """
+        base = i * SLOT_SIZE
+        for _ in range(READ_RETRIES):
+            before = _SEQ.unpack_from(self.buf, base)[0]
+            if before & 1:
+                time.sleep(0)
+                continue
+            fields = _STATUS.unpack_from(self.buf, base + _STATUS_AT)
+            if _SEQ.unpack_from(self.buf, base)[0] == before:
+                pid, state, mode = fields[:3]
+                status = self._last[i] = WorkerStatus(pid, state, mode - 1, *fields[3:])
+                return status
+        if i in self._last:
+            return self._last[i]
+        fields = _STATUS.unpack_from(self.buf, base + _STATUS_AT)
+        pid, state, mode = fields[:3]
+        return WorkerStatus(pid, state, mode - 1, *fields[3:])
+
+    def send(self, i, cmd):
+        """Post a command to slot i (supervisor side)."""
+        base = i * SLOT_SIZE + _COMMAND_AT
+        seq = _COMMAND.unpack_from(self.buf, base)[0]
+        _COMMAND.pack_into(self.buf, base, seq + 1, cmd)
+
+    def command(self, i):
+        """(cmd_seq, cmd) of slot i."""
+        return _COMMAND.unpack_from(self.buf, i * SLOT_SIZE + _COMMAND_AT)
+
+
+def rss_bytes():
+    """Resident memory of this process in bytes (0 if it cannot be read)."""
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class Counters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+                (name, ctypes.c_size_t) for name in (
+                    "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage",
+                    "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")]
+
+        counters = Counters(cb=ctypes.sizeof(Counters))
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize
+        return 0
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # peak only; KB except on macOS
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+# ---------- Worker ----------
+def _worker_engine(spec, input_lock=None):
+    from engine import create_engine
+
+    focus = backend = None
+    if spec.simulate:
+        from input_backend import RecordingBackend
+        from window_focus import FocusTracker, FakeFocusProvider
+        focus = FocusTracker(FakeFocusProvider(foreground=1, titles={1: spec.title})).start()
+        backend = RecordingBackend()
+    else:
+        backend = spec.backend
+    engine = create_engine(DEFAULT_WORKER_INTERVAL if spec.interval is None else spec.interval,
+                           backend=backend, focus=focus, console=False, verify=False,
+                           input_lock=input_lock)
+    engine.set_switch_focus(spec.switch)
+    return engine
+
+
+def run_worker(slot, shm_name, spec, modes, seen=0, base=(0, 0), input_lock=None):
+    """Process entry point: drive one window and publish to `slot` until told to quit.
+
+    `seen` is the slot's cmd_seq at spawn time (later commands are acted on);
+    `base` is the (orders, skipped) a previous run of this slot got to.
+    `input_lock` is the fleet-wide lock around focus switches and key sends.
+    """
+    shm = SharedMemory(name=shm_name)
+    board = Board(shm.buf)
+    pid = os.getpid()
+
+    def publish(state, mode=-1, orders=0, skipped=0):
+        board.publish(slot, WorkerStatus(pid, state, mode, base[0] + orders, base[1] + skipped,
+                                         time.time(), time.process_time(), rss_bytes()))
+
+    publish(STARTING)
+    engine = _worker_engine(spec, input_lock)
+    control = None
+    if spec.control:
+        from control import ControlServer
+        try:
+            control = ControlServer(engine).start()
+        except OSError:
+            pass  # the fleet runs fine without it
+    hwnd = None
+    wanted = True  # run once the window is found (until a pause command)
+    try:
+        while True:
+            seq, cmd = board.command(slot)
+            if seq != seen:
+                seen = seq
+                if cmd == CMD_QUIT:
+                    break
+                if cmd in (CMD_START, CMD_PAUSE):
+                    wanted = cmd == CMD_START
+                    if wanted and hwnd is not None:
+                        engine.start()
+                    elif not wanted:
+                        engine.pause()
+            if hwnd is None:
+                found = engine.focus.find_windows(spec.title)
+                if found:
+                    hwnd = found[0]
+                    engine.set_target(hwnd)
+                    engine.set_mode(spec.mode)
+                    if wanted:
+                        engine.start()
+            if hwnd is None:
+                publish(WAITING)
+            else:
+                snap = engine.snapshot()
+                mode = engine.mode_of(hwnd)
+                publish(STATES.index(snap.state.lower()), modes.index(mode) if mode in modes else -1,
+                        sum(snap.totals.values()), engine.metrics.counters["skipped"])
+                if spec.simulate:
+                    engine.backend.clear()  # keep the fake key log from growing
+            time.sleep(HEARTBEAT_SECONDS)
+    except KeyboardInterrupt:
+        pass  # Ctrl+C reaches the whole console group; the supervisor stops us
+    finally:
+        engine.pause()
+        if control is not None:
+            control.stop()
+        snap = engine.snapshot()
+        publish(EXITED, orders=sum(snap.totals.values()), skipped=engine.metrics.counters["skipped"])
+        engine.focus.stop()
+        engine.events.close()
+        engine.clock.close()
+        shm.close()
+
+
+# ---------- Supervisor ----------
+class Fleet:
+    """Spawns one worker process per WorkerSpec and keeps them running.
+
+    Workers are started with the "spawn" method on every platform, so a
+    worker only imports what the engine needs (never Tk or the GUI).
+    """
+
+    def __init__(self, specs, modes):
+        self.specs = list(specs)
+        self.modes = tuple(modes)
+        self.shm = None
+        self.board = None
+        self.processes = [None] * len(self.specs)
+        self.restarts = [0] * len(self.specs)
+        self._ctx = multiprocessing.get_context("spawn")
+        # Keyboard and foreground window are shared by all workers: once any of them may switch
+        # windows, each order (switch + keys) has to go out as one unit, one worker at a time
+        switching = len(self.specs) > 1 and any(s.switch for s in self.specs)
+        self._input_lock = self._ctx.Lock() if switching else None
+
+    def start(self):
+        self.shm = SharedMemory(create=True, size=max(len(self.specs), 1) * SLOT_SIZE)
+        self.shm.buf[:] = bytes(len(self.shm.buf))
+        self.board = Board(self.shm.buf)
+        for i in range(len(self.specs)):
+            self._spawn(i)
+        return self
+
+    def _spawn(self, i, base=(0, 0)):
+        p = self._ctx.Process(target=run_worker, args=(i, self.shm.name, self.specs[i], self.modes,
+                                                           self.board.command(i)[0], base, self._input_lock),
+                              name=f"fleet-worker-{i}", daemon=True)
+        p.start()
+        self.processes[i] = p
+
+    def read(self):
+        """WorkerStatus of every slot."""
+        return [self.board.read(i) for i in range(len(self.specs))]
+
+    def supervise(self):
+        """Restart workers that died without exiting cleanly; returns the restarted slots."""
+        restarted = []
+        for i, p in enumerate(self.processes):
+            if p is None or p.exitcode is None:
+                continue
+            status = self.board.read(i)
+            if status.state in (EXITED, FAILED):
+                continue
+            p.join()
+            if self.restarts[i] >= MAX_RESTARTS:
+                # The worker is gone, so its slot has no other writer now
+                self.board.publish(i, status._replace(state=FAILED))
+                continue
+            self.restarts[i] += 1
+            self._spawn(i, (status.orders, status.skipped))
+            restarted.append(i)
+        return restarted
+
+    def command(self, cmd, index=None):
+        """Post CMD_START / CMD_PAUSE / CMD_QUIT to one worker or all of them."""
+        for i in range(len(self.specs)) if index is None else (index,):
+            self.board.send(i, cmd)
+
+    def stop(self, timeout=5.0):
+        """Ask every worker to quit, wait for them, then free the shared memory.
+
+        Returns the final WorkerStatus of every slot.
+        """
+        if self.shm is None:
+            return []
+        self.command(CMD_QUIT)
+        deadline = time.monotonic() + timeout
+        for p in self.processes:
+            if p is not None:
+                p.join(max(deadline - time.monotonic(), 0.0))
+                if p.exitcode is None:
+                    p.terminate()
+                    p.join()
+        final = self.read()
+        self.board = None
+        self.shm.close()
+        self.shm.unlink()
+        self.shm = None
+        return final
+
+
+# ---------- Dashboard ----------
+def render(fleet, statuses, previous=None, elapsed=None, now=None):
+    """Dashboard lines: one row per worker, then fleet totals.
+
+    With the `previous` statuses and the `elapsed` seconds since them, CPU
+    is shown as a percentage of one core; otherwise as CPU seconds so far.
+    """
+    now = time.time() if now is None else now
+    stale = HEARTBEAT_SECONDS * STALE_HEARTBEATS
+    lines = [f"{'#':>2}  {'pid':>7}  {'window':<18} {'mode':<10} {'state':<9} {'orders':>8} {'skip':>5}"
+             f"  {'beat':>6}  {'cpu':>6}  {'rss':>8}  restarts"]
+    by_mode = {}
+    cpu_total = rss_total = 0.0
+    for i, (spec, s) in enumerate(zip(fleet.specs, statuses)):
+        mode = fleet.modes[s.mode] if 0 <= s.mode < len(fleet.modes) else spec.mode
+        by_mode[mode] = by_mode.get(mode, 0) + s.orders
+        state = STATES[s.state] if s.state < len(STATES) else "?"
+        age = now - s.heartbeat if s.heartbeat else None
+        if age is not None and age > stale and s.state not in (EXITED, FAILED):
+            state = "stale"
+        if previous is not None and elapsed:
+            cpu = max(s.cpu - previous[i].cpu, 0.0) / elapsed * 100
+            cpu_text = f"{cpu:5.1f}%"
+        else:
+            cpu = s.cpu
+            cpu_text = f"{cpu:5.1f}s"
+        alive = s.state not in (EXITED, FAILED)
+        cpu_total += cpu if alive else 0.0
+        rss_total += s.rss if alive else 0
+        lines.append(
+            f"{i + 1:>2}  {s.pid or '':>7}  {spec.title[:18]:<18} {mode[:10]:<10} {state:<9} {s.orders:>8}"
+            f" {s.skipped:>5}  {'' if age is None else f'{age:5.1f}s':>6}  {cpu_text:>6}"
+            f"  {s.rss / 2 ** 20:6.1f}MB  {fleet.restarts[i]}"
+        )
+    alive = sum(s.state not in (EXITED, FAILED) for s in statuses)
+    modes = ", ".join(f"{m} {n}" for m, n in by_mode.items())
+    unit = "%" if previous is not None and elapsed else " s"
+    lines.append(
+        f"Fleet: {alive}/{len(statuses)} workers, {sum(by_mode.values())} orders ({modes}),"
+        f" {rss_total / 2 ** 20:.1f} MB, CPU {cpu_total:.1f}{unit}"
+        + (f", {rss_total / 2 ** 20 / alive:.1f} MB per worker" if alive else "")
+    )
+    return lines
+
+
+def run_dashboard(fleet, refresh=1.0):
+    """Redraw the fleet table every `refresh` seconds until Ctrl+C (or every worker exited)."""
+    if sys.platform == "win32":
+        os.system("")  # enable ANSI escapes in the Windows console
+    clear = "\x1b[H\x1b[J" if sys.stdout.isatty() else ""
+    previous, last = None, time.monotonic()
+    try:
+        while True:
+            time.sleep(refresh)
+            for i in fleet.supervise():
+                print(f"♻️ Restarted worker {i + 1} ({fleet.specs[i].title})")
+            statuses = fleet.read()
+            now = time.monotonic()
+            lines = render(fleet, statuses, previous, now - last)
+            print(clear + "\n".join(lines), flush=True)
+            previous, last = statuses, now
+            if all(s.state in (EXITED, FAILED) for s in statuses):
+                return
+    except KeyboardInterrupt:
+        pass
+
+
+def parse_worker(text, mode, interval):
+    """'TITLE[:MODE[:INTERVAL]]' -> (title, mode, interval) with the given defaults."""
+    parts = text.split(":")
+    if len(parts) > 3 or not parts[0].strip():
+        raise ValueError(f"expected TITLE[:MODE[:INTERVAL]], got {text!r}")
+    title = parts[0].strip()
+    if len(parts) > 1 and parts[1].strip():
+        mode = parts[1].strip()
+    if len(parts) > 2 and parts[2].strip():
+        interval = float(parts[2])
+    return title, mode, interval
+
+
+def main(argv=None):
+    from engine import MIN_INTERVAL
+    from recipes import RecipeRegistry
+
+    parser = argparse.ArgumentParser(description="Run one headless worker process per window, with a fleet dashboard.")
+    parser.add_argument("--worker", action="append", default=[], metavar="TITLE[:MODE[:INTERVAL]]",
+                        help="a worker for the first window whose title contains TITLE (repeatable)")
+    parser.add_argument("--mode", default="coffee", help="recipe for workers that do not name one (default: coffee)")
+    parser.add_argument("--interval", type=float, default=DEFAULT_WORKER_INTERVAL,
+                        help="seconds between orders for workers that do not give one")
+    parser.add_argument("--switch", action="store_true", help="workers bring their window to the front")
+    parser.add_argument("--backend", default=None, help="input backend: sendinput, pyautogui or recording")
+    parser.add_argument("--simulate", action="store_true",
+                        help="give every worker a fake window of its own and send no keys")
+    parser.add_argument("--no-control", action="store_true", help="workers do not open a control channel")
+    parser.add_argument("--refresh", type=float, default=1.0, help="dashboard refresh in seconds")
+    args = parser.parse_args(argv)
+    if not args.worker:
+        parser.error("give at least one --worker")
+    modes = RecipeRegistry.load().names()
+    specs = []
+    for text in args.worker:
+        try:
+            title, mode, interval = parse_worker(text, args.mode, args.interval)
+        except ValueError as e:
+            parser.error(str(e))
+        if mode not in modes:
+            parser.error(f"unknown mode {mode!r} (choose from {', '.join(modes)})")
+        if interval < MIN_INTERVAL:
+            parser.error(f"intervals must be at least {MIN_INTERVAL} s")
+        specs.append(WorkerSpec(title, mode, interval, args.backend, args.switch, args.simulate,
+                                not args.no_control))
+
+    fleet = Fleet(specs, modes).start()
+    print(f"🚀 Fleet of {len(specs)} workers — Ctrl+C to stop")
+    try:
+        run_dashboard(fleet, args.refresh)
+    finally:
+        print("\n".join(render(fleet, fleet.stop())))
+        print("Exiting…")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
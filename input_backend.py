@@ -0,0 +1,217 @@
+import sys
+import time
+import threading
+from collections import namedtuple
+
+# One key of a sequence: hold = seconds between key-down and key-up,
+# gap = seconds to wait after key-up before the next key.
+KeyStep = namedtuple("KeyStep", ["key", "hold", "gap"])
+
+# Time the game needs between opening the order menu (E) and picking an item
+DEFAULT_KEY_GAP = 0.05
+
+
+def _sleep_until(deadline):
+    # Steps sleep toward deadlines measured from the start of the sequence,
+    # so an oversleep shortens the next wait instead of piling up
+    left = deadline - time.perf_counter()
+    if left > 0:
+        time.sleep(left)
+
+
+class InputBackend:
+    """Sends a whole key sequence per call. Subclasses implement send()."""
+
+    name = "base"
+
+    def send(self, steps):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+# ======================= pyautogui =======================
+class PyAutoGuiBackend(InputBackend):
+    """pyautogui with its per-call PAUSE disabled; timings come from the steps only."""
+
+    name = "pyautogui"
+
+    def __init__(self):
+        import pyautogui
+        self._pg = pyautogui
+
+    def send(self, steps):
+        pg = self._pg
+        t = time.perf_counter()
+        for step in steps:
+            pg.keyDown(step.key, _pause=False)
+            if step.hold > 0:
+                t += step.hold
+                _sleep_until(t)
+            pg.keyUp(step.key, _pause=False)
+            if step.gap > 0:
+                t += step.gap
+                _sleep_until(t)
+
+
+# ======================= SendInput (Windows) =======================
+class SendInputBackend(InputBackend):
+    """Low-level Win32 SendInput backend.
+
+    Consecutive key events with no delay between them are injected in a
+    single SendInput call; the sequence is only split where a hold or gap
+    requires a sleep. Keys are sent as scan codes, which games read more
+    reliably than virtual-key events.
+    """
+
+    name = "sendinput"
+
+    _NAMED_VK = {
+        "enter": 0x0D, "return": 0x0D, "esc": 0x1B, "escape": 0x1B,
+        "space": 0x20, "tab": 0x09, "backspace": 0x08,
+        "up": 0x26, "down": 0x28, "left": 0x25, "right": 0x27,
+        "shift": 0x10, "ctrl": 0x11, "alt": 0x12,
+    }
+    _EXTENDED = {0x25, 0x26, 0x27, 0x28}
+
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+
+        if sys.platform != "win32":
+            raise OSError("SendInput backend is only available on Windows")
+
+        class KEYBDINPUT(ctypes.Structure):
+            _fields_ = [
+                ("wVk", wintypes.WORD),
+                ("wScan", wintypes.WORD),
+                ("dwFlags", wintypes.DWORD),
+                ("time", wintypes.DWORD),
+                ("dwExtraInfo", ctypes.c_size_t),
+            ]
+
+        class MOUSEINPUT(ctypes.Structure):
+            _fields_ = [
+                ("dx", wintypes.LONG),
+                ("dy", wintypes.LONG),
+                ("mouseData", wintypes.DWORD),
+                ("dwFlags", wintypes.DWORD),
+                ("time", wintypes.DWORD),
+                ("dwExtraInfo", ctypes.c_size_t),
+            ]
+
+        class _UNION(ctypes.Union):
+            # MOUSEINPUT is the largest member; it fixes sizeof(INPUT)
+            _fields_ = [("ki", KEYBDINPUT), ("mi", MOUSEINPUT)]
+
+        class INPUT(ctypes.Structure):
+            _anonymous_ = ("u",)
+            _fields_ = [("type", wintypes.DWORD), ("u", _UNION)]
+
+        self._ctypes = ctypes
+        self._INPUT = INPUT
+        self._user32 = ctypes.WinDLL("user32", use_last_error=True)
+        self._scan_cache = {}
+
+    def _scan(self, key):
+        cached = self._scan_cache.get(key)
+        if cached is not None:
+            return cached
+        k = key.lower()
+        if k in self._NAMED_VK:
+            vk = self._NAMED_VK[k]
+        elif len(k) == 1:
+            vk = self._user32.VkKeyScanW(ord(k)) & 0xFF
+        else:
+            raise ValueError(f"Unsupported key for SendInput: {key!r}")
+        scan = self._user32.MapVirtualKeyW(vk, 0)  # MAPVK_VK_TO_VSC
+        flags = 0x0008  # KEYEVENTF_SCANCODE
+        if vk in self._EXTENDED:
+            flags |= 0x0001  # KEYEVENTF_EXTENDEDKEY
+        self._scan_cache[key] = (scan, flags)
+        return scan, flags
+
+    def _flush(self, events):
+        if not events:
+            return
+        n = len(events)
+        arr = (self._INPUT * n)()
+        for i, (scan, flags) in enumerate(events):
+            arr[i].type = 1  # INPUT_KEYBOARD
+            arr[i].ki.wScan = scan
+            arr[i].ki.dwFlags = flags
+        sent = self._user32.SendInput(n, arr, self._ctypes.sizeof(self._INPUT))
+        if sent != n:
+            raise OSError(self._ctypes.get_last_error(), "SendInput was blocked")
+        events.clear()
+
+    def send(self, steps):
+        events = []
+        t = time.perf_counter()
+        for step in steps:
+            scan, flags = self._scan(step.key)
+            events.append((scan, flags))
+            if step.hold > 0:
+                self._flush(events)
+                t += step.hold
+                _sleep_until(t)
+            events.append((scan, flags | 0x0002))  # KEYEVENTF_KEYUP
+            if step.gap > 0:
+                self._flush(events)
+                t += step.gap
+                _sleep_until(t)
+        self._flush(events)
+
+
+def is_supported_key(key):
+    """True if every backend can send `key`: single characters and SendInput's named keys."""
+    key = key.lower()
+    return len(key) == 1 or key in SendInputBackend._NAMED_VK
+
+
+# ======================= Recording (headless) =======================
+class RecordingBackend(InputBackend):
+    """Keeps every sent sequence in memory instead of pressing keys.
+
+    `sent` holds (timestamp, steps) tuples. Nothing sleeps, so engines
+    using this backend run at full speed on any platform.
+    """
+
+    name = "recording"
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def send(self, steps):
+        with self._lock:
+            self.sent.append((self.clock(), tuple(steps)))
+
+    def keys(self):
+        """Flat list of every key sent so far."""
+        with self._lock:
+            return [step.key for _, steps in self.sent for step in steps]
+
+    def clear(self):
+        with self._lock:
+            self.sent.clear()
+
+
+BACKENDS = {
+    PyAutoGuiBackend.name: PyAutoGuiBackend,
+    SendInputBackend.name: SendInputBackend,
+    RecordingBackend.name: RecordingBackend,
+}
+
+
+def create_backend(name=None):
+    """Create an input backend by name; defaults to SendInput on Windows, pyautogui elsewhere."""
+    if name is None:
+        name = SendInputBackend.name if sys.platform == "win32" else PyAutoGuiBackend.name
+    try:
+        cls = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown input backend {name!r} (choose from {', '.join(BACKENDS)})")
+    return cls()
@@ -1,25 +1,36 @@
-import threading
-import time
-import json
 import os
-import pyautogui
+import time
+import threading
 import keyboard
-import win32gui
+from collections import deque
+from queue import SimpleQueue, Empty
 import tkinter as tk
 from tkinter import ttk, colorchooser, messagebox
+from engine import create_engine, DEFAULT_INTERVAL, MIN_INTERVAL
+from scheduler import TIMING_MODES, DEFAULT_TIMING, DEFAULT_ADAPTIVE
+from metrics import TimestampRing
+from presets import PresetStore
+from plans import parse_plan, format_plan, plan_to_json, plan_from_json
+from macros import (MacroRecorder, Macro, compress, describe, macro_recipe, macro_to_json, macro_from_json,
+                    MACRO_NAME, MACRO_HOTKEY, RECORD_HOTKEY)
 
-# ======================= Core State =======================
-target_window = None
-running = False
-paused = False
-mode = None  # "coffee" or "pizza"
-counts = {"coffee": 0, "pizza": 0}
-interval_seconds = 5.0  # default cadence
-_state_lock = threading.Lock()
-_worker_thread_started = False
-
-# Where to store/load presets
+# Where to store/load presets (named profiles; see presets.py)
 PRESET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "auto_order_theme.json")
+# Structured event log (JSON lines, rotated)
+EVENT_LOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "auto_order_events.jsonl")
+# Order history (per-minute counts, SQLite); shared with main.py
+STATS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "auto_order_stats.sqlite3")
+# Set to a port (e.g. 9464) to serve Prometheus metrics on http://127.0.0.1:<port>/metrics
+METRICS_PORT = None
+# Accept commands from control.py on the local control socket / named pipe
+CONTROL_ENABLED = True
+# How often the Tk thread picks up work queued by other threads (hotkeys, watchers, events)
+UI_POLL_MS = 30
+
+# ======================= Core State =======================
+engine = create_engine(DEFAULT_INTERVAL, log_path=EVENT_LOG_PATH, metrics=True, stats_path=STATS_PATH)
+focus = engine.focus
+recipes = engine.recipes
 
 # Defaults
 DEFAULT_COLORS = {
@@ -29,7 +40,92 @@ DEFAULT_COLORS = {
     "button_inactive_bg": "#334155",  # slate-700
     "counter_bg": "#1f2937",          # gray-800
 }
-DEFAULT_INTERVAL = 5.0
+
+# ======================= Rendering ========================
+class WidgetCache:
+    """Remembers the last option values written to each widget.
+
+    set() only calls configure() with the options whose value actually
+    changed, so re-rendering an unchanged snapshot touches no widgets.
+    """
+
+    def __init__(self):
+        self._values = {}
+
+    def set(self, widget, **options):
+        cached = self._values.setdefault(widget, {})
+        changed = {k: v for k, v in options.items() if k not in cached or cached[k] != v}
+        if changed:
+            widget.configure(**changed)
+            cached.update(changed)
+        return bool(changed)
+
+    def forget(self, widget):
+        self._values.pop(widget, None)
+
+
+class Sparkline:
+    """Scrolling line chart on a Canvas, one point per minute.
+
+    push() adds one segment and shifts the old ones left; set_last() moves
+    the newest point. Rescaling is a single Canvas.scale() call, so the
+    cost per update does not grow with uptime.
+    """
+
+    def __init__(self, canvas, points, width, height, color):
+        self.canvas = canvas
+        self.points = points
+        self.width = width
+        self.height = height
+        self.color = color
+        self.dx = width / (points - 1)
+        self.scale = 1.0  # value that maps to the full height
+        self.values = deque([0] * points, maxlen=points)
+        self.segments = deque()
+        for i in range(points - 1):
+            self.segments.append(self._line(i * self.dx, 0, (i + 1) * self.dx, 0))
+
+    def _y(self, value):
+        return self.height - 2 - (self.height - 4) * value / self.scale
+
+    def _line(self, x0, v0, x1, v1):
+        return self.canvas.create_line(x0, self._y(v0), x1, self._y(v1), fill=self.color, width=2, tags="spark")
+
+    def push(self, value):
+        """Start a new point at the right edge; the oldest one scrolls off."""
+        self._fit(value)
+        self.canvas.delete(self.segments.popleft())
+        self.canvas.move("spark", -self.dx, 0)
+        last = self.values[-1]
+        self.values.append(value)
+        self.segments.append(self._line(self.width - self.dx, last, self.width, value))
+        # Shrink the scale again once a spike has scrolled out
+        if max(self.values) * 4 < self.scale and self.scale > 1.0:
+            self._rescale(max(1.0, max(self.values) * 1.25))
+
+    def set_last(self, value):
+        if value == self.values[-1]:
+            return
+        self._fit(value)
+        self.values[-1] = value
+        x0, y0, x1, _ = self.canvas.coords(self.segments[-1])
+        self.canvas.coords(self.segments[-1], x0, y0, x1, self._y(value))
+
+    def set_color(self, color):
+        if color != self.color:
+            self.color = color
+            self.canvas.itemconfigure("spark", fill=color)
+
+    def _fit(self, value):
+        if value > self.scale:
+            self._rescale(value * 1.25)
+
+    def _rescale(self, scale):
+        # Points sit at y = base - k * v; scaling about the baseline keeps them exact
+        base = self.height - 2
+        self.canvas.scale("spark", 0, base, 1.0, self.scale / scale)
+        self.scale = scale
+
 
 # ======================= GUI App ==========================
 class App:
@@ -41,7 +137,12 @@ class App:
 
         # ---- Theme (customizable via Settings) ----
         self.colors = DEFAULT_COLORS.copy()
+        self.ui = WidgetCache()
+        self.adaptive_bounds = (DEFAULT_ADAPTIVE.floor, DEFAULT_ADAPTIVE.ceiling)  # kept while adaptive is off
+        self._label_style = None
+        self._rendered_version = None
         self.style = ttk.Style()
+        self.style.theme_use("default")
         # Set base bg immediately so early widgets don't flash white
         self.root.configure(bg=self.colors["window_bg"])
 
@@ -54,7 +155,7 @@ class App:
         self.header.grid(row=0, column=0, columnspan=4, pady=(10, 6), padx=10, sticky="w")
 
         # ---- Top Controls (tk.Button so we can color them) ----
-        self.btn_set_window = tk.Button(self.root, text="Set Active Window", command=self.set_active_window)
+        self.btn_set_window = tk.Button(self.root, text="Add Active Window", command=self.set_active_window)
         self.btn_start = tk.Button(self.root, text="Start", command=self.start_script)
         self.btn_pause = tk.Button(self.root, text="Pause", command=self.pause_script)
         self.btn_settings = tk.Button(self.root, text="Settings", command=self.open_settings)
@@ -64,157 +165,316 @@ class App:
         self.btn_pause.grid(row=1, column=2, padx=pad_x, pady=pad_y, sticky="ew")
         self.btn_settings.grid(row=1, column=3, padx=pad_x, pady=pad_y, sticky="ew")
 
-        # ---- Mode Buttons (tk.Button, color-toggling) ----
-        self.btn_coffee = tk.Button(self.root, text="☕ Coffee (E → C)", command=self.set_mode_coffee,
-                                    font=("Segoe UI", 10, "bold"))
-        self.btn_pizza  = tk.Button(self.root, text="🍕 Pizza  (E → Z)", command=self.set_mode_pizza,
-                                    font=("Segoe UI", 10, "bold"))
-        self.btn_coffee.grid(row=2, column=0, columnspan=2, padx=pad_x, pady=(0, pad_y), sticky="ew")
-        self.btn_pizza.grid(row=2, column=2, columnspan=2, padx=pad_x, pady=(0, pad_y), sticky="ew")
+        # ---- Mode Buttons (tk.Button, color-toggling; one per recipe) ----
+        self.mode_frame = tk.Frame(self.root, bd=0)
+        self.mode_frame.grid(row=2, column=0, columnspan=4, sticky="ew")
+        self.mode_buttons = {}
+        for recipe in recipes:
+            btn = tk.Button(self.mode_frame, text=recipe.button_text, command=lambda n=recipe.name: self.set_mode(n),
+                            font=("Segoe UI", 10, "bold"))
+            btn.pack(side="left", fill="x", expand=True, padx=pad_x, pady=(0, pad_y))
+            self.mode_buttons[recipe.name] = btn
 
         # ---- Counters + Reset ----
         self.counter_frame = tk.Frame(self.root, bd=0)
         self.counter_frame.grid(row=3, column=0, columnspan=4, padx=pad_x, pady=pad_y, sticky="ew")
-        self.lbl_coffee_count = ttk.Label(self.counter_frame, text="Coffee Count: 0", font=("Segoe UI", 12, "bold"))
-        self.lbl_pizza_count = ttk.Label(self.counter_frame, text="Pizza Count: 0", font=("Segoe UI", 12, "bold"))
+        self.count_labels = {
+            recipe.name: ttk.Label(self.counter_frame, text=f"{recipe.label} Count: 0", font=("Segoe UI", 12, "bold"))
+            for recipe in recipes
+        }
         self.lbl_state = ttk.Label(self.counter_frame, text="State: Stopped | Mode: — | Target: None", font=("Segoe UI", 10))
+        self.btn_switch = tk.Button(self.counter_frame, text="Switch Windows: Off", command=self.toggle_switch_focus)
         self.btn_reset = tk.Button(self.counter_frame, text="Reset Counters", command=self.reset_counters)
 
-        self.lbl_coffee_count.pack(side="left", padx=10, pady=8)
-        self.lbl_pizza_count.pack(side="left", padx=10, pady=8)
+        for lbl in self.count_labels.values():
+            lbl.pack(side="left", padx=10, pady=8)
+        # Screen-checked orders (only when a recipe has a "verify" block)
+        self.lbl_verified = ttk.Label(self.counter_frame, text="✔ 0  ✘ 0", font=("Segoe UI", 10))
+        if engine.verifier is not None:
+            self.lbl_verified.pack(side="left", padx=10, pady=8)
         self.btn_reset.pack(side="left", padx=10, pady=8)
+        self.btn_switch.pack(side="left", padx=10, pady=8)
+        self._pad = (pad_x, pad_y)
         self.lbl_state.pack(side="right", padx=10, pady=8)
 
+        # ---- Timing (p50/p99 from engine.metrics) ----
+        self.lbl_metrics = ttk.Label(self.root, text=engine.metrics.summary(), font=("Segoe UI", 9))
+        self.lbl_metrics.grid(row=5, column=0, columnspan=4, padx=pad_x, pady=(0, pad_y), sticky="e")
+
+        # ---- Throughput (orders/minute over the last hour) + ETA ----
+        self.dash_frame = tk.Frame(self.root, bd=0)
+        self.dash_frame.grid(row=6, column=0, columnspan=4, padx=pad_x, pady=(0, pad_y), sticky="ew")
+        self.spark_canvas = tk.Canvas(self.dash_frame, width=360, height=48, highlightthickness=0, bd=0)
+        self.spark_canvas.pack(side="left", padx=10, pady=6)
+        self.sparkline = Sparkline(self.spark_canvas, 60, 360, 48, self.colors["button_active_bg"])
+        self.lbl_rate = ttk.Label(self.dash_frame, text="0 /min")
+        self.lbl_rate.pack(side="left", padx=6)
+        ttk.Label(self.dash_frame, text="Goal").pack(side="left", padx=(12, 2))
+        self.goal_var = tk.IntVar(value=0)
+        goal = ttk.Spinbox(self.dash_frame, from_=0, to=1_000_000, increment=50, width=7, textvariable=self.goal_var,
+                           command=self._apply_goal)
+        goal.bind("<Return>", lambda _e: self._apply_goal())
+        goal.pack(side="left")
+        self.lbl_eta = ttk.Label(self.dash_frame, text="ETA —")
+        self.lbl_eta.pack(side="left", padx=6)
+        # Run plan progress (packed only while a plan is loaded)
+        self.lbl_plan = ttk.Label(self.dash_frame, text="")
+        self._plan_shown = False
+        # Order timestamps from the event stream (writer thread appends, Tk thread reads)
+        self.order_times = TimestampRing()
+        engine.events.add_listener(self._on_event)
+        self._dash_started = time.time()
+        self._minute = int(self._dash_started // 60)
+        self._minute_count = 0
+        self._seen_orders = 0
+
+        # ---- Targets (one row per game client) ----
+        self.targets_frame = tk.Frame(self.root, bd=0)
+        self.targets_frame.grid(row=4, column=0, columnspan=4, padx=pad_x, pady=(0, pad_y), sticky="ew")
+        self.target_rows = {}  # hwnd -> dict of row widgets
+        self.lbl_no_targets = ttk.Label(self.targets_frame, text="No targets yet — focus a game window and press F9.")
+        self.lbl_no_targets.pack(anchor="w", padx=10, pady=6)
+
         # ---- Legend ----
         legend = (
             "Keybinds:\n"
-            "  F9        → Set active window\n"
+            "  F9        → Add / select active window\n"
+            "  Shift+F9  → Remove selected window\n"
+            "  F8        → Toggle switching between windows\n"
             "  Delete    → Start / Resume\n"
             "  Esc       → Pause\n"
-            "  Page Up   → Mode: Coffee (E then C)\n"
-            "  Page Down → Mode: Pizza  (E then Z)\n"
-            "  Ctrl+Q    → Quit"
+            f"  {RECORD_HOTKEY.title():<10}→ Record / stop macro\n"
+            f"  {MACRO_HOTKEY.title():<10}→ Mode: Macro (once recorded)\n"
+            + "".join(
+                f"  {r.hotkey.title():<10}→ Mode: {r.label} ({r.keys_text})\n" for r in recipes if r.hotkey
+            )
+            + "  Ctrl+Q    → Quit"
         )
-        self.legend_box = tk.Text(self.root, height=7, width=56, bd=0)
+        self.legend_box = tk.Text(self.root, height=legend.count("\n") + 1, width=56, bd=0)
         self.legend_box.insert("1.0", legend)
         self.legend_box.configure(state="disabled")
-        self.legend_box.grid(row=4, column=0, columnspan=4, padx=pad_x, pady=(0, 10), sticky="ew")
+        self.legend_box.grid(row=7, column=0, columnspan=4, padx=pad_x, pady=(0, 10), sticky="ew")
 
         # ---- Responsive columns ----
         for c in range(4):
             self.root.grid_columnconfigure(c, weight=1)
 
         # ---- Hotkeys ----
-        keyboard.add_hotkey("f9", self.set_active_window)
-        keyboard.add_hotkey("delete", self.start_script)
-        keyboard.add_hotkey("esc", self.pause_script)
-        keyboard.add_hotkey("page up", self.set_mode_coffee)
-        keyboard.add_hotkey("page down", self.set_mode_pizza)
-        keyboard.add_hotkey("ctrl+q", self.on_quit)
+        # Callbacks only enqueue; engine work runs on the command dispatcher
+        # and widget updates come back to the Tk thread via _ui_queue.
+        self._ui_queue = SimpleQueue()
+        self.root.after(UI_POLL_MS, self._drain_ui_queue)
+        # Widgets then follow engine state through the change watcher below.
+        hotkey = engine.commands.hotkey
+        keyboard.add_hotkey("f9", hotkey(lambda: engine.set_target(focus.current())))
+        keyboard.add_hotkey("shift+f9", hotkey(self._remove_selected))
+        keyboard.add_hotkey("f8", hotkey(lambda: engine.set_switch_focus(not engine.switch_focus)))
+        keyboard.add_hotkey("delete", hotkey(engine.start))
+        keyboard.add_hotkey("esc", hotkey(engine.pause))
+        for recipe in recipes:
+            if recipe.hotkey:
+                keyboard.add_hotkey(recipe.hotkey, hotkey(engine.set_mode, recipe.name))
+        keyboard.add_hotkey(RECORD_HOTKEY, hotkey(self._post_ui, self.toggle_recording))
+        keyboard.add_hotkey("ctrl+q", hotkey(self._post_ui, self.on_quit))
+        self.recorder = MacroRecorder()
+        self.macro = None
 
         # Now that widgets exist, apply theme/colors safely
-        self._apply_theme()
-        self._refresh_all_colors()
-        self._refresh_button_styles()
-        self._update_state_label()
+        self._repaint()
 
-        # Try auto-load preset (if exists) AFTER base paint so we can update live
+        # Try auto-load preset (if exists) AFTER base paint so we can update live;
+        # later edits to the file (by hand or another tool) are applied as they land
+        self.presets = PresetStore(
+            PRESET_PATH, on_change=lambda profile, keys: self._post_ui(lambda: self._apply_preset(profile, keys)))
         self.try_autoload_preset()
 
-        # Start UI poller
-        self._ui_updater()
+        # Re-render only when the engine reports a change
+        self._render_done = threading.Event()
+        threading.Thread(target=self._watch_engine, daemon=True).start()
+        self._schedule_minute_tick()
+
+        self.metrics_server = None
+        if METRICS_PORT is not None:
+            from metrics import MetricsServer
+            self.metrics_server = MetricsServer(engine.metrics, METRICS_PORT).start()
+        self.control_server = None
+        if CONTROL_ENABLED:
+            from control import ControlServer
+            try:
+                self.control_server = ControlServer(engine).start()
+            except OSError as e:
+                print(f"⚠️ Could not open the control channel: {e}")
 
     # ---------- Theme ----------
     def _apply_theme(self):
         # Window + ttk labels
-        self.root.configure(bg=self.colors["window_bg"])
-        self.style.theme_use("default")
-        self.style.configure("TLabel",
-            background=self.colors["window_bg"],
-            foreground=self.colors["text"]
-        )
+        self.ui.set(self.root, bg=self.colors["window_bg"])
+        label_style = (self.colors["window_bg"], self.colors["text"])
+        if label_style != self._label_style:
+            self.style.configure("TLabel", background=label_style[0], foreground=label_style[1])
+            self._label_style = label_style
         # Safely paint widgets that may or may not exist yet
         if hasattr(self, "legend_box"):
-            self.legend_box.configure(
+            self.ui.set(
+                self.legend_box,
                 bg=self.colors["window_bg"],
                 fg=self.colors["text"],
                 insertbackground=self.colors["text"],
             )
         if hasattr(self, "counter_frame"):
-            self.counter_frame.configure(bg=self.colors["counter_bg"])
+            self.ui.set(self.counter_frame, bg=self.colors["counter_bg"])
+        if hasattr(self, "dash_frame"):
+            self.ui.set(self.dash_frame, bg=self.colors["window_bg"])
+            self.ui.set(self.spark_canvas, bg=self.colors["counter_bg"])
+            self.sparkline.set_color(self.colors["button_active_bg"])
+        if hasattr(self, "mode_frame"):
+            self.ui.set(self.mode_frame, bg=self.colors["window_bg"])
+        if hasattr(self, "targets_frame"):
+            self.ui.set(self.targets_frame, bg=self.colors["window_bg"])
+            for row in self.target_rows.values():
+                self.ui.set(row["frame"], bg=self.colors["window_bg"])
 
     def _refresh_all_colors(self):
-        # Apply colors to every tk.Button
+        # Base style for every tk.Button; mode/switch backgrounds are set by _render
         btns = [
             self.btn_set_window, self.btn_start, self.btn_pause, self.btn_settings,
-            self.btn_coffee, self.btn_pizza, self.btn_reset
+            self.btn_reset, self.btn_switch, *self.mode_buttons.values()
         ]
+        for row in self.target_rows.values():
+            btns.extend(row["modes"].values())
+            btns.append(row["remove"])
         for b in btns:
-            b.configure(
-                bg=self.colors["button_inactive_bg"],
+            self.ui.set(
+                b,
                 fg=self.colors["text"],
-                activebackground=self.colors["button_inactive_bg"],
                 activeforeground=self.colors["text"],
                 relief="flat",
                 bd=0,
                 padx=8, pady=6
             )
+        for b in (self.btn_set_window, self.btn_start, self.btn_pause, self.btn_settings, self.btn_reset):
+            self.ui.set(b, bg=self.colors["button_inactive_bg"], activebackground=self.colors["button_inactive_bg"])
+        for row in self.target_rows.values():
+            self.ui.set(row["remove"], bg=self.colors["button_inactive_bg"],
+                        activebackground=self.colors["button_inactive_bg"])
 
-    def _refresh_button_styles(self):
-        # Highlight current mode button
-        with _state_lock:
-            m = mode
-        if m == "coffee":
-            self.btn_coffee.configure(bg=self.colors["button_active_bg"], activebackground=self.colors["button_active_bg"])
-            self.btn_pizza.configure(bg=self.colors["button_inactive_bg"], activebackground=self.colors["button_inactive_bg"])
-        elif m == "pizza":
-            self.btn_pizza.configure(bg=self.colors["button_active_bg"], activebackground=self.colors["button_active_bg"])
-            self.btn_coffee.configure(bg=self.colors["button_inactive_bg"], activebackground=self.colors["button_inactive_bg"])
-        else:
-            self.btn_coffee.configure(bg=self.colors["button_inactive_bg"], activebackground=self.colors["button_inactive_bg"])
-            self.btn_pizza.configure(bg=self.colors["button_inactive_bg"], activebackground=self.colors["button_inactive_bg"])
+    def _paint_mode_buttons(self, m, buttons):
+        on = self.colors["button_active_bg"]
+        off = self.colors["button_inactive_bg"]
+        for name, btn in buttons.items():
+            bg = on if name == m else off
+            self.ui.set(btn, bg=bg, activebackground=bg)
+
+    def _repaint(self):
+        """Apply the colour theme and redraw; only widgets whose options changed are touched."""
+        self._apply_theme()
+        self._refresh_all_colors()
+        self._render(force=True)
 
     # ---------- Controls ----------
     def set_active_window(self):
-        global target_window
-        target_window = win32gui.GetForegroundWindow()
-        self._update_state_label()
-
-    def set_mode_coffee(self):
-        global mode
-        with _state_lock:
-            mode = "coffee"
-        self._refresh_button_styles()
-        self._update_state_label()
-
-    def set_mode_pizza(self):
-        global mode
-        with _state_lock:
-            mode = "pizza"
-        self._refresh_button_styles()
-        self._update_state_label()
+        engine.set_target(focus.current())
+
+    def remove_selected_window(self):
+        self._remove_selected()
+
+    @staticmethod
+    def _remove_selected():
+        if engine.selected is not None:
+            engine.remove_target(engine.selected)
+
+    def set_mode(self, name):
+        engine.set_mode(name)
+
+    def toggle_switch_focus(self):
+        engine.set_switch_focus(not engine.switch_focus)
 
     def start_script(self):
-        global running, paused, _worker_thread_started
-        with _state_lock:
-            if not _worker_thread_started:
-                threading.Thread(target=worker, daemon=True).start()
-                _worker_thread_started = True
-            running = True
-            paused = False
-        self._update_state_label()
+        engine.start()
 
     def pause_script(self):
-        global paused
-        with _state_lock:
-            paused = True
-        self._update_state_label()
+        engine.pause()
 
     def reset_counters(self):
-        with _state_lock:
-            counts["coffee"] = 0
-            counts["pizza"] = 0
-        # UI will update on next tick
+        engine.reset_counters()
+
+    # ---------- Cross-thread UI work ----------
+    def _post_ui(self, fn):
+        # Called off the Tk thread: only queue the work. No Tk call here, so a hotkey hook or
+        # the event writer never waits on the mainloop (and on_quit's joins can't deadlock)
+        self._ui_queue.put(fn)
+
+    def _drain_ui_queue(self):
+        # Runs on the Tk thread every UI_POLL_MS
+        while True:
+            try:
+                fn = self._ui_queue.get_nowait()
+            except Empty:
+                break
+            try:
+                fn()
+            except Exception as e:
+                print(f"⚠️ UI update failed: {e}")
+        self.root.after(UI_POLL_MS, self._drain_ui_queue)
+
+    # ---------- Target rows ----------
+    def _sync_target_rows(self, targets):
+        """Create/destroy one row per engine target."""
+        hwnds = [t.hwnd for t in targets]
+        for hwnd in list(self.target_rows):
+            if hwnd not in hwnds:
+                row = self.target_rows.pop(hwnd)
+                for widget in (row["frame"], row["title"], row["count"], row["remove"], *row["modes"].values()):
+                    self.ui.forget(widget)
+                row["frame"].destroy()
+        for hwnd in hwnds:
+            if hwnd not in self.target_rows:
+                self.target_rows[hwnd] = self._build_target_row(hwnd)
+        if hwnds:
+            self.lbl_no_targets.pack_forget()
+        else:
+            self.lbl_no_targets.pack(anchor="w", padx=10, pady=6)
+        self._refresh_all_colors()
+
+    def _build_target_row(self, hwnd):
+        frame = tk.Frame(self.targets_frame, bg=self.colors["window_bg"])
+        frame.pack(fill="x", padx=4, pady=2)
+        title = ttk.Label(frame, text=self._window_title(hwnd), width=24)
+        title.pack(side="left", padx=6)
+        title.bind("<Button-1>", lambda _e: self._select_target(hwnd))
+        modes = {}
+        for recipe in recipes:
+            btn = tk.Button(frame, text=recipe.icon or recipe.label,
+                            command=lambda n=recipe.name: self._set_row_mode(hwnd, n))
+            btn.pack(side="left", padx=2)
+            modes[recipe.name] = btn
+        count = ttk.Label(frame, text="0 orders", width=20)
+        count.pack(side="left", padx=8)
+        interval_var = tk.DoubleVar(value=engine.default_interval)
+        spin = ttk.Spinbox(frame, from_=MIN_INTERVAL, to=60.0, increment=0.5, width=5, textvariable=interval_var,
+                           command=lambda: self._apply_row_interval(hwnd, interval_var))
+        spin.bind("<Return>", lambda _e: self._apply_row_interval(hwnd, interval_var))
+        spin.pack(side="left", padx=2)
+        ttk.Label(frame, text="s").pack(side="left")
+        remove = tk.Button(frame, text="✕", command=lambda: self._remove_target(hwnd))
+        remove.pack(side="right", padx=4)
+        return {"frame": frame, "title": title, "modes": modes,
+                "count": count, "interval": interval_var, "remove": remove}
+
+    def _select_target(self, hwnd):
+        engine.select(hwnd)
+
+    def _set_row_mode(self, hwnd, mode):
+        engine.set_mode(mode, hwnd)
+
+    def _remove_target(self, hwnd):
+        engine.remove_target(hwnd)
+
+    def _apply_row_interval(self, hwnd, var):
+        try:
+            engine.set_interval(max(MIN_INTERVAL, float(var.get())), hwnd)
+        except (tk.TclError, ValueError):
+            pass
 
     # ---------- Settings ----------
     def open_settings(self):
@@ -236,10 +496,9 @@ class App:
                 if hexcolor:
                     self.colors[key] = hexcolor
                     preview.itemconfigure(rect, fill=hexcolor)
-                    # Repaint live
-                    self._apply_theme()
-                    self._refresh_all_colors()
-                    self._refresh_button_styles()
+                    # Repaint live (only widgets using this colour change)
+                    self._repaint()
+                    self._save_preset_entry("colors", dict(self.colors))
             tk.Button(frame, text="Choose…", command=pick,
                       bg=self.colors["button_inactive_bg"], fg=self.colors["text"],
                       activebackground=self.colors["button_inactive_bg"],
@@ -260,16 +519,83 @@ class App:
         interval_frame.pack(fill="x", padx=10, pady=6)
         ttk.Label(interval_frame, text="Press Cadence (seconds)").pack(anchor="w")
 
-        # Bind to global interval
-        self.interval_var = tk.DoubleVar(value=float(interval_seconds))
+        # Bind to the engine's default interval
+        self.interval_var = tk.DoubleVar(value=float(engine.default_interval))
         slider = ttk.Scale(
-            interval_frame, from_=0.5, to=10.0, variable=self.interval_var,
+            interval_frame, from_=MIN_INTERVAL, to=10.0, variable=self.interval_var,
             command=lambda _evt=None: self._apply_interval_from_slider()
         )
         slider.pack(fill="x", padx=2, pady=4)
-        self.interval_label = ttk.Label(interval_frame, text=f"{self.interval_var.get():.1f} s")
+        self.interval_label = ttk.Label(interval_frame, text=f"{self.interval_var.get():.2f} s")
         self.interval_label.pack(anchor="e")
 
+        # Timing mode: CPU use vs. cadence accuracy
+        timing_frame = tk.Frame(dlg, bg=self.colors["window_bg"])
+        timing_frame.pack(fill="x", padx=10, pady=6)
+        ttk.Label(timing_frame, text="Timing").pack(side="left")
+        self.timing_var = tk.StringVar(value=engine.timing)
+        timing_box = ttk.Combobox(timing_frame, values=list(TIMING_MODES), textvariable=self.timing_var,
+                                  state="readonly", width=10)
+        timing_box.bind("<<ComboboxSelected>>", lambda _e: self._apply_timing_from_settings())
+        timing_box.pack(side="left", padx=10)
+        ttk.Label(timing_frame, text="precise = sub-ms jitter, more CPU").pack(side="left")
+
+        # Adaptive cadence: tune each target's interval between floor and ceiling
+        adaptive_frame = tk.Frame(dlg, bg=self.colors["window_bg"])
+        adaptive_frame.pack(fill="x", padx=10, pady=6)
+        self.adaptive_var = tk.BooleanVar(value=engine.adaptive is not None)
+        self.adaptive_floor_var = tk.DoubleVar(value=self.adaptive_bounds[0])
+        self.adaptive_ceiling_var = tk.DoubleVar(value=self.adaptive_bounds[1])
+        ttk.Checkbutton(adaptive_frame, text="Adaptive cadence", variable=self.adaptive_var,
+                        command=self._apply_adaptive_from_settings).pack(side="left")
+        for label, var in (("floor", self.adaptive_floor_var), ("ceiling", self.adaptive_ceiling_var)):
+            ttk.Label(adaptive_frame, text=label).pack(side="left", padx=(10, 2))
+            spin = ttk.Spinbox(adaptive_frame, from_=MIN_INTERVAL, to=60.0, increment=0.5, width=5, textvariable=var,
+                               command=self._apply_adaptive_from_settings)
+            spin.bind("<Return>", lambda _e: self._apply_adaptive_from_settings())
+            spin.pack(side="left")
+
+        # Run plan: quotas, stop time, spreading (see plans.py)
+        plan_frame = tk.Frame(dlg, bg=self.colors["window_bg"])
+        plan_frame.pack(fill="x", padx=10, pady=6)
+        ttk.Label(plan_frame, text="Run plan  (e.g. coffee 500, pizza 200 until 02:00)").pack(anchor="w")
+        plan = engine.plan
+        self.plan_var = tk.StringVar(value=format_plan(plan) if plan else "")
+        plan_entry = ttk.Entry(plan_frame, textvariable=self.plan_var, width=48)
+        plan_entry.bind("<Return>", lambda _e: self._apply_plan_from_settings())
+        plan_entry.pack(side="left", fill="x", expand=True, pady=4)
+        ttk.Button(plan_frame, text="Apply", command=self._apply_plan_from_settings).pack(side="left", padx=(6, 0))
+        ttk.Button(plan_frame, text="Clear", command=self._clear_plan).pack(side="left", padx=(6, 0))
+
+        # Macro: record with F10 (or here), replay as the "Macro" mode
+        macro_frame = tk.Frame(dlg, bg=self.colors["window_bg"])
+        macro_frame.pack(fill="x", padx=10, pady=6)
+        self.macro_label = ttk.Label(macro_frame, text=self._macro_text())
+        self.macro_label.pack(anchor="w")
+        self.btn_record = ttk.Button(macro_frame, text="Stop" if self.recorder.recording else "Record",
+                                     command=self.toggle_recording)
+        self.btn_record.pack(side="left", pady=4)
+        ttk.Label(macro_frame, text="Replay speed ×").pack(side="left", padx=(12, 2))
+        self.macro_speed_var = tk.DoubleVar(value=self.macro.speed if self.macro else 1.0)
+        speed = ttk.Spinbox(macro_frame, from_=0.25, to=4.0, increment=0.25, width=5,
+                            textvariable=self.macro_speed_var, command=self._apply_macro_speed)
+        speed.bind("<Return>", lambda _e: self._apply_macro_speed())
+        speed.pack(side="left")
+
+        # Profiles: named presets in the preset file
+        sep = ttk.Separator(dlg, orient="horizontal")
+        sep.pack(fill="x", padx=10, pady=8)
+        profile_frame = tk.Frame(dlg, bg=self.colors["window_bg"])
+        profile_frame.pack(fill="x", padx=10, pady=6)
+        ttk.Label(profile_frame, text="Profile").pack(side="left")
+        self.profile_var = tk.StringVar(value=self.presets.active)
+        self.profile_box = ttk.Combobox(profile_frame, values=self.presets.names(), textvariable=self.profile_var,
+                                        width=16)
+        self.profile_box.bind("<<ComboboxSelected>>", lambda _e: self._select_profile(self.profile_var.get()))
+        self.profile_box.pack(side="left", padx=10)
+        ttk.Button(profile_frame, text="Delete", command=self._delete_profile).pack(side="left")
+        ttk.Label(profile_frame, text="type a new name and Save Preset to add one").pack(side="left", padx=10)
+
         # Preset control buttons
         btn_row = tk.Frame(dlg, bg=self.colors["window_bg"])
         btn_row.pack(fill="x", padx=10, pady=(8, 10))
@@ -279,7 +605,7 @@ class App:
                   activebackground=self.colors["button_inactive_bg"],
                   activeforeground=self.colors["text"], relief="flat", bd=0, padx=8, pady=6).pack(side="left")
 
-        tk.Button(btn_row, text="Load Preset", command=lambda: self.load_preset(show_messages=True),
+        tk.Button(btn_row, text="Reload Preset", command=lambda: self.load_preset(show_messages=True),
                   bg=self.colors["button_inactive_bg"], fg=self.colors["text"],
                   activebackground=self.colors["button_inactive_bg"],
                   activeforeground=self.colors["text"], relief="flat", bd=0, padx=8, pady=6).pack(side="left", padx=8)
@@ -290,131 +616,452 @@ class App:
                   activeforeground=self.colors["text"], relief="flat", bd=0, padx=8, pady=6).pack(side="left")
 
         # Path hint
-        hint = ttk.Label(dlg, text=f"Preset file: {PRESET_PATH}")
+        hint = ttk.Label(dlg, text=f"Preset file: {PRESET_PATH} (edits to it apply live)")
         hint.pack(anchor="w", padx=10, pady=(0, 6))
 
     def _apply_interval_from_slider(self):
-        val = max(0.1, float(self.interval_var.get()))
-        with _state_lock:
-            global interval_seconds
-            interval_seconds = val
-        self.interval_label.config(text=f"{val:.1f} s")
+        val = max(MIN_INTERVAL, float(self.interval_var.get()))
+        engine.set_interval(val)
+        for row in self.target_rows.values():
+            row["interval"].set(val)
+        self.interval_label.config(text=f"{val:.2f} s")
+        # A drag fires this per pixel; the store writes once the slider rests
+        self._save_preset_entry("interval_seconds", val)
+
+    def _apply_timing_from_settings(self):
+        engine.set_timing(self.timing_var.get())
+        self._save_preset_entry("timing_mode", engine.timing)
+
+    def _apply_goal(self):
+        self._render(force=True)
+        self._save_preset_entry("goal_orders", self._goal())
+
+    def _apply_adaptive_from_settings(self):
+        try:
+            bounds = (float(self.adaptive_floor_var.get()), float(self.adaptive_ceiling_var.get()))
+        except (tk.TclError, ValueError):
+            return
+        self._set_adaptive(self.adaptive_var.get(), bounds)
+        self._save_preset_entry("adaptive", self._adaptive_json())
+
+    def _adaptive_json(self):
+        return {"enabled": engine.adaptive is not None,
+                "floor": self.adaptive_bounds[0], "ceiling": self.adaptive_bounds[1]}
+
+    def _set_adaptive(self, enabled, bounds):
+        floor = max(MIN_INTERVAL, bounds[0])
+        self.adaptive_bounds = (floor, max(floor, bounds[1]))
+        config = DEFAULT_ADAPTIVE._replace(floor=self.adaptive_bounds[0], ceiling=self.adaptive_bounds[1])
+        if enabled and config != engine.adaptive:
+            engine.set_adaptive(config)
+        elif not enabled and engine.adaptive is not None:
+            engine.set_adaptive(None)
+
+    def _sync_adaptive_controls(self):
+        if hasattr(self, "adaptive_var"):
+            self.adaptive_var.set(engine.adaptive is not None)
+            self.adaptive_floor_var.set(self.adaptive_bounds[0])
+            self.adaptive_ceiling_var.set(self.adaptive_bounds[1])
+
+    def _apply_plan_from_settings(self):
+        text = self.plan_var.get().strip()
+        if not text:
+            self._clear_plan()
+            return
+        try:
+            plan = parse_plan(text, modes=recipes.names())
+        except ValueError as e:
+            messagebox.showerror("Run Plan", f"Could not read the plan:\n{e}")
+            return
+        engine.set_plan(plan)
+        self.plan_var.set(format_plan(plan))
+        self._save_plan_progress()
+
+    def _clear_plan(self):
+        engine.set_plan(None)
+        if hasattr(self, "plan_var"):
+            self.plan_var.set("")
+        self._save_plan_progress()
+
+    def _save_plan_progress(self):
+        # Keep the preset's plan (and its progress) current so a restart resumes it
+        plan = engine.plan
+        self._save_preset_entry("plan", plan_to_json(plan) if plan else None)
+
+    def _save_preset_entry(self, key, value):
+        # Update one entry of the active profile; bursts are written once (presets.py)
+        self.presets.update({key: value})
+
+    # ---------- Macro ----------
+    def toggle_recording(self):
+        if not self.recorder.recording:
+            engine.pause()  # the hook would record the bot's own keys too
+            self.recorder.start()
+            self.ui.set(self.header, text=f"⏺ Recording… press {RECORD_HOTKEY.upper()} to stop")
+            if hasattr(self, "btn_record"):
+                self.btn_record.config(text="Stop")
+            return
+        steps, report = compress(self.recorder.stop())
+        self.ui.set(self.header, text="Auto-Order Helper")
+        if hasattr(self, "btn_record"):
+            self.btn_record.config(text="Record")
+        if not steps:
+            print("⚠️ Nothing recorded")
+            return
+        self._install_macro(Macro(steps, self.macro.speed if self.macro else 1.0))
+        print(f"⏺ Macro recorded: {describe(report)}")
+        self._save_preset_entry("macro", macro_to_json(self.macro))
+
+    def _apply_macro_speed(self):
+        try:
+            speed = min(max(float(self.macro_speed_var.get()), 0.25), 4.0)
+        except (tk.TclError, ValueError):
+            return
+        if self.macro is not None and speed != self.macro.speed:
+            self._install_macro(self.macro._replace(speed=speed))
+            self._save_preset_entry("macro", macro_to_json(self.macro))
+
+    def _install_macro(self, macro):
+        recipe = macro_recipe(macro)
+        self.macro = macro
+        engine.add_recipe(recipe)
+        if MACRO_NAME not in self.mode_buttons:
+            self._add_recipe_widgets(recipe)
+            keyboard.add_hotkey(MACRO_HOTKEY, engine.commands.hotkey(engine.set_mode, MACRO_NAME))
+        else:
+            self.ui.set(self.mode_buttons[MACRO_NAME], text=recipe.button_text)
+        if hasattr(self, "macro_label"):
+            self.macro_label.config(text=self._macro_text())
+
+    def _macro_text(self):
+        if self.macro is None:
+            return f"Macro: none — press Record or {RECORD_HOTKEY.upper()}, play the keys, then stop"
+        length = sum(s.hold + s.gap for s in self.macro.steps) / self.macro.speed
+        return f"Macro: {len(self.macro.steps)} keys, {length:.2f} s per order at ×{self.macro.speed:g}"
+
+    def _add_recipe_widgets(self, recipe):
+        # Mode button and counter for a recipe added after start-up; target rows are rebuilt
+        pad_x, pad_y = self._pad
+        btn = tk.Button(self.mode_frame, text=recipe.button_text, command=lambda n=recipe.name: self.set_mode(n),
+                        font=("Segoe UI", 10, "bold"))
+        btn.pack(side="left", fill="x", expand=True, padx=pad_x, pady=(0, pad_y))
+        self.mode_buttons[recipe.name] = btn
+        lbl = ttk.Label(self.counter_frame, text=f"{recipe.label} Count: 0", font=("Segoe UI", 12, "bold"))
+        lbl.pack(side="left", padx=10, pady=8, before=self.lbl_verified if engine.verifier else self.btn_reset)
+        self.count_labels[recipe.name] = lbl
+        for hwnd in list(self.target_rows):
+            row = self.target_rows.pop(hwnd)
+            for widget in (row["frame"], row["title"], row["count"], row["remove"], *row["modes"].values()):
+                self.ui.forget(widget)
+            row["frame"].destroy()
+        self._sync_target_rows(engine.snapshot().targets)
+        self._repaint()
 
     # ---------- Preset Save/Load/Reset ----------
-    def save_preset(self):
-        data = {
-            "colors": self.colors,
-            "interval_seconds": float(interval_seconds),
+    def _preset_data(self):
+        return {
+            "colors": dict(self.colors),
+            "interval_seconds": float(engine.default_interval),
+            "timing_mode": engine.timing,
+            "mode": engine.mode_of(),
+            "goal_orders": self._goal(),
+            "adaptive": self._adaptive_json(),
+            "plan": plan_to_json(engine.plan) if engine.plan else None,
+            "macro": macro_to_json(self.macro) if self.macro else None,
         }
-        try:
-            with open(PRESET_PATH, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2)
-            messagebox.showinfo("Preset Saved", f"Theme preset saved to:\n{PRESET_PATH}")
-        except Exception as e:
-            messagebox.showerror("Save Failed", f"Could not save preset:\n{e}")
+
+    def save_preset(self):
+        name = self.profile_var.get().strip() if hasattr(self, "profile_var") else ""
+        name = name or self.presets.active
+        saved = self.presets.save_as(name, self._preset_data())
+        if hasattr(self, "profile_box"):
+            self.profile_box.configure(values=self.presets.names())
+        if saved:
+            messagebox.showinfo("Preset Saved", f"Profile \"{name}\" saved to:\n{PRESET_PATH}")
+        else:
+            messagebox.showerror("Save Failed", f"Could not save preset:\n{PRESET_PATH}")
 
     def load_preset(self, show_messages=False):
+        # Re-read the file (e.g. after editing it by hand) and apply the active profile
+        if not self.presets.load():
+            if show_messages:
+                messagebox.showwarning("Load Preset", "No readable preset file found.")
+            return
+        self._apply_preset(self.presets.profile())
+        if show_messages:
+            messagebox.showinfo("Preset Loaded", f"Profile \"{self.presets.active}\" applied.")
+
+    def _select_profile(self, name):
         try:
-            if not os.path.exists(PRESET_PATH):
-                if show_messages:
-                    messagebox.showwarning("Load Preset", "No preset file found.")
-                return
-            with open(PRESET_PATH, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            profile, keys = self.presets.select(name)
+        except KeyError:
+            return  # a new name; Save Preset creates it
+        self._apply_preset(profile, keys)
 
-            colors = data.get("colors", {})
-            interval = data.get("interval_seconds", DEFAULT_INTERVAL)
+    def _delete_profile(self):
+        name = self.profile_var.get().strip()
+        try:
+            self.presets.delete(name)
+        except ValueError as e:
+            messagebox.showerror("Delete Profile", str(e))
+            return
+        self.profile_box.configure(values=self.presets.names())
+        self.profile_var.set(self.presets.active)
 
-            # Apply colors (validate keys; fallback to defaults if missing/invalid)
-            for k, v in DEFAULT_COLORS.items():
-                if isinstance(colors.get(k), str) and colors.get(k).startswith("#"):
-                    self.colors[k] = colors[k]
-                else:
-                    self.colors[k] = v
+    def _apply_preset(self, data, keys=None):
+        """Apply a profile; with `keys`, only those entries (and the widgets showing them) change."""
+        def want(key):
+            return keys is None or key in keys
 
-            # Apply interval
+        if want("colors"):
+            # Validate keys; fall back to defaults if missing/invalid
+            colors = data.get("colors") if isinstance(data.get("colors"), dict) else {}
+            for k, v in DEFAULT_COLORS.items():
+                c = colors.get(k)
+                self.colors[k] = c if isinstance(c, str) and c.startswith("#") else v
+        if want("interval_seconds"):
+            try:
+                engine.set_interval(max(MIN_INTERVAL, min(float(data.get("interval_seconds", DEFAULT_INTERVAL)), 60.0)))
+            except (TypeError, ValueError):
+                engine.set_interval(DEFAULT_INTERVAL)
+        if want("timing_mode"):
+            timing = data.get("timing_mode", DEFAULT_TIMING)
+            engine.set_timing(timing if timing in TIMING_MODES else DEFAULT_TIMING)
+        if want("goal_orders"):
+            try:
+                self.goal_var.set(max(0, int(data.get("goal_orders", 0))))
+            except (TypeError, ValueError):
+                self.goal_var.set(0)
+        if want("adaptive"):
+            adaptive = data.get("adaptive") if isinstance(data.get("adaptive"), dict) else {}
             try:
-                val = float(interval)
-                with _state_lock:
-                    global interval_seconds
-                    interval_seconds = max(0.1, min(val, 60.0))
-            except Exception:
-                with _state_lock:
-                    interval_seconds = DEFAULT_INTERVAL
-
-            # Repaint UI
-            self._apply_theme()
-            self._refresh_all_colors()
-            self._refresh_button_styles()
-            self._update_state_label()
-
-            # If a settings window is open, update its slider if found
+                self._set_adaptive(bool(adaptive.get("enabled", False)),
+                                   (float(adaptive.get("floor", DEFAULT_ADAPTIVE.floor)),
+                                    float(adaptive.get("ceiling", DEFAULT_ADAPTIVE.ceiling))))
+            except (TypeError, ValueError):
+                self._set_adaptive(False, (DEFAULT_ADAPTIVE.floor, DEFAULT_ADAPTIVE.ceiling))
+        if want("macro") and data.get("macro"):
             try:
-                if hasattr(self, "interval_var"):
-                    self.interval_var.set(interval_seconds)
-                if hasattr(self, "interval_label"):
-                    self.interval_label.config(text=f"{interval_seconds:.1f} s")
-            except Exception:
-                pass
+                self._install_macro(macro_from_json(data["macro"]))
+            except ValueError as e:
+                print(f"⚠️ Ignoring the saved macro: {e}")
+        if want("mode") and data.get("mode") in recipes:
+            for t in engine.snapshot().targets:
+                engine.set_mode(data["mode"], t.hwnd)
+        if want("plan"):
+            try:
+                engine.set_plan(plan_from_json(data["plan"]) if data.get("plan") else None)
+            except ValueError as e:
+                print(f"⚠️ Ignoring the saved run plan: {e}")
 
-            if show_messages:
-                messagebox.showinfo("Preset Loaded", "Preset applied.")
-        except Exception as e:
-            if show_messages:
-                messagebox.showerror("Load Failed", f"Could not load preset:\n{e}")
+        if want("colors"):
+            self._repaint()
+        elif want("goal_orders"):
+            self._render(force=True)
+
+        # If a settings window is open, update the controls that changed
+        try:
+            if want("interval_seconds") and hasattr(self, "interval_var"):
+                self.interval_var.set(engine.default_interval)
+                self.interval_label.config(text=f"{engine.default_interval:.2f} s")
+            if want("timing_mode") and hasattr(self, "timing_var"):
+                self.timing_var.set(engine.timing)
+            if want("plan") and hasattr(self, "plan_var"):
+                self.plan_var.set(format_plan(engine.plan) if engine.plan else "")
+            if want("adaptive"):
+                self._sync_adaptive_controls()
+            if hasattr(self, "profile_var"):
+                self.profile_var.set(self.presets.active)
+                self.profile_box.configure(values=self.presets.names())
+        except tk.TclError:
+            pass  # the settings window was closed
 
     def reset_to_defaults(self):
         # Reset to defaults
         self.colors = DEFAULT_COLORS.copy()
-        with _state_lock:
-            global interval_seconds
-            interval_seconds = DEFAULT_INTERVAL
+        engine.set_interval(DEFAULT_INTERVAL)
+        engine.set_timing(DEFAULT_TIMING)
+        self._set_adaptive(False, (DEFAULT_ADAPTIVE.floor, DEFAULT_ADAPTIVE.ceiling))
+        self._clear_plan()
 
-        self._apply_theme()
-        self._refresh_all_colors()
-        self._refresh_button_styles()
-        self._update_state_label()
+        self._repaint()
+        self.presets.update(self._preset_data())
 
         # Update any open settings controls
         try:
             if hasattr(self, "interval_var"):
-                self.interval_var.set(interval_seconds)
+                self.interval_var.set(engine.default_interval)
             if hasattr(self, "interval_label"):
-                self.interval_label.config(text=f"{interval_seconds:.1f} s")
+                self.interval_label.config(text=f"{engine.default_interval:.2f} s")
+            if hasattr(self, "timing_var"):
+                self.timing_var.set(engine.timing)
+            self._sync_adaptive_controls()
         except Exception:
             pass
 
-        messagebox.showinfo("Defaults Restored", "Colors and cadence reset to defaults.")
+        messagebox.showinfo("Defaults Restored", "Colors, cadence, timing and run plan reset to defaults.")
 
     def try_autoload_preset(self):
-        # Silent auto-load on startup if file exists
-        if os.path.exists(PRESET_PATH):
-            self.load_preset(show_messages=False)
+        # Silent auto-load on startup if file exists, then follow edits to it
+        if self.presets.load():
+            self._apply_preset(self.presets.profile())
+        self.presets.watch()
 
     # ---------- UI Updates ----------
-    def _ui_updater(self):
-        with _state_lock:
-            c = counts["coffee"]
-            p = counts["pizza"]
-        self.lbl_coffee_count.config(text=f"Coffee Count: {c}")
-        self.lbl_pizza_count.config(text=f"Pizza Count: {p}")
-        self._refresh_button_styles()
-        self.root.after(150, self._ui_updater)
-
-    def _update_state_label(self):
-        with _state_lock:
-            r = "Running" if running and not paused else ("Paused" if running and paused else "Stopped")
-            m = "☕ COFFEE" if mode == "coffee" else ("🍕 PIZZA" if mode == "pizza" else "—")
-            tgt = self._window_title(target_window) if target_window else "None"
-        self.lbl_state.config(text=f"State: {r} | Mode: {m} | Target: {tgt}")
+    def _watch_engine(self):
+        # Sleeps until the engine version moves, then asks the Tk thread to
+        # render. At most one render is queued at a time; it always reads the
+        # newest snapshot, so bursts of orders collapse into one update.
+        version = None
+        while True:
+            version = engine.wait_for_change(version)
+            self._render_done.clear()
+            self._post_ui(self._render)
+            self._render_done.wait()
+
+    def _render(self, force=False):
+        snap = engine.snapshot()
+        try:
+            if snap.version == self._rendered_version and not force:
+                return
+            self._rendered_version = snap.version
+
+            if len(snap.targets) != len(self.target_rows) or any(t.hwnd not in self.target_rows for t in snap.targets):
+                self._sync_target_rows(snap.targets)
+
+            for name, n in snap.totals.items():
+                if name in self.count_labels:  # a recipe added this instant gets its label next
+                    self.ui.set(self.count_labels[name], text=f"{recipes[name].label} Count: {n}")
+            if snap.verified is not None:
+                confirmed, unconfirmed = snap.verified
+                self.ui.set(self.lbl_verified, text=f"✔ {confirmed}  ✘ {unconfirmed}")
+
+            selected_mode = None
+            for t in snap.targets:
+                row = self.target_rows[t.hwnd]
+                text = f"{sum(t.counts.values())} orders"
+                if t.effective != t.interval:
+                    text += f" · ⚡ {t.effective:.2f} s"
+                self.ui.set(row["count"], text=text)
+                self._paint_mode_buttons(t.mode, row["modes"])
+                if t.hwnd == snap.selected:
+                    selected_mode = t.mode
+            # Highlight the selected target's mode
+            self._paint_mode_buttons(selected_mode, self.mode_buttons)
+
+            on = snap.switch_focus
+            switch_bg = self.colors["button_active_bg"] if on else self.colors["button_inactive_bg"]
+            self.ui.set(self.btn_switch, text="Switch Windows: On" if on else "Switch Windows: Off",
+                        bg=switch_bg, activebackground=switch_bg)
+
+            m = f"{recipes[selected_mode].icon} {recipes[selected_mode].label.upper()}".strip() if selected_mode else "—"
+            tgt = self._window_title(snap.selected) if snap.selected else "None"
+            if len(snap.targets) > 1:
+                tgt += f" (+{len(snap.targets) - 1} more)"
+            health = ""
+            if snap.health is not None:
+                h = snap.health
+                cause = "crashed" if h.phase == "crashed" else f"stuck in {h.phase} {h.seconds:.1f} s"
+                health = f" | ⚠ Restarted ×{h.stalls} ({cause} at {time.strftime('%H:%M', time.localtime(h.at))})"
+                if h.halted:
+                    health += " — paused, keeps failing"
+            self.ui.set(self.lbl_state, text=f"State: {snap.state} | Mode: {m} | Target: {tgt}{health}")
+            self.ui.set(self.lbl_metrics, text=engine.metrics.summary())
+            self._update_dashboard(sum(snap.totals.values()), snap.plan)
+        finally:
+            if hasattr(self, "_render_done"):
+                self._render_done.set()
+
+    # ---------- Throughput dashboard ----------
+    def _on_event(self, event):
+        if event.kind == "order":
+            self.order_times.append(event.ts)
+        elif event.kind in ("plan_step", "plan_done"):
+            self._post_ui(self._save_plan_progress)
+
+    def _goal(self):
+        try:
+            return max(0, int(self.goal_var.get()))
+        except (tk.TclError, ValueError):
+            return 0
+
+    def _schedule_minute_tick(self):
+        delay = 60.0 - time.time() % 60.0
+        self.root.after(int(delay * 1000) + 5, self._minute_tick)
+
+    def _minute_tick(self):
+        # Close the finished minute(s) with exact counts from the ring, start a new point
+        now_minute = int(time.time() // 60)
+        ring = self.order_times
+        while self._minute < now_minute:
+            start = self._minute * 60
+            self.sparkline.set_last(ring.count_between(start, start + 60))
+            self._minute += 1
+            self.sparkline.push(0)
+        self._minute_count = ring.count_between(self._minute * 60)
+        self._seen_orders = ring.total
+        self.sparkline.set_last(self._minute_count)
+        snap = engine.snapshot()
+        self._update_dashboard_labels(sum(snap.totals.values()), snap.plan)
+        self._schedule_minute_tick()
+
+    def _update_dashboard(self, done, plan):
+        # New orders since the last look all belong to the current minute
+        total = self.order_times.total
+        if total != self._seen_orders:
+            self._minute_count += total - self._seen_orders
+            self._seen_orders = total
+            self.sparkline.set_last(self._minute_count)
+        self._update_dashboard_labels(done, plan)
+
+    def _update_dashboard_labels(self, done, plan):
+        # Rate over the last 10 finished minutes (fewer right after start) plus the running one
+        now = time.time()
+        full = min(10, self._minute - int(self._dash_started // 60))
+        elapsed = full + (now - max(self._minute * 60, self._dash_started)) / 60.0
+        rate = sum(list(self.sparkline.values)[-(full + 1):]) / max(elapsed, 1 / 60)
+        self.ui.set(self.lbl_rate, text=f"{rate:.1f} /min")
+        goal = self._goal()
+        if goal <= 0:
+            eta = "ETA —"
+        elif done >= goal:
+            eta = "Goal reached ✔"
+        elif rate <= 0:
+            eta = f"{goal - done} to go"
+        else:
+            minutes = (goal - done) / rate
+            finish = time.strftime("%H:%M", time.localtime(time.time() + minutes * 60))
+            eta = f"ETA {minutes:.0f} min ({finish})" if minutes >= 1 else f"ETA <1 min ({finish})"
+        self.ui.set(self.lbl_eta, text=eta)
+        self._update_plan_label(plan, rate)
+
+    def _update_plan_label(self, plan, rate):
+        if plan is None:
+            if self._plan_shown:
+                self.lbl_plan.pack_forget()
+                self._plan_shown = False
+            return
+        parts = [f"📋 Step {plan.step + 1}/{plan.steps}"]
+        if plan.mode:
+            parts.append(recipes[plan.mode].label)
+        ends = plan.ends
+        if plan.orders is not None:
+            parts.append(f"{plan.done}/{plan.orders}")
+            if rate > 0:
+                # The quota may finish before the stop time
+                done_at = time.time() + (plan.orders - plan.done) / rate * 60
+                ends = done_at if ends is None else min(ends, done_at)
+        if ends is not None:
+            parts.append("ends " + time.strftime("%H:%M", time.localtime(ends)))
+        self.ui.set(self.lbl_plan, text=" · ".join(parts))
+        if not self._plan_shown:
+            self.lbl_plan.pack(side="left", padx=(12, 6))
+            self._plan_shown = True
 
     @staticmethod
     def _window_title(hwnd):
-        try:
-            title = win32gui.GetWindowText(hwnd)
-            return title if title else "(untitled)"
-        except Exception:
-            return "(unknown)"
+        # Cached by the focus tracker; no win32 call per refresh
+        return focus.title(hwnd)
 
     # ---------- Quit ----------
     def on_quit(self):
@@ -422,48 +1069,22 @@ class App:
             keyboard.unhook_all_hotkeys()
         except Exception:
             pass
+        engine.commands.stop()
+        print(f"Hotkey callback latency: {engine.commands.hook_latency.summary()}")
+        if engine.plan is not None:
+            self._save_plan_progress()
+        if self.recorder.recording:
+            self.recorder.stop()
+        self.presets.close()
+        focus.stop()
+        engine.events.close()
+        engine.clock.close()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        if self.control_server is not None:
+            self.control_server.stop()
         self.root.after(50, self.root.destroy)
 
-# ======================= Worker ==========================
-def worker():
-    global running, paused, target_window, mode, counts, interval_seconds
-
-    last_press = 0.0
-    while True:
-        with _state_lock:
-            _running = running
-            _paused = paused
-            _mode = mode
-            _target = target_window
-            _interval = float(interval_seconds)
-
-        if not _running:
-            time.sleep(0.1)
-            continue
-
-        if (
-            not _paused
-            and _mode in ("coffee", "pizza")
-            and _target is not None
-            and _target == win32gui.GetForegroundWindow()
-            and (time.time() - last_press) >= _interval
-        ):
-            if _mode == "coffee":
-                pyautogui.press("e"); pyautogui.press("c")
-                with _state_lock:
-                    counts["coffee"] += 1
-                    n = counts["coffee"]
-                print(f"Pressed E then C - [ {n} ]")
-            elif _mode == "pizza":
-                pyautogui.press("e"); pyautogui.press("z")
-                with _state_lock:
-                    counts["pizza"] += 1
-                    n = counts["pizza"]
-                print(f"Pressed E then Z - [ {n} ]")
-            last_press = time.time()
-
-        time.sleep(0.05)
-
 # ======================= Main ============================
 if __name__ == "__main__":
     root = tk.Tk()
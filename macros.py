@@ -0,0 +1,141 @@
+"""Record a key sequence once, replay it as a recipe.
+
+F10 starts recording through the keyboard hook; pressing it again stops.
+The raw key-down/up stream is normalised into the recipe step format
+(key, hold, gap) that every input backend already plays back:
+
+- key auto-repeat and the record hotkey itself are dropped,
+- overlapping keys are played one after another (a hold ends when the
+  next key goes down), so chords such as Shift+E become two taps,
+- leading idle time is dropped (the cadence owns the time between orders),
+- times are rounded to the millisecond.
+
+The result is registered as the "macro" recipe, so it runs on the
+engine's scheduler like coffee or pizza, optionally sped up or slowed
+down. How closely replays match the recording shows in the replay_error
+histogram (metrics.py).
+"""
+import threading
+from collections import namedtuple
+
+from input_backend import KeyStep, is_supported_key
+from recipes import compile_recipe
+
+MACRO_NAME = "macro"
+RECORD_HOTKEY = "f10"
+MACRO_HOTKEY = "home"
+# Longest recording kept; longer ones are cut (an order should stay short)
+MAX_STEPS = 200
+
+# A recorded sequence at 1x; replays run `speed` times faster
+Macro = namedtuple("Macro", ["steps", "speed"])
+# What compress() kept and dropped, for the summary after recording
+RecordingReport = namedtuple("RecordingReport", ["events", "steps", "duration", "dropped"])
+
+
+class MacroRecorder:
+    """Collects (key, is_down, time) from the keyboard hook while recording.
+
+    The hook callback only appends a tuple; all processing happens in
+    stop(). `hook` / `unhook` default to the keyboard module's.
+    """
+
+    def __init__(self, hook=None, unhook=None):
+        self._hook = hook
+        self._unhook = unhook
+        self._handle = None
+        self._events = []
+        self._lock = threading.Lock()
+
+    @property
+    def recording(self):
+        return self._handle is not None
+
+    def start(self):
+        with self._lock:
+            if self._handle is not None:
+                return
+            if self._hook is None:
+                import keyboard
+                self._hook, self._unhook = keyboard.hook, keyboard.unhook
+            self._events = []
+            append = self._events.append
+            self._handle = self._hook(lambda e: append((e.name, e.event_type == "down", e.time)))
+
+    def stop(self):
+        """Stop recording; returns the raw (key, is_down, time) events."""
+        with self._lock:
+            if self._handle is None:
+                return []
+            self._unhook(self._handle)
+            self._handle = None
+            events, self._events = self._events, []
+        return events
+
+
+def compress(events, ignore=(RECORD_HOTKEY,)):
+    """Raw hook events -> (tuple of KeySteps at 1x, RecordingReport)."""
+    ignore = {k.lower() for k in ignore}
+    presses = []  # [key, down time, up time]
+    held = {}
+    dropped = set()
+    end = events[-1][2] if events else 0.0  # keys still held are released here (the stop hotkey)
+    for name, down, t in events:
+        key = (name or "").lower()
+        if not key or key in ignore:
+            continue
+        if not is_supported_key(key):
+            dropped.add(key)
+            continue
+        if down:
+            if key not in held:  # later downs of a held key are auto-repeat
+                held[key] = len(presses)
+                presses.append([key, t, None])
+        elif key in held:
+            presses[held.pop(key)][2] = t
+    for i in held.values():
+        presses[i][2] = end
+    presses = presses[:MAX_STEPS]
+
+    steps = []
+    for i, (key, down, up) in enumerate(presses):
+        nxt = presses[i + 1][1] if i + 1 < len(presses) else None
+        release = up if nxt is None else min(up, nxt)
+        hold = round(max(release - down, 0.0), 3)
+        gap = round(max(nxt - release, 0.0), 3) if nxt is not None else 0.0
+        steps.append(KeyStep(key, hold, gap))
+    duration = sum(s.hold + s.gap for s in steps)
+    return tuple(steps), RecordingReport(len(events), len(steps), duration, tuple(sorted(dropped)))
+
+
+def macro_recipe(macro, name=MACRO_NAME):
+    """Compile a Macro into a Recipe with its timings scaled by the replay speed."""
+    speed = macro.speed
+    return compile_recipe({
+        "name": name, "label": "Macro", "icon": "⏺", "hotkey": MACRO_HOTKEY,
+        "steps": [{"key": s.key, "hold": s.hold / speed, "gap": s.gap / speed} for s in macro.steps],
+    })
+
+
+def macro_to_json(macro):
+    return {"speed": macro.speed, "steps": [[s.key, s.hold, s.gap] for s in macro.steps]}
+
+
+def macro_from_json(data):
+    """Inverse of macro_to_json; raises ValueError on malformed data."""
+    try:
+        steps = tuple(KeyStep(str(k), float(h), float(g)) for k, h, g in data["steps"])
+        speed = float(data.get("speed", 1.0))
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"malformed macro: {e}") from None
+    if not steps or speed <= 0:
+        raise ValueError("malformed macro: no steps or bad speed")
+    return Macro(steps, speed)
+
+
+def describe(report):
+    """One line for the console / status label after recording."""
+    text = f"{report.steps} keys, {report.duration:.2f} s (from {report.events} key events)"
+    if report.dropped:
+        text += f"; skipped unsupported keys: {', '.join(report.dropped)}"
+    return text
@@ -1,122 +1,291 @@
-import time
-import threading
-import pyautogui
-import keyboard
-import win32gui
+import os
+import sys
+import argparse
+from engine import create_engine, MIN_INTERVAL
+from scheduler import TIMING_MODES, DEFAULT_TIMING, DEFAULT_ADAPTIVE
+from plans import parse_plan, parse_time, stop_plan_at, format_plan
 
 # ===== Globals =====
-target_window = None
-running = False
-paused = False
-mode = None  # "coffee" or "pizza"
-counts = {"coffee": 0, "pizza": 0}
 interval_seconds = 1  # press cadence
-_state_lock = threading.Lock()
+engine = None
+recorder = None  # macros.MacroRecorder, created with the hotkeys
+macro_speed = 1.0
+# Order history shared with the GUI
+STATS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "auto_order_stats.sqlite3")
 
 
 def set_active_window():
-    """Stores the currently active window handle when F9 is pressed."""
-    global target_window
-    target_window = win32gui.GetForegroundWindow()
-    print("✅ Active window set!")
-
-
-def set_mode_coffee():
-    """Toggle to coffee mode (E then C)."""
-    global mode
-    with _state_lock:
-        mode = "coffee"
-    print("☕ Mode set: COFFEE (E then C)")
-
-
-def set_mode_pizza():
-    """Toggle to pizza mode (E then Z)."""
-    global mode
-    with _state_lock:
-        mode = "pizza"
-    print("🍕 Mode set: PIZZA (E then Z)")
-
-
-def worker():
-    """Background worker that presses keys on the chosen cadence if running and not paused."""
-    global running, paused, target_window, mode, counts
-
-    last_press = 0.0
-    while True:
-        with _state_lock:
-            _running = running
-            _paused = paused
-            _mode = mode
-            _target = target_window
-
-        if not _running:
-            time.sleep(0.1)
-            continue
-
-        if (
-            not _paused
-            and _mode in ("coffee", "pizza")
-            and _target is not None
-            and _target == win32gui.GetForegroundWindow()
-            and (time.time() - last_press) >= interval_seconds
-        ):
-            if _mode == "coffee":
-                pyautogui.press("e")
-                pyautogui.press("c")
-                with _state_lock:
-                    counts["coffee"] += 1
-                    n = counts["coffee"]
-                print(f"Pressed E then C - [ {n} ]")
-            elif _mode == "pizza":
-                pyautogui.press("e")
-                pyautogui.press("z")
-                with _state_lock:
-                    counts["pizza"] += 1
-                    n = counts["pizza"]
-                print(f"Pressed E then Z - [ {n} ]")
-
-            last_press = time.time()
-
-        time.sleep(0.05)
+    """Adds the currently active window as a target (or re-selects it) when F9 is pressed."""
+    hwnd = engine.focus.current()
+    known = hwnd in engine.targets
+    if engine.set_target(hwnd) is None:
+        print("⚠️ No active window")
+        return
+    n = len(engine.targets)
+    title = engine.focus.title(hwnd)
+    print(f"✅ Target selected: {title}" if known else f"✅ Target added ({n} total): {title}")
+
+
+def remove_active_window():
+    """Removes the selected target."""
+    if engine.selected is None:
+        return
+    title = engine.focus.title(engine.selected)
+    engine.remove_target(engine.selected)
+    print(f"❎ Target removed: {title}")
+
+
+def set_mode(name):
+    """Set the selected target to a recipe from recipes.json."""
+    recipe = engine.recipes[name]
+    if engine.set_mode(name):
+        print(f"{recipe.icon} Mode set: {recipe.label.upper()} ({recipe.keys_text})")
+    else:
+        print("⚠️ Set a target window first (F9)")
+
+
+def toggle_switch_focus():
+    """Toggle automatic switching between target windows."""
+    engine.set_switch_focus(not engine.switch_focus)
+    print("🔀 Window switching: " + ("ON" if engine.switch_focus else "OFF"))
 
 
 def start_script():
-    """Start or resume the worker loop."""
-    global running, paused
-    with _state_lock:
-        if not running:
-            running = True
-            paused = False
-            threading.Thread(target=worker, daemon=True).start()
-            print("▶️ Script started")
-        else:
-            paused = False
-            print("▶️ Script resumed")
+    """Start or resume the scheduler."""
+    was_running = engine.running
+    engine.start()
+    print("▶️ Script resumed" if was_running else "▶️ Script started")
 
 
 def pause_script():
-    """Pause the worker loop (does not stop the thread)."""
-    global paused
-    with _state_lock:
-        paused = True
+    """Pause the scheduler (does not stop the thread)."""
+    engine.pause()
     print("⏸️ Script paused")
 
 
-# ===== Key bindings =====
-keyboard.add_hotkey("f9", set_active_window)     # lock target window
-keyboard.add_hotkey("delete", start_script)      # start/resume
-keyboard.add_hotkey("esc", pause_script)         # pause
+def toggle_recording():
+    """Start recording a macro, or stop and make it the "macro" mode (F10)."""
+    from macros import Macro, compress, describe, macro_recipe, MACRO_NAME, MACRO_HOTKEY
+    import keyboard
+
+    if not recorder.recording:
+        engine.pause()  # the hook would record the bot's own keys too
+        recorder.start()
+        print("⏺ Recording… play the keys, then press F10 again")
+        return
+    steps, report = compress(recorder.stop())
+    if not steps:
+        print("⚠️ Nothing recorded")
+        return
+    first = MACRO_NAME not in engine.recipes
+    engine.add_recipe(macro_recipe(Macro(steps, macro_speed)))
+    if first:
+        keyboard.add_hotkey(MACRO_HOTKEY, engine.commands.hotkey(set_mode, MACRO_NAME))
+    print(f"⏺ Macro recorded: {describe(report)} — [{MACRO_HOTKEY.title()}] to use it")
+
+
+def run_hotkeys():
+    """Interactive console mode driven by global hotkeys."""
+    import keyboard
+    from macros import MacroRecorder, RECORD_HOTKEY
+    global recorder
+
+    # ===== Key bindings =====
+    # Hook callbacks only enqueue; the handlers run on the engine's command dispatcher
+    hotkey = engine.commands.hotkey
+    keyboard.add_hotkey("f9", hotkey(set_active_window))         # add/select target window
+    keyboard.add_hotkey("shift+f9", hotkey(remove_active_window)) # remove selected target
+    keyboard.add_hotkey("f8", hotkey(toggle_switch_focus))       # cycle through targets
+    keyboard.add_hotkey("delete", hotkey(start_script))          # start/resume
+    keyboard.add_hotkey("esc", hotkey(pause_script))             # pause
+    recorder = MacroRecorder()
+    keyboard.add_hotkey(RECORD_HOTKEY, hotkey(toggle_recording))  # record / stop macro
+
+    for recipe in engine.recipes:
+        if recipe.hotkey:
+            keyboard.add_hotkey(recipe.hotkey, hotkey(set_mode, recipe.name))
+
+    print("Controls:")
+    print("  [F9]        Add / select target window")
+    print("  [Shift+F9]  Remove selected target")
+    print("  [F8]        Toggle switching between targets")
+    print("  [Delete]    Start / Resume")
+    print("  [Esc]       Pause")
+    print("  [F10]       Record / stop a macro (then [Home] selects it)")
+    for recipe in engine.recipes:
+        if recipe.hotkey:
+            print(f"  {'[' + recipe.hotkey.title() + ']':<12}Mode: {recipe.label} ({recipe.keys_text})")
+    print("  [Ctrl+Q]    Exit")
+
+    keyboard.wait("ctrl+q")
+    engine.commands.stop()
+    print(f"Hotkey callback latency: {engine.commands.hook_latency.summary()}")
+    return 0
+
+
+def run_headless(args):
+    """Run without hotkeys or GUI against windows matched by title."""
+    import time
+
+    hwnds = []
+    for title in args.window:
+        found = engine.focus.find_windows(title)
+        if not found:
+            print(f"⚠️ No window matches {title!r}")
+        hwnds.extend(h for h in found if h not in hwnds)
+    if not hwnds:
+        return 1
+
+    # A plan step that names a mode has already given it to the new targets
+    plan = engine.plan
+    plan_mode = plan.steps[plan.step].mode if plan is not None else None
+    for hwnd in hwnds:
+        engine.set_target(hwnd)
+        if plan_mode is None:
+            engine.set_mode(args.mode)
+        print(f"✅ Target: {engine.focus.title(hwnd)}")
+    engine.set_switch_focus(args.switch or len(hwnds) > 1)
+    engine.start()
+    print("▶️ Running headless — Ctrl+C to exit")
+    try:
+        # Coarse wait only so Ctrl+C is delivered on Windows consoles; a run plan ends the run
+        while engine.running:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def run_until_interrupted():
+    """Wait for Ctrl+C while the control channel drives the engine."""
+    import time
+
+    print("🎛️ No hotkeys — use control.py; Ctrl+C to exit")
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def print_report(path, period):
+    """Orders per hour/day over the last week, per target and mode."""
+    import time
+    from stats import StatsStore, format_report
+
+    if not os.path.exists(path):
+        print(f"⚠️ No order history at {path}")
+        return 1
+    store = StatsStore(path)
+    try:
+        print(format_report(store.orders_by(period, since=time.time() - 7 * 86400)))
+    finally:
+        store.close()
+    return 0
+
+
+def main(argv=None):
+    global engine, macro_speed
+    parser = argparse.ArgumentParser(description="Auto-order helper for Club Penguin Journey.")
+    parser.add_argument("--headless", action="store_true",
+                        help="no hotkeys; drive the windows given with --window")
+    parser.add_argument("--window", action="append", default=[], metavar="TITLE",
+                        help="target windows whose title contains TITLE (repeatable)")
+    parser.add_argument("--mode", default="coffee", help="recipe name for --headless (default: coffee)")
+    parser.add_argument("--interval", type=float, default=interval_seconds, help="seconds between orders")
+    parser.add_argument("--switch", action="store_true", help="switch focus between targets")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="tune the interval at runtime between --floor and --ceiling")
+    parser.add_argument("--floor", type=float, default=DEFAULT_ADAPTIVE.floor, help="shortest adaptive interval")
+    parser.add_argument("--ceiling", type=float, default=DEFAULT_ADAPTIVE.ceiling, help="longest adaptive interval")
+    parser.add_argument("--plan", default=None, metavar="PLAN",
+                        help='run plan, e.g. "coffee 500, pizza 200" or "coffee 120 over 1h" (see plans.py)')
+    parser.add_argument("--stop-at", default=None, metavar="HH:MM", help="stop at this local time")
+    parser.add_argument("--macro-speed", type=float, default=1.0, metavar="X",
+                        help="replay recorded macros X times faster (default: 1.0)")
+    parser.add_argument("--timing", choices=TIMING_MODES, default=DEFAULT_TIMING,
+                        help="efficient (least CPU), balanced or precise (sub-ms jitter, spins a core briefly)")
+    parser.add_argument("--backend", default=None, help="input backend: sendinput, pyautogui or recording")
+    parser.add_argument("--no-verify", action="store_true",
+                        help="skip the on-screen order checks configured in recipes.json")
+    parser.add_argument("--stats-db", default=STATS_PATH, metavar="PATH",
+                        help="SQLite file for the order history (default: next to this script)")
+    parser.add_argument("--no-stats", action="store_true", help="do not record the order history")
+    parser.add_argument("--report", choices=("hour", "day"),
+                        help="print orders per hour or day (last 7 days) from the history and exit")
+    parser.add_argument("--log-file", default=None, metavar="PATH",
+                        help="also write events as JSON lines to PATH (rotated at 5 MB)")
+    parser.add_argument("--no-control", action="store_true",
+                        help="do not accept commands from control.py on the local control socket")
+    parser.add_argument("--no-hotkeys", action="store_true",
+                        help="no global hotkeys (several instances, or control.py only); runs until Ctrl+C")
+    parser.add_argument("--quiet", action="store_true", help="do not print orders to the console")
+    parser.add_argument("--metrics", action="store_true", help="record timing histograms and print them at exit")
+    parser.add_argument("--metrics-port", type=int, default=None, metavar="PORT",
+                        help="serve Prometheus metrics on http://127.0.0.1:PORT/metrics (implies --metrics)")
+    args = parser.parse_args(argv)
+    if args.report:
+        return print_report(args.stats_db, args.report)
+    if args.macro_speed <= 0:
+        parser.error("--macro-speed must be positive")
+    macro_speed = args.macro_speed
+    if args.interval < MIN_INTERVAL:
+        parser.error(f"--interval must be at least {MIN_INTERVAL} s")
+    if args.adaptive and not MIN_INTERVAL <= args.floor <= args.ceiling:
+        parser.error(f"need {MIN_INTERVAL} <= --floor <= --ceiling")
+
+    engine = create_engine(args.interval, backend=args.backend, log_path=args.log_file, console=not args.quiet,
+                           metrics=args.metrics or args.metrics_port is not None, timing=args.timing,
+                           verify=not args.no_verify, stats_path=None if args.no_stats else args.stats_db)
+    if args.adaptive:
+        engine.set_adaptive(DEFAULT_ADAPTIVE._replace(floor=args.floor, ceiling=args.ceiling))
+    server = None
+    if args.metrics_port is not None:
+        from metrics import MetricsServer
+        server = MetricsServer(engine.metrics, args.metrics_port).start()
+        print(f"📈 Metrics on http://127.0.0.1:{server.port}/metrics")
+    if args.headless and args.mode not in engine.recipes:
+        parser.error(f"unknown mode {args.mode!r} (choose from {', '.join(engine.recipes.names())})")
+    if args.headless and not args.window:
+        parser.error("--headless needs at least one --window")
+    if args.plan or args.stop_at:
+        try:
+            plan = parse_plan(args.plan or f"until {args.stop_at}", modes=engine.recipes.names())
+            if args.plan and args.stop_at:
+                plan = stop_plan_at(plan, parse_time(args.stop_at))
+        except ValueError as e:
+            parser.error(str(e))
+        engine.set_plan(plan)
+        print(f"📋 Plan: {format_plan(plan)}")
+
+    control = None
+    if not args.no_control:
+        from control import ControlServer
+        try:
+            control = ControlServer(engine).start()
+            print(f"🔌 Control channel: {control.address}")
+        except OSError as e:
+            print(f"⚠️ Could not open the control channel: {e}")
 
-keyboard.add_hotkey("page up", set_mode_coffee)  # Coffee mode
-keyboard.add_hotkey("page down", set_mode_pizza) # Pizza mode
+    try:
+        if args.headless:
+            return run_headless(args)
+        return run_until_interrupted() if args.no_hotkeys else run_hotkeys()
+    finally:
+        if control is not None:
+            control.stop()
+        engine.focus.stop()
+        engine.events.close()
+        engine.clock.close()
+        if server is not None:
+            server.stop()
+        if engine.metrics.enabled:
+            print(engine.metrics.summary())
+        if engine.verifier is not None:
+            print("Order checks: ✔ {} confirmed, ✘ {} unconfirmed".format(*engine.verifier.counts()))
+        print("Exiting…")
 
-print("Controls:")
-print("  [F9]        Set active window (target)")
-print("  [Delete]    Start / Resume")
-print("  [Esc]       Pause")
-print("  [Page Up]   Mode: Coffee (E then C)")
-print("  [Page Down] Mode: Pizza  (E then Z)")
-print("  [Ctrl+Q]    Exit")
 
-keyboard.wait("ctrl+q")
-print("Exiting…")
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+import threading
+from array import array
+from bisect import bisect_left
+
+# Histogram bucket upper bounds in seconds: 8 per decade from 1 µs to 1000 s
+BUCKET_BOUNDS = tuple(10 ** (e / 8) for e in range(-48, 25))
+
+# Timing spans recorded by the engine worker
+HISTOGRAMS = {
+    "lock_wait": "Time the scheduler waited to take the engine lock",
+    "focus_check": "Time spent checking (and switching) the target window's focus",
+    "key_emission": "Time the input backend took to send one order's keys",
+    "order_interval": "Actual spacing between consecutive orders to the same target",
+    "order_jitter": "Absolute difference between actual and configured order spacing",
+    "verify_check": "Time to grab and compare one order-confirmation screen region",
+    "replay_error": "Absolute difference between an order's key emission time and its scheduled holds and gaps",
+}
+COUNTERS = {
+    "orders": "Orders sent",
+    "skipped": "Orders skipped because the target could not be brought to the front",
+    "focus_lost": "Times a running target lost focus and was parked",
+    "confirmed": "Orders confirmed by the screen check",
+    "unconfirmed": "Orders the screen check could not confirm",
+}
+
+
+class Histogram:
+    """Fixed-memory latency histogram over BUCKET_BOUNDS.
+
+    record() is a bisect plus an array increment; it is meant for a single
+    writer (the engine worker). Quantiles are approximate: they interpolate
+    inside the bucket the rank falls in.
+    """
+
+    __slots__ = ("name", "help", "buckets", "count", "total")
+
+    def __init__(self, name, help=""):
+        self.name = name
+        self.help = help
+        self.buckets = array("Q", bytes(8 * (len(BUCKET_BOUNDS) + 1)))  # last = overflow
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, seconds):
+        self.buckets[bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def quantile(self, q):
+        """Approximate q-quantile in seconds, or None without samples."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            if n and seen + n >= rank:
+                if i == len(BUCKET_BOUNDS):
+                    return float("inf")
+                lo = BUCKET_BOUNDS[i - 1] if i else 0.0
+                return lo + (BUCKET_BOUNDS[i] - lo) * max(rank - seen, 0) / n
+            seen += n
+        return float("inf")
+
+    def clear(self):
+        for i in range(len(self.buckets)):
+            self.buckets[i] = 0
+        self.count = 0
+        self.total = 0.0
+
+
+def format_seconds(seconds):
+    if seconds is None:
+        return "—"
+    if seconds == float("inf"):
+        return "∞"
+    if seconds >= 1.0:
+        return f"{seconds:.2f} s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.1f} ms"
+    return f"{seconds * 1e6:.0f} µs"
+
+
+class TimestampRing:
+    """Fixed-size ring of event timestamps (oldest overwritten first).
+
+    One writer appends in time order; readers count recent entries by
+    walking back from the newest, so a query costs only the entries it
+    covers, never the whole history.
+    """
+
+    def __init__(self, capacity=1 << 16):
+        self.capacity = capacity
+        self.times = array("d", bytes(8 * capacity))
+        self.total = 0  # entries ever appended; head = total % capacity
+
+    def append(self, ts):
+        self.times[self.total % self.capacity] = ts
+        self.total += 1
+
+    def count_between(self, start, end=float("inf")):
+        """Entries with start <= ts < end (only those still in the ring)."""
+        total = self.total
+        n = 0
+        for i in range(total - 1, max(total - self.capacity, 0) - 1, -1):
+            ts = self.times[i % self.capacity]
+            if ts < start:
+                break
+            if ts < end:
+                n += 1
+        return n
+
+
+class Metrics:
+    """The engine's histograms and counters.
+
+    When `enabled` is False the engine skips every timer call, so the
+    only cost on the press path is one attribute check per order.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.histograms = {name: Histogram(name, text) for name, text in HISTOGRAMS.items()}
+        self.counters = dict.fromkeys(COUNTERS, 0)
+
+    def __getitem__(self, name):
+        return self.histograms[name]
+
+    def inc(self, name, n=1):
+        self.counters[name] += n
+
+    def summary(self):
+        """One line for status bars: order spacing, jitter and key time percentiles."""
+        h = self.histograms
+        return (
+            f"Spacing p50 {format_seconds(h['order_interval'].quantile(0.5))}"
+            f" | Jitter p50 {format_seconds(h['order_jitter'].quantile(0.5))}"
+            f" p99 {format_seconds(h['order_jitter'].quantile(0.99))}"
+            f" | Keys p99 {format_seconds(h['key_emission'].quantile(0.99))}"
+            f" | Replay err p99 {format_seconds(h['replay_error'].quantile(0.99))}"
+            f" | Skipped {self.counters['skipped']}"
+        )
+
+    def snapshot(self):
+        """Counters and p50/p99 per histogram as plain data (for the control channel)."""
+        return {
+            "enabled": self.enabled,
+            "summary": self.summary(),
+            "counters": dict(self.counters),
+            "histograms": {
+                name: {"count": h.count, "p50": h.quantile(0.5), "p99": h.quantile(0.99)}
+                for name, h in self.histograms.items()
+            },
+        }
+
+    def render_prometheus(self, prefix="cpj_"):
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for name, value in self.counters.items():
+            metric = f"{prefix}{name}_total"
+            lines.append(f"# HELP {metric} {COUNTERS[name]}")
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        for name, h in self.histograms.items():
+            metric = f"{prefix}{name}_seconds"
+            lines.append(f"# HELP {metric} {h.help}")
+            lines.append(f"# TYPE {metric} histogram")
+            buckets = h.buckets[:]  # copy first so the lines agree with each other
+            seen = 0
+            for bound, n in zip(BUCKET_BOUNDS, buckets):
+                seen += n
+                lines.append(f'{metric}_bucket{{le="{bound:.6g}"}} {seen}')
+            count = seen + buckets[-1]
+            lines.append(f'{metric}_bucket{{le="+Inf"}} {count}')
+            lines.append(f"{metric}_sum {h.total:.9g}")
+            lines.append(f"{metric}_count {count}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Serves `metrics` as Prometheus text on http://127.0.0.1:<port>/metrics."""
+
+    def __init__(self, metrics, port=9464, host="127.0.0.1"):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass  # keep the console for orders
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.port = self.httpd.server_address[1]
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
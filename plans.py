@@ -0,0 +1,142 @@
+"""Run plans: quotas, stop times and evenly spread orders.
+
+A plan is a list of steps run in order. Each step can switch every target
+to a recipe, and ends when its quota is sent or its stop time passes;
+after the last step the engine stops. In text form (GUI and --plan)::
+
+    coffee 500, pizza 200              # 500 coffees, then 200 pizzas
+    until 02:00                        # keep the current modes, stop at 02:00
+    coffee 120 over 1h                 # 120 coffees evenly over the next hour
+    coffee 500 until 02:00, pizza 50
+
+The engine turns the current step into fire times once, when the step
+begins (a stop deadline on its clock, and for "over" steps the interval
+that spreads the remaining orders across the remaining window), so the
+scheduler never re-evaluates the plan between orders.
+"""
+import re
+import time
+from collections import namedtuple
+
+# One step. `mode` None keeps each target's mode; `orders` is the quota (None = no
+# quota); `until` is a Unix time; `spread` is a window in seconds to spread `orders` over.
+Step = namedtuple("Step", ["mode", "orders", "until", "spread"])
+# A plan and how far it got: `step` indexes `steps`, `done` counts orders of that
+# step, `started` is the Unix time the step began (spread windows run from it).
+RunPlan = namedtuple("RunPlan", ["steps", "step", "done", "started"])
+
+_UNITS = {"s": 1, "m": 60, "h": 3600}
+
+
+def parse_time(text, now=None):
+    """'HH:MM' -> Unix time of the next such local clock time."""
+    m = re.fullmatch(r"(\d{1,2}):(\d{2})", text.strip())
+    if not m or int(m.group(1)) > 23 or int(m.group(2)) > 59:
+        raise ValueError(f"expected HH:MM, got {text!r}")
+    now = time.time() if now is None else now
+    t = time.localtime(now)
+    target = time.mktime((t.tm_year, t.tm_mon, t.tm_mday, int(m.group(1)), int(m.group(2)), 0, 0, 0, -1))
+    if target <= now:
+        target = time.mktime((t.tm_year, t.tm_mon, t.tm_mday + 1, int(m.group(1)), int(m.group(2)), 0, 0, 0, -1))
+    return target
+
+
+def parse_duration(text):
+    """'90', '90s', '45m', '2h' -> seconds."""
+    m = re.fullmatch(r"(\d+(?:\.\d+)?)\s*([smh]?)", text.strip().lower())
+    if not m:
+        raise ValueError(f"expected a duration like 90s, 45m or 2h, got {text!r}")
+    return float(m.group(1)) * _UNITS[m.group(2) or "s"]
+
+
+def make_step(mode=None, orders=None, until=None, spread=None):
+    """Validated Step."""
+    if orders is not None:
+        orders = int(orders)
+        if orders <= 0:
+            raise ValueError("a quota must be at least 1 order")
+    if spread is not None:
+        spread = float(spread)
+        if orders is None or spread <= 0:
+            raise ValueError("'over' needs an order count and a positive duration")
+    if orders is None and until is None:
+        raise ValueError("a step needs an order count or an 'until' time")
+    return Step(mode, orders, None if until is None else float(until), spread)
+
+
+def parse_plan(text, modes=None, now=None):
+    """Plan text (see the module docstring) -> RunPlan; `modes` limits the recipe names."""
+    steps = []
+    for part in re.split(r"[,;]", text):
+        words = part.split()
+        if not words:
+            continue
+        mode = orders = until = spread = None
+        i = 0
+        if not words[0][0].isdigit() and words[0].lower() not in ("until", "over"):
+            mode = words[0]
+            if modes is not None and mode not in modes:
+                raise ValueError(f"unknown mode {mode!r} (choose from {', '.join(modes)})")
+            i = 1
+        if i < len(words) and words[i][0].isdigit():
+            orders = words[i]
+            i += 1
+        while i < len(words):
+            word = words[i].lower()
+            if word not in ("until", "over") or i + 1 == len(words):
+                raise ValueError(f"could not read {part.strip()!r}")
+            if word == "until":
+                until = parse_time(words[i + 1], now)
+            else:
+                spread = parse_duration(words[i + 1])
+            i += 2
+        steps.append(make_step(mode, orders, until, spread))
+    if not steps:
+        raise ValueError("the plan is empty")
+    return RunPlan(tuple(steps), 0, 0, None)
+
+
+def stop_plan_at(plan, until):
+    """The plan with every step ending by Unix time `until` at the latest."""
+    return plan._replace(steps=tuple(
+        s._replace(until=until if s.until is None else min(s.until, until)) for s in plan.steps
+    ))
+
+
+def format_step(step):
+    parts = [p for p in (step.mode, step.orders) if p is not None]
+    if step.until is not None:
+        parts += ["until", time.strftime("%H:%M", time.localtime(step.until))]
+    if step.spread is not None:
+        s = step.spread
+        parts += ["over", f"{s / 3600:g}h" if s % 3600 == 0 else f"{s / 60:g}m" if s % 60 == 0 else f"{s:g}s"]
+    return " ".join(str(p) for p in parts)
+
+
+def format_plan(plan):
+    """RunPlan -> plan text (the inverse of parse_plan)."""
+    return ", ".join(format_step(s) for s in plan.steps)
+
+
+def plan_to_json(plan):
+    """RunPlan -> JSON-safe dict (for presets); progress included, so a restart resumes."""
+    return {
+        "steps": [s._asdict() for s in plan.steps],
+        "step": plan.step,
+        "done": plan.done,
+        "started": plan.started,
+    }
+
+
+def plan_from_json(data):
+    """Inverse of plan_to_json; raises ValueError on malformed data."""
+    try:
+        steps = tuple(make_step(**s) for s in data["steps"])
+        step, done = int(data.get("step", 0)), int(data.get("done", 0))
+        started = data.get("started")
+        started = None if started is None else float(started)
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"malformed plan: {e}") from None
+    if not steps or not 0 <= step < len(steps) or done < 0:
+        raise ValueError("malformed plan: step out of range")
+    return RunPlan(steps, step, done, started)
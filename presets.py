@@ -0,0 +1,229 @@
+"""Preset store: named profiles in one JSON file, written atomically, reloaded on edits.
+
+File layout::
+
+    {"active": "default",
+     "profiles": {"default": {"colors": {...}, "interval_seconds": 1.0, "mode": "coffee", ...},
+                  "night": {...}}}
+
+A preset saved by older versions (the settings at the top level) loads
+as the "default" profile.
+
+Writes go to a temporary file next to the preset, are flushed to disk and
+then renamed over it with os.replace, so a crash leaves the old file or
+the new one, never half of one. update() only changes the profile in
+memory and (re)starts a short timer, so a burst of edits such as a slider
+drag costs one write.
+
+A watcher thread polls the file's mtime and size (no extra dependency).
+When another program or an editor changes it, the store waits until the
+file has been quiet for the debounce time, reloads it and passes the keys
+that changed in the active profile to `on_change`, so the app re-applies
+only those. The store's own writes are recognised and skipped.
+"""
+import os
+import json
+import tempfile
+import threading
+
+DEFAULT_PROFILE = "default"
+# Quiet time before a write (after update) or a reload (after an external edit)
+DEBOUNCE_SECONDS = 0.3
+# How often the watcher checks the file
+POLL_SECONDS = 1.0
+
+
+def changed_keys(old, new):
+    """Keys whose values differ between two profile dicts."""
+    return tuple(sorted(k for k in old.keys() | new.keys() if old.get(k) != new.get(k)))
+
+
+def atomic_write(path, text):
+    """Replace `path` with `text` so readers (and crashes) only ever see a whole file."""
+    fd, tmp = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def parse_presets(data):
+    """Decoded preset JSON -> (active name, {name: profile dict}); raises ValueError."""
+    if not isinstance(data, dict):
+        raise ValueError("the preset file does not hold a JSON object")
+    if "profiles" not in data:
+        return DEFAULT_PROFILE, {DEFAULT_PROFILE: data}
+    profiles = data["profiles"]
+    if not isinstance(profiles, dict):
+        raise ValueError('"profiles" is not a JSON object')
+    profiles = {str(name): p for name, p in profiles.items() if isinstance(p, dict)}
+    if not profiles:
+        profiles = {DEFAULT_PROFILE: {}}
+    active = data.get("active")
+    if active not in profiles:
+        active = DEFAULT_PROFILE if DEFAULT_PROFILE in profiles else next(iter(profiles))
+    return active, profiles
+
+
+class PresetStore:
+    """Named profiles backed by one JSON file; see the module docstring.
+
+    `on_change(profile, keys)` runs on the watcher thread after an external
+    edit changed `keys` of the active profile.
+    """
+
+    def __init__(self, path, on_change=None, debounce=DEBOUNCE_SECONDS, poll=POLL_SECONDS):
+        self.path = path
+        self.on_change = on_change
+        self.debounce = debounce
+        self.poll = poll
+        self.active = DEFAULT_PROFILE
+        self.profiles = {DEFAULT_PROFILE: {}}
+        self.writes = 0
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # one writer at a time (timer thread vs. flush())
+        self._signature = None  # (mtime, size) of the file as last read or written
+        self._timer = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ---------- Reading ----------
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def load(self):
+        """Read the file; returns False (keeping the profiles in memory) if it is missing or unreadable."""
+        signature = self._stat()
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                active, profiles = parse_presets(json.load(f))
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not read the preset file: {e}")
+            with self._lock:
+                self._signature = signature  # don't retry until it changes again
+            return False
+        with self._lock:
+            self.active, self.profiles = active, profiles
+            self._signature = signature
+        return True
+
+    def profile(self, name=None):
+        """Copy of a profile (default: the active one)."""
+        with self._lock:
+            return dict(self.profiles.get(self.active if name is None else name, {}))
+
+    def names(self):
+        with self._lock:
+            return sorted(self.profiles)
+
+    # ---------- Writing ----------
+    def update(self, changes, name=None):
+        """Merge `changes` into a profile (default: the active one) and save it shortly."""
+        with self._lock:
+            self.profiles.setdefault(self.active if name is None else name, {}).update(changes)
+            self._schedule_write()
+
+    def save_as(self, name, data):
+        """Store `data` as profile `name`, make it active and write now; returns False if that failed."""
+        with self._lock:
+            self.profiles[name] = dict(data)
+            self.active = name
+        return self.flush()
+
+    def select(self, name):
+        """Make `name` the active profile; returns (profile, keys that differ from the previous one)."""
+        with self._lock:
+            if name not in self.profiles:
+                raise KeyError(name)
+            old = self.profiles[self.active]
+            self.active = name
+            new = dict(self.profiles[name])
+            self._schedule_write()
+        return new, changed_keys(old, new)
+
+    def delete(self, name):
+        """Remove a profile other than the active one."""
+        with self._lock:
+            if name == self.active:
+                raise ValueError("select another profile before deleting this one")
+            if self.profiles.pop(name, None) is not None:
+                self._schedule_write()
+
+    def _schedule_write(self):
+        # Caller holds _lock
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(self.debounce, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def flush(self):
+        """Write the profiles now (cancels a pending delayed write)."""
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                text = json.dumps({"active": self.active, "profiles": self.profiles}, indent=2)
+            try:
+                atomic_write(self.path, text)
+            except OSError as e:
+                print(f"⚠️ Could not save the preset file: {e}")
+                return False
+            with self._lock:
+                self._signature = self._stat()
+                self.writes += 1
+        return True
+
+    # ---------- Watching ----------
+    def watch(self):
+        """Start the watcher thread (reloads after external edits)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name="preset-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def _watch(self):
+        pending = None  # a new signature seen once; reloaded when it is still the same a debounce later
+        while not self._stop.wait(self.poll if pending is None else self.debounce):
+            signature = self._stat()
+            if signature is None or signature == self._signature:
+                pending = None
+            elif signature != pending:
+                pending = signature  # still being written; look again shortly
+            else:
+                pending = None
+                self._reload()
+
+    def _reload(self):
+        old = self.profile()
+        if not self.load():
+            return
+        self.reloads += 1
+        new = self.profile()
+        keys = changed_keys(old, new)
+        if keys and self.on_change is not None:
+            self.on_change(new, keys)
+
+    def close(self):
+        """Stop watching and write any pending changes."""
+        self._stop.set()
+        with self._lock:
+            pending = self._timer is not None
+        if pending:
+            self.flush()
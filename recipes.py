@@ -0,0 +1,164 @@
+import json
+import os
+from math import gcd
+
+from input_backend import KeyStep, DEFAULT_KEY_GAP, is_supported_key
+
+# Where to load order recipes from (falls back to the built-ins below)
+RECIPES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recipes.json")
+
+# Longest precomputed cycle allowed for recipes with "every" conditions
+MAX_CYCLE = 720
+
+BUILTIN_RECIPES = [
+    {
+        "name": "coffee", "label": "Coffee", "icon": "☕", "hotkey": "page up",
+        "steps": [{"key": "e", "gap": DEFAULT_KEY_GAP}, {"key": "c"}],
+    },
+    {
+        "name": "pizza", "label": "Pizza", "icon": "🍕", "hotkey": "page down",
+        "steps": [{"key": "e", "gap": DEFAULT_KEY_GAP}, {"key": "z"}],
+    },
+]
+
+
+class Recipe:
+    """A recipe compiled into a precomputed action schedule.
+
+    `schedule` is a tuple of KeyStep tuples; order number n sends
+    schedule[n % len(schedule)]. Repeats and "every N orders" conditions
+    are resolved at compile time, so the worker does no per-step work.
+    `durations` holds each order's scheduled holds + gaps, to compare the
+    real key emission time with. `verify` is the optional screen check
+    from recipes.json (see verify.py).
+    """
+
+    __slots__ = ("name", "label", "icon", "hotkey", "schedule", "durations", "keys_text", "verify")
+
+    def __init__(self, name, label, icon, hotkey, schedule, verify=None):
+        self.name = name
+        self.label = label
+        self.icon = icon
+        self.hotkey = hotkey
+        self.schedule = schedule
+        self.durations = tuple(sum(step.hold + step.gap for step in actions) for actions in schedule)
+        self.verify = verify
+        keys = [step.key.upper() for step in schedule[0]]
+        if len(keys) > 4:
+            keys = keys[:3] + [f"… ({len(keys)} keys)"]
+        self.keys_text = " then ".join(keys)
+
+    def actions(self, n):
+        """KeySteps to send for the n-th order (0-based)."""
+        return self.schedule[n % len(self.schedule)]
+
+    def duration(self, n):
+        """Scheduled seconds of holds and gaps in the n-th order."""
+        return self.durations[n % len(self.durations)]
+
+    @property
+    def button_text(self):
+        return f"{self.icon} {self.label} ({self.keys_text.replace(' then ', ' → ')})".strip()
+
+
+def _lcm(a, b):
+    return a * b // gcd(a, b)
+
+
+def compile_recipe(spec, default_gap=DEFAULT_KEY_GAP):
+    """Validate one recipe dict and compile it into a Recipe."""
+    name = spec.get("name")
+    if not isinstance(name, str) or not name:
+        raise ValueError("Recipe needs a non-empty 'name'")
+    steps = spec.get("steps")
+    if not isinstance(steps, list) or not steps:
+        raise ValueError(f"Recipe {name!r} needs a non-empty 'steps' list")
+    default_gap = float(spec.get("gap", default_gap))
+
+    parsed = []
+    cycle = 1
+    for i, step in enumerate(steps):
+        key = step.get("key")
+        if not isinstance(key, str) or not key:
+            raise ValueError(f"Recipe {name!r} step {i + 1} needs a 'key'")
+        if not is_supported_key(key):
+            # Caught here, a typo falls back to the built-ins instead of failing every order at send time
+            raise ValueError(f"Recipe {name!r} step {i + 1}: unsupported key {key!r}")
+        repeat = int(step.get("repeat", 1))
+        every = int(step.get("every", 1))
+        offset = int(step.get("offset", 0))
+        if repeat < 1 or every < 1:
+            raise ValueError(f"Recipe {name!r} step {i + 1}: 'repeat' and 'every' must be >= 1")
+        hold = float(step.get("hold", 0.0))
+        gap = float(step.get("gap", default_gap))
+        parsed.append((KeyStep(key, hold, gap), repeat, every, offset % every))
+        cycle = _lcm(cycle, every)
+    verify = spec.get("verify")
+    if verify is not None and not isinstance(verify, dict):
+        raise ValueError(f"Recipe {name!r}: 'verify' must be an object")
+    if cycle > MAX_CYCLE:
+        raise ValueError(f"Recipe {name!r}: 'every' values give a cycle of {cycle} orders (max {MAX_CYCLE})")
+
+    schedule = []
+    for n in range(cycle):
+        actions = []
+        for step, repeat, every, offset in parsed:
+            if n % every == offset:
+                actions.extend([step] * repeat)
+        if not actions:
+            raise ValueError(f"Recipe {name!r} sends nothing on order {n + 1} of its cycle")
+        # No trailing wait after the last key of an order; the cadence owns that time
+        actions[-1] = actions[-1]._replace(gap=0.0)
+        schedule.append(tuple(actions))
+
+    return Recipe(
+        name,
+        spec.get("label", name.title()),
+        spec.get("icon", ""),
+        spec.get("hotkey"),
+        tuple(schedule),
+        verify,
+    )
+
+
+class RecipeRegistry:
+    """Compiled recipes in display order, looked up by name."""
+
+    def __init__(self, specs=BUILTIN_RECIPES):
+        self.recipes = {}
+        for spec in specs:
+            recipe = compile_recipe(spec)
+            if recipe.name in self.recipes:
+                raise ValueError(f"Duplicate recipe {recipe.name!r}")
+            self.recipes[recipe.name] = recipe
+
+    def __contains__(self, name):
+        return name in self.recipes
+
+    def __getitem__(self, name):
+        return self.recipes[name]
+
+    def __iter__(self):
+        return iter(self.recipes.values())
+
+    def names(self):
+        return tuple(self.recipes)
+
+    def add(self, recipe):
+        """Register a compiled recipe, replacing one with the same name (e.g. a re-recorded macro)."""
+        recipes = dict(self.recipes)  # swap, so readers iterating the old dict are unaffected
+        recipes[recipe.name] = recipe
+        self.recipes = recipes
+
+    @classmethod
+    def load(cls, path=RECIPES_PATH):
+        """Load recipes from a JSON file; built-ins if it is missing or invalid."""
+        if not os.path.exists(path):
+            return cls()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return cls(data.get("recipes", []))
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not load {path}, using built-in recipes: {e}")
+            return cls()
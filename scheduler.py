@@ -0,0 +1,241 @@
+import sys
+import time
+import heapq
+from collections import namedtuple
+
+
+class Cadence:
+    """Drift-free order deadlines on a monotonic clock.
+
+    Deadlines advance by exactly one interval per order, so the time spent
+    sending keys does not stretch the real cadence. If the worker falls a
+    whole interval behind (lost focus, slow game) the schedule re-anchors
+    on "now" instead of bursting to catch up.
+    """
+
+    def __init__(self, interval, clock=time.perf_counter):
+        self.interval = float(interval)
+        self.clock = clock
+        self.next_due = None
+
+    def set_interval(self, interval):
+        """Change the cadence, keeping the pending deadline relative to the last order."""
+        interval = float(interval)
+        if self.next_due is not None and interval != self.interval:
+            self.next_due += interval - self.interval
+        self.interval = interval
+
+    def due_in(self):
+        """Seconds until the next order is due (0.0 if already due)."""
+        if self.next_due is None:
+            return 0.0
+        return max(0.0, self.next_due - self.clock())
+
+    def fire(self):
+        """Record that an order went out and schedule the next one."""
+        now = self.clock()
+        if self.next_due is None or now - self.next_due >= self.interval:
+            self.next_due = now + self.interval
+        else:
+            self.next_due += self.interval
+
+
+# ======================= Adaptive cadence =======================
+# floor / ceiling bound the interval; each good order takes `step` seconds off
+# it, each bad signal multiplies it by `backoff`. An order whose keys took
+# more than `slow_keys` of the interval to send counts as bad.
+AdaptiveConfig = namedtuple("AdaptiveConfig", ["floor", "ceiling", "step", "backoff", "slow_keys"])
+DEFAULT_ADAPTIVE = AdaptiveConfig(floor=0.5, ceiling=10.0, step=0.05, backoff=1.25, slow_keys=0.25)
+
+
+class AimdController:
+    """Additive-increase / multiplicative-decrease control of one target's rate.
+
+    Confirmed orders shorten the interval by a fixed step (rate creeps
+    up); a lost order, skip or slow key emission multiplies it by
+    `backoff` (rate drops fast). The interval settles just above the
+    fastest spacing the game keeps up with.
+    """
+
+    __slots__ = ("config", "interval", "successes", "failures")
+
+    def __init__(self, config, start):
+        self.config = config
+        self.interval = min(max(float(start), config.floor), config.ceiling)
+        self.successes = 0
+        self.failures = 0
+
+    def reconfigure(self, config):
+        self.config = config
+        self.interval = min(max(self.interval, config.floor), config.ceiling)
+
+    def success(self):
+        self.successes += 1
+        self.interval = max(self.config.floor, self.interval - self.config.step)
+
+    def failure(self):
+        self.failures += 1
+        self.interval = min(self.config.ceiling, self.interval * self.config.backoff)
+
+    def keys_sent(self, seconds):
+        """Feed the measured key-emission time of one order; True if it counted as slow."""
+        if seconds > self.config.slow_keys * self.interval:
+            self.failure()
+            return True
+        return False
+
+
+# ======================= Clocks =======================
+# Timing modes: how long before a deadline the scheduler stops sleeping and
+# spins instead. Longer spins cost CPU but hide OS sleep granularity (Windows'
+# 15.6 ms tick). Where sleeps are already fine-grained (Linux, macOS), a short
+# spin gains little and can be preempted, so balanced is no steadier there.
+TIMING_MODES = {
+    "efficient": 0.0,    # plain sleeps; lowest CPU, jitter = OS timer slack
+    "balanced": 0.002,   # 1 ms timer resolution + 2 ms spin
+    "precise": 0.016,    # 1 ms timer resolution + spin over a whole default Windows tick
+}
+DEFAULT_TIMING = "efficient"
+
+_timer_period_users = 0
+
+
+def _set_timer_resolution(fine):
+    """Ask Windows for 1 ms sleep granularity (timeBeginPeriod) while any clock needs it."""
+    global _timer_period_users
+    if sys.platform != "win32":
+        return
+    import ctypes
+    winmm = ctypes.WinDLL("winmm")
+    if fine:
+        _timer_period_users += 1
+        if _timer_period_users == 1:
+            winmm.timeBeginPeriod(1)
+    elif _timer_period_users > 0:
+        _timer_period_users -= 1
+        if _timer_period_users == 0:
+            winmm.timeEndPeriod(1)
+
+
+class SystemClock:
+    """Real time for the engine: perf_counter deadlines, blocking waits.
+
+    In the balanced and precise timing modes a wait sleeps until `spin`
+    seconds before its deadline, then yields in a loop (with the lock
+    released) until the deadline itself.
+    """
+
+    threaded = True  # the engine runs its scheduler on its own thread
+
+    def __init__(self, mode=DEFAULT_TIMING):
+        self.mode = None
+        self.spin = 0.0
+        self.set_mode(mode)
+
+    def set_mode(self, mode):
+        if mode not in TIMING_MODES:
+            raise ValueError(f"Unknown timing mode {mode!r} (choose from {', '.join(TIMING_MODES)})")
+        spin = TIMING_MODES[mode]
+        if (spin > 0) != (self.spin > 0):
+            _set_timer_resolution(spin > 0)
+        self.mode, self.spin = mode, spin
+
+    def now(self):
+        return time.perf_counter()
+
+    def wall(self):
+        """Unix time (for wall-clock deadlines such as a plan's stop time)."""
+        return time.time()
+
+    def wait(self, cond, timeout):
+        """Block on `cond` (held by the caller) until notified or `timeout` passes."""
+        if timeout is None or timeout > self.spin:
+            cond.wait(None if timeout is None else timeout - self.spin)
+            return
+        # Final stretch: spin without holding the lock so writers are not held up
+        end = time.perf_counter() + timeout
+        cond.release()
+        try:
+            while time.perf_counter() < end:
+                time.sleep(0)
+        finally:
+            cond.acquire()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def close(self):
+        if self.spin > 0:
+            _set_timer_resolution(False)
+            self.spin = 0.0
+
+
+class SimulationDone(Exception):
+    """Raised by VirtualClock once the simulated run is over."""
+
+
+class VirtualClock:
+    """Simulated time: waits jump straight to the next deadline or event.
+
+    Scripted events (call_at / call_later) run on the thread that waits,
+    at their virtual time, so the engine loop can simulate hours in
+    milliseconds. `wakeups` counts how often the waiting thread resumed.
+    Once time reaches `until` (or nothing is left to happen) wait() and
+    sleep() raise SimulationDone. Wall-clock time is `epoch` + virtual time.
+    """
+
+    threaded = False  # the caller drives the scheduler loop itself
+
+    def __init__(self, start=0.0, epoch=0.0):
+        self.t = float(start)
+        self.epoch = epoch
+        self.mode = DEFAULT_TIMING
+        self.until = None
+        self.wakeups = 0
+        self._events = []
+        self._seq = 0
+
+    def now(self):
+        return self.t
+
+    def wall(self):
+        return self.epoch + self.t
+
+    def set_mode(self, mode):
+        # Virtual waits are exact; the timing mode only matters in real time
+        self.mode = mode
+
+    def call_at(self, t, fn, *args):
+        self._seq += 1
+        heapq.heappush(self._events, (float(t), self._seq, fn, args))
+
+    def call_later(self, delay, fn, *args):
+        self.call_at(self.t + delay, fn, *args)
+
+    def wait(self, _cond, timeout):
+        deadline = float("inf") if timeout is None else self.t + timeout
+        self.wakeups += 1
+        if self._events and self._events[0][0] <= deadline:
+            # Whatever the event changes notifies the waiter in real life
+            self._run_next()
+        else:
+            self._advance(deadline)
+
+    def sleep(self, seconds):
+        deadline = self.t + seconds
+        while self._events and self._events[0][0] <= deadline:
+            self._run_next()
+        self._advance(deadline)
+
+    def _run_next(self):
+        t, _, fn, args = heapq.heappop(self._events)
+        self._advance(max(self.t, t))
+        fn(*args)
+
+    def _advance(self, t):
+        if self.until is not None and t >= self.until:
+            self.t = self.until
+            raise SimulationDone()
+        if t == float("inf"):
+            raise SimulationDone()
+        self.t = t
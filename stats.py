@@ -0,0 +1,180 @@
+"""Durable order statistics in per-minute buckets.
+
+StatsStore is an event sink (see events.py): order events are counted into
+in-memory array-backed minute buckets on the event writer thread, and a
+flusher thread adds them to a local SQLite database every `flush_seconds`.
+A crash loses at most one flush window; the press path never touches disk.
+
+    store = StatsStore("auto_order_stats.sqlite3")
+    store.orders_by("hour", since=time.time() - 86400)
+"""
+import sqlite3
+import threading
+from array import array
+
+FLUSH_SECONDS = 10.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS order_minutes (
+    minute INTEGER NOT NULL,   -- Unix time // 60
+    target TEXT NOT NULL,      -- window title
+    mode TEXT NOT NULL,
+    orders INTEGER NOT NULL,
+    PRIMARY KEY (minute, target, mode)
+) WITHOUT ROWID
+"""
+
+# SQLite strftime formats for the rollup periods (local time)
+PERIODS = {"minute": "%Y-%m-%d %H:%M", "hour": "%Y-%m-%d %H:00", "day": "%Y-%m-%d"}
+
+
+class StatsStore:
+    """Per-minute order counts per (target, mode), persisted in batches."""
+
+    def __init__(self, path, title_of=None, flush_seconds=FLUSH_SECONDS):
+        self.path = path
+        self.title_of = title_of  # hwnd -> title, for events without one
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        self._base = None  # minute of index 0 in the pending arrays
+        self._pending = {}  # (target, mode) -> array of unflushed orders per minute
+        self._db_lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(_SCHEMA)
+        self._db.commit()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self._thread.start()
+
+    # ---------- Sink interface ----------
+    def write(self, batch):
+        with self._lock:
+            for event in batch:
+                if event.kind != "order":
+                    continue
+                f = event.fields
+                title = f.get("title")
+                if not title:
+                    title = self.title_of(f["hwnd"]) if self.title_of else str(f["hwnd"])
+                self._add(int(event.ts // 60), title, f["mode"])
+
+    def flush(self):
+        pass  # the flusher thread owns disk writes
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=5.0)
+        self.commit()
+        with self._db_lock:
+            self._db.close()
+
+    def record(self, ts, target, mode, n=1):
+        """Count `n` orders at Unix time `ts` directly (without an event)."""
+        with self._lock:
+            self._add(int(ts // 60), target, mode, n)
+
+    def _add(self, minute, target, mode, n=1):
+        if self._base is None:
+            self._base = minute
+        elif minute < self._base:
+            # Clock went backwards: shift every bucket to the new base
+            shift = self._base - minute
+            for key, buckets in self._pending.items():
+                self._pending[key] = array("L", bytes(buckets.itemsize * shift)) + buckets
+            self._base = minute
+        i = minute - self._base
+        buckets = self._pending.get((target, mode))
+        if buckets is None:
+            buckets = self._pending[(target, mode)] = array("L")
+        if i >= len(buckets):
+            buckets.frombytes(bytes(buckets.itemsize * (i + 1 - len(buckets))))
+        buckets[i] += n
+
+    # ---------- Persistence ----------
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_seconds):
+            try:
+                self.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️ Could not save order stats: {e}")
+
+    def commit(self):
+        """Add pending buckets to the database now; on sqlite3.Error they stay pending."""
+        with self._lock:
+            pending, base = self._pending, self._base
+            self._pending, self._base = {}, None
+        if not pending:
+            return
+        rows = [
+            (base + i, target, mode, n)
+            for (target, mode), buckets in pending.items()
+            for i, n in enumerate(buckets) if n
+        ]
+        with self._db_lock:
+            try:
+                self._db.executemany(
+                    "INSERT INTO order_minutes (minute, target, mode, orders) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (minute, target, mode) DO UPDATE SET orders = orders + excluded.orders",
+                    rows,
+                )
+                self._db.commit()
+            except sqlite3.Error:
+                # e.g. "database is locked" while the other front end writes: keep the counts for next time
+                self._db.rollback()
+                with self._lock:
+                    for minute, target, mode, n in rows:
+                        self._add(minute, target, mode, n)
+                raise
+
+    # ---------- Queries ----------
+    def orders_by(self, period="hour", since=None, until=None, mode=None, target=None):
+        """[(period label, target, mode, orders)] rolled up per minute / hour / day (local time)."""
+        if period not in PERIODS:
+            raise ValueError(f"Unknown period {period!r} (choose from {', '.join(PERIODS)})")
+        where, params = self._filters(since, until, mode, target)
+        sql = (
+            f"SELECT strftime('{PERIODS[period]}', minute * 60, 'unixepoch', 'localtime') AS p, target, mode, "
+            f"SUM(orders) FROM order_minutes {where} GROUP BY p, target, mode ORDER BY p, target, mode"
+        )
+        self.commit()
+        with self._db_lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def totals(self, since=None, until=None, mode=None, target=None):
+        """{mode: orders} over the given window."""
+        where, params = self._filters(since, until, mode, target)
+        self.commit()
+        with self._db_lock:
+            rows = self._db.execute(
+                f"SELECT mode, SUM(orders) FROM order_minutes {where} GROUP BY mode ORDER BY mode", params,
+            ).fetchall()
+        return dict(rows)
+
+    @staticmethod
+    def _filters(since, until, mode, target):
+        clauses, params = [], []
+        if since is not None:
+            clauses.append("minute >= ?")
+            params.append(int(since // 60))
+        if until is not None:
+            clauses.append("minute < ?")
+            params.append(int(until // 60))
+        if mode is not None:
+            clauses.append("mode = ?")
+            params.append(mode)
+        if target is not None:
+            clauses.append("target = ?")
+            params.append(target)
+        return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def format_report(rows):
+    """Plain-text table for orders_by() results."""
+    if not rows:
+        return "No orders recorded."
+    width = max(len(target) for _, target, _, _ in rows)
+    lines = [f"{'period':<16}  {'target':<{width}}  {'mode':<10}  {'orders':>7}"]
+    lines += [f"{p:<16}  {target:<{width}}  {mode:<10}  {n:>7}" for p, target, mode, n in rows]
+    return "\n".join(lines)
@@ -0,0 +1,102 @@
+"""Focus handling on FakeFocusProvider: tracking, missing windows, waiting and skipping."""
+from simulation import Simulation
+from window_focus import FocusTracker, FakeFocusProvider
+
+
+class GoneWindowProvider(FakeFocusProvider):
+    """Title reads fail for windows that no longer exist."""
+
+    def window_title(self, hwnd):
+        if hwnd not in self.titles:
+            raise OSError("invalid window handle")
+        return super().window_title(hwnd)
+
+
+def _record(sim):
+    seen = []
+    sim.engine.events.add_listener(seen.append)
+    return seen
+
+
+def test_tracker_follows_focus_changes():
+    provider = FakeFocusProvider(foreground=1, titles={1: "CPJ 1", 2: "CPJ 2"})
+    tracker = FocusTracker(provider).start()
+    changes = []
+    tracker.add_listener(changes.append)
+    provider.focus(2)
+    assert tracker.foreground == 2
+    assert tracker.is_focused(2) and not tracker.is_focused(1)
+    assert changes == [2]
+    provider.titles[2] = "CPJ 2 - loading"
+    provider.focus(1)
+    provider.focus(2)
+    assert tracker.title(2) == "CPJ 2 - loading"  # re-read when the window gains focus
+
+
+def test_titles_are_cached_between_focus_changes():
+    provider = FakeFocusProvider(foreground=1, titles={1: "CPJ 1"})
+    tracker = FocusTracker(provider).start()
+    reads = provider.title_reads
+    for _ in range(10):
+        assert tracker.title(1) == "CPJ 1"
+    assert provider.title_reads - reads <= 1
+
+
+def test_missing_window():
+    provider = GoneWindowProvider(foreground=1, titles={1: "CPJ 1"})
+    tracker = FocusTracker(provider).start()
+    assert tracker.find_windows("CPJ 9") == []
+    assert tracker.title(42) == "(unknown)"
+    assert not tracker.is_focused(None)
+    provider.focus(None)  # e.g. the desktop or a closing window
+    assert tracker.foreground is None
+
+
+def test_orders_wait_while_target_is_in_background():
+    sim = Simulation(windows=("CPJ 1", "CPJ 2"), interval=1.0)
+    seen = _record(sim)
+    sim.add_targets("coffee", hwnds=[1])
+    sim.at(10.5, sim.focus_window, 2)
+    sim.at(20.5, sim.focus_window, 1)
+    sim.start().run(30)
+    sim.engine.events.close()
+    times = sim.order_times()
+    assert not [t for t in times if 10.5 < t < 20.5]
+    assert [t for t in times if t > 20.5]  # resumes once the window is back
+    waiting = [e for e in seen if e.kind == "waiting_focus"]
+    assert [e.fields["hwnd"] for e in waiting] == [1]
+
+
+def test_missing_target_gets_no_orders():
+    sim = Simulation(windows=("CPJ 1",), interval=1.0)
+    sim.add_targets("coffee")
+    sim.engine.set_target(7)  # a window that is gone; it never becomes the foreground
+    sim.engine.set_mode("coffee", 7)
+    sim.start().run(10)
+    assert sim.engine.snapshot().targets[1].counts["coffee"] == 0
+    assert sim.engine.snapshot().targets[0].counts["coffee"] > 0
+
+
+def test_switching_skips_window_that_will_not_come_forward():
+    sim = Simulation(windows=("CPJ 1", "CPJ 2"), interval=1.0)
+    sim.provider.activate = lambda hwnd: None  # the foreground window refuses to give up focus
+    seen = _record(sim)
+    sim.add_targets("coffee")
+    sim.engine.set_switch_focus(True)
+    sim.start().run(10)
+    sim.engine.events.close()
+    counts = {t.hwnd: t.counts["coffee"] for t in sim.engine.snapshot().targets}
+    assert counts[1] > 0 and counts[2] == 0
+    skipped = [e for e in seen if e.kind == "skipped"]
+    assert skipped and all(e.fields["hwnd"] == 2 and e.fields["reason"] == "could not switch" for e in skipped)
+    # A skip uses up the slot instead of retrying in a loop: about one attempt per interval
+    assert len(skipped) <= 11
+
+
+def test_switching_brings_each_target_forward():
+    sim = Simulation(windows=("CPJ 1", "CPJ 2"), interval=1.0)
+    sim.add_targets("coffee")
+    sim.engine.set_switch_focus(True)
+    sim.start().run(10)
+    counts = {t.hwnd: t.counts["coffee"] for t in sim.engine.snapshot().targets}
+    assert counts[1] >= 9 and counts[2] >= 9
@@ -0,0 +1,34 @@
+"""Recipe compilation: schedules and validation of recipes.json."""
+import json
+
+import pytest
+
+from recipes import RecipeRegistry, compile_recipe
+
+
+def test_every_and_offset_build_the_cycle():
+    recipe = compile_recipe({"name": "refill", "steps": [
+        {"key": "e"}, {"key": "q", "every": 3, "offset": 1}, {"key": "enter", "repeat": 2},
+    ]})
+    keys = ["".join(step.key[0] for step in recipe.actions(n)) for n in range(6)]
+    assert keys == ["eee", "eqee", "eee", "eee", "eqee", "eee"]
+    assert recipe.actions(2)[-1].gap == 0.0
+
+
+@pytest.mark.parametrize("key", ["entr", "F13", "page up"])
+def test_unsupported_key_is_rejected(key):
+    with pytest.raises(ValueError, match="unsupported key"):
+        compile_recipe({"name": "typo", "steps": [{"key": "e"}, {"key": key}]})
+
+
+def test_named_keys_are_accepted():
+    recipe = compile_recipe({"name": "menu", "steps": [{"key": k} for k in ("Enter", "esc", "up", "space")]})
+    assert len(recipe.actions(0)) == 4
+
+
+def test_bad_key_in_file_falls_back_to_builtins(tmp_path, capsys):
+    path = tmp_path / "recipes.json"
+    path.write_text(json.dumps({"recipes": [{"name": "tea", "steps": [{"key": "e"}, {"key": "tee"}]}]}))
+    registry = RecipeRegistry.load(str(path))
+    assert registry.names() == ("coffee", "pizza")
+    assert "unsupported key 'tee'" in capsys.readouterr().out
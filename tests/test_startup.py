@@ -0,0 +1,56 @@
+"""Startup cost: `main.py --help` and `import main` in a fresh interpreter stay light."""
+import os
+import sys
+import json
+import time
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules only the GUI, screen checks or history need; importing them at startup costs 100+ ms
+HEAVY_MODULES = ("numpy", "tkinter", "sqlite3", "verify", "PIL", "mss", "pyautogui", "interactive", "stats")
+# Generous for a slow CI machine; a fresh interpreter plus main takes well under 0.2 s on a desktop
+HELP_BUDGET_SECONDS = 1.5
+IMPORT_BUDGET_SECONDS = 0.5
+
+PROBE = """
+import sys, json, runpy
+sys.argv = ["main.py"] + sys.argv[1:]
+try:
+    {run}
+except SystemExit:
+    pass
+print(json.dumps(sorted(m for m in {heavy!r} if m in sys.modules)))
+"""
+
+
+def _heavy_imports(run, *args):
+    out = subprocess.run([sys.executable, "-c", PROBE.format(run=run, heavy=HEAVY_MODULES), *args], cwd=ROOT,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.splitlines()[-1])
+
+
+def test_help_imports_nothing_heavy():
+    assert _heavy_imports("runpy.run_path('main.py', run_name='__main__')", "--help") == []
+
+
+def test_import_main_imports_nothing_heavy():
+    assert _heavy_imports("import main") == []
+
+
+def test_help_within_budget():
+    best = float("inf")
+    for _ in range(3):  # best of three, so one slow run on a busy machine doesn't fail it
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(ROOT, "main.py"), "--help"], cwd=ROOT,
+                       capture_output=True, check=True)
+        best = min(best, time.perf_counter() - t0)
+    assert best < HELP_BUDGET_SECONDS
+
+
+def test_import_main_within_budget():
+    err = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=ROOT,
+                         capture_output=True, text=True, check=True).stderr
+    rows = [line.split("|") for line in err.splitlines() if line.startswith("import time:")][1:]
+    cumulative = {name.strip(): int(us) / 1e6 for _, us, name in rows}
+    assert cumulative["main"] < IMPORT_BUDGET_SECONDS
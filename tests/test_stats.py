@@ -0,0 +1,50 @@
+"""StatsStore: minute buckets survive a failed write."""
+import sqlite3
+
+import pytest
+
+from stats import StatsStore
+
+T0 = 1_700_000_000.0  # any Unix time; buckets are ts // 60
+
+
+class LockedDb:
+    """Stands in for the connection while another process holds the write lock."""
+
+    def __init__(self, db):
+        self.db = db
+        self.rollbacks = 0
+
+    def executemany(self, *_args):
+        raise sqlite3.OperationalError("database is locked")
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.db.rollback()
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = StatsStore(str(tmp_path / "stats.sqlite3"), flush_seconds=3600)
+    yield store
+    store.close()
+
+
+def test_failed_commit_keeps_pending_counts(store):
+    store.record(T0, "CPJ 1", "coffee", 3)
+    store.record(T0 + 60, "CPJ 1", "pizza")
+    db, store._db = store._db, LockedDb(store._db)
+    with pytest.raises(sqlite3.OperationalError):
+        store.commit()
+    assert store._db.rollbacks == 1
+    store.record(T0 + 120, "CPJ 1", "coffee")  # counted while the database was busy
+    store._db = db
+    store.commit()
+    assert store.totals() == {"coffee": 4, "pizza": 1}
+
+
+def test_commit_adds_to_stored_minutes(store):
+    store.record(T0, "CPJ 1", "coffee", 2)
+    store.commit()
+    store.record(T0, "CPJ 1", "coffee")
+    assert store.totals() == {"coffee": 3}
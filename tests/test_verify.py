@@ -0,0 +1,79 @@
+"""Order checks against fixture screenshots (no screen capture needed).
+
+verify_screen.png is a 64x48 screenshot with an 8x8 badge at (20, 12);
+verify_badge.png is the reference patch, with its top two rows (16 of 64
+pixels) 10 brighter in red than on the screen.
+"""
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from verify import VerifySpec, OrderVerifier, ImageGrabber, bgra_to_rgb, compile_spec, match_fraction  # noqa: E402
+from window_focus import FocusTracker, FakeFocusProvider  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+REGION = (20, 12, 8, 8)
+OFF_BY = 10  # red difference in the badge's top two rows
+DIFFERING = 16 / 64
+
+
+@pytest.fixture
+def images():
+    pytest.importorskip("PIL")
+    from verify import load_image
+    return tuple(load_image(os.path.join(FIXTURES, name)) for name in ("verify_screen.png", "verify_badge.png"))
+
+
+def _verifier(screen, reference, tolerance, min_match, origin=(0, 0)):
+    focus = FocusTracker(FakeFocusProvider(foreground=1, origins={1: origin})).start()
+    spec = VerifySpec(REGION, reference, 0.0, tolerance, min_match)
+    return OrderVerifier({"coffee": spec}, focus, grabber=ImageGrabber(screen))
+
+
+def test_fixture_reference_loads_for_region():
+    pytest.importorskip("PIL")
+    spec = compile_spec({"region": list(REGION), "reference": "verify_badge.png"}, base_dir=FIXTURES)
+    assert spec.reference.shape == (8, 8, 3)
+    assert spec.reference.dtype == np.uint8
+
+
+def test_tolerance_boundary(images):
+    screen, reference = images
+    x, y, w, h = REGION
+    patch = ImageGrabber(screen).grab(x, y, w, h)
+    assert match_fraction(patch, reference, OFF_BY) == 1.0
+    assert match_fraction(patch, reference, OFF_BY - 1) == 1.0 - DIFFERING
+
+
+def test_min_match_boundary(images):
+    screen, reference = images
+    at_boundary = _verifier(screen, reference, OFF_BY - 1, 1.0 - DIFFERING).check(1, "coffee")
+    assert at_boundary.confirmed
+    assert at_boundary.match == 1.0 - DIFFERING
+    assert not _verifier(screen, reference, OFF_BY - 1, 1.0 - DIFFERING + 0.01).check(1, "coffee").confirmed
+
+
+def test_region_follows_window_origin(images):
+    screen, reference = images
+    assert _verifier(screen, reference, OFF_BY, 1.0).check(1, "coffee").confirmed
+    # The same region of a window whose client area starts 4 px further right misses the badge
+    moved = _verifier(screen, reference, OFF_BY, 0.9, origin=(4, 0)).check(1, "coffee")
+    assert not moved.confirmed
+    assert moved.match < 0.9
+
+
+def test_region_off_screen_is_unconfirmed(images):
+    screen, reference = images
+    check = _verifier(screen, reference, OFF_BY, 0.0, origin=(60, 0)).check(1, "coffee")
+    assert check.match == 0.0
+
+
+def test_bgra_capture_converts_to_rgb():
+    rgb = np.arange(2 * 3 * 3, dtype=np.uint8).reshape(2, 3, 3)
+    bgra = np.concatenate([rgb[:, :, ::-1], np.full((2, 3, 1), 255, np.uint8)], axis=2)
+    converted = bgra_to_rgb(bgra)
+    assert converted.shape == (2, 3, 3)
+    assert np.array_equal(converted, rgb)
+    assert match_fraction(converted, rgb, 0) == 1.0
@@ -0,0 +1,161 @@
+"""Watchdog: stalls on a backend that hangs on purpose, restarts, and giving up."""
+import time
+import threading
+
+import pytest
+
+from engine import Engine, MAX_IDLE_RESTARTS, MAX_SEND_FAILURES
+from events import EventLog
+from input_backend import RecordingBackend
+from recipes import compile_recipe
+from scheduler import SystemClock
+from simulation import Simulation
+from window_focus import FocusTracker, FakeFocusProvider
+
+BUDGET = 0.2  # short stall budget so each stall costs a fraction of a second
+INTERVAL = 0.02
+
+
+class HangingBackend(RecordingBackend):
+    """Blocks in send() on the chosen call numbers (all of them with hang_at=None)."""
+
+    name = "hanging"
+
+    def __init__(self, hang_at=None):
+        super().__init__(time.time)
+        self.hang_at = hang_at
+        self.calls = 0
+        self.hung = []  # time.time() each hang began
+        self.release = threading.Event()
+
+    def send(self, steps):
+        self.calls += 1
+        if self.hang_at is None or self.calls in self.hang_at:
+            self.hung.append(time.time())
+            self.release.wait()
+        super().send(steps)
+
+
+class FailingBackend(RecordingBackend):
+    """Raises in send() for the first `failures` calls."""
+
+    def __init__(self, clock, failures=None):
+        super().__init__(clock)
+        self.failures = failures
+        self.calls = 0
+
+    def send(self, steps):
+        self.calls += 1
+        if self.failures is None or self.calls <= self.failures:
+            raise OSError("SendInput blocked")
+        super().send(steps)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+@pytest.fixture
+def run_engine():
+    """Start a real-time engine on `backend`; returns (engine, events seen)."""
+    started = []
+
+    def start(backend, recipe=None):
+        focus = FocusTracker(FakeFocusProvider(foreground=1)).start()
+        events = EventLog()
+        seen = []
+        events.add_listener(seen.append)
+        engine = Engine(backend, focus, interval=INTERVAL, events=events, clock=SystemClock("balanced"),
+                        stall_budget=BUDGET)
+        if recipe is not None:
+            engine.add_recipe(recipe)
+        engine.set_target(1)
+        engine.set_mode(recipe.name if recipe is not None else "coffee")
+        engine.start()
+        started.append((engine, backend))
+        return engine, seen
+
+    yield start
+    for engine, backend in started:
+        engine.pause()
+        backend.release.set()
+        engine.watchdog.stop()
+        engine.events.close()
+
+
+def kinds(seen, kind):
+    return [e for e in list(seen) if e.kind == kind]
+
+
+def test_stall_detected_within_budget(run_engine):
+    backend = HangingBackend(hang_at={3})
+    engine, seen = run_engine(backend)
+    assert wait_for(lambda: kinds(seen, "stalled"))
+    stalled = kinds(seen, "stalled")[0]
+    assert stalled.fields["phase"] == "keys"
+    # The send may take its scheduled time plus the budget; the watchdog must notice within one more budget
+    late = stalled.ts - backend.hung[0] - engine.recipes["coffee"].duration(2) - BUDGET
+    assert 0 <= late <= BUDGET
+
+
+def test_restart_follows_stall_and_keeps_counts(run_engine):
+    backend = HangingBackend(hang_at={3})
+    engine, seen = run_engine(backend)
+    assert wait_for(lambda: kinds(seen, "worker_restarted"))
+    assert [e.kind for e in seen if e.kind in ("stalled", "worker_restarted")][:2] == ["stalled", "worker_restarted"]
+    assert wait_for(lambda: len(backend.sent) >= 10)
+    engine.pause()
+    time.sleep(INTERVAL * 3)
+    # The two orders before the hang count with the ones after it; the hung one never went out
+    assert sum(engine.totals().values()) == len(backend.sent)
+    assert engine.snapshot().health.stalls == 1
+
+
+def test_restarts_keep_recipe_cycle(run_engine):
+    recipe = compile_recipe({"name": "refill", "steps": [{"key": "e"}, {"key": "q", "every": 3}]})
+    backend = HangingBackend(hang_at={5})
+    engine, seen = run_engine(backend, recipe)
+    assert wait_for(lambda: len(backend.sent) >= 9)
+    engine.pause()
+    keys = ["".join(step.key for step in steps) for _, steps in backend.sent[:9]]
+    assert keys == ["eq", "e", "e"] * 3
+
+
+def test_halts_after_idle_restarts(run_engine):
+    backend = HangingBackend()  # every send hangs
+    engine, seen = run_engine(backend)
+    assert wait_for(lambda: engine.paused)
+    health = engine.snapshot().health
+    assert health.halted
+    assert health.stalls == MAX_IDLE_RESTARTS
+    assert wait_for(lambda: kinds(seen, "error"))
+    assert len(kinds(seen, "stalled")) == MAX_IDLE_RESTARTS
+    engine.start()
+    assert not engine.snapshot().health.halted
+
+
+def test_pauses_after_send_failures():
+    sim = Simulation(interval=1.0, backend=lambda clock: FailingBackend(clock))
+    seen = []
+    sim.engine.events.add_listener(seen.append)
+    sim.add_targets("coffee").start().run(60)
+    sim.engine.events.close()
+    assert sim.engine.paused
+    assert sim.backend.calls == MAX_SEND_FAILURES
+    assert sum(sim.engine.totals().values()) == 0
+    skipped = kinds(seen, "skipped")
+    assert len(skipped) == MAX_SEND_FAILURES
+    assert all(e.fields["reason"].startswith("keys failed") for e in skipped)
+    assert kinds(seen, "error")
+
+
+def test_send_failure_streak_resets_on_success():
+    sim = Simulation(interval=1.0, backend=lambda clock: FailingBackend(clock, failures=MAX_SEND_FAILURES - 1))
+    sim.add_targets("coffee").start().run(60)
+    assert not sim.engine.paused
+    assert sim.engine.totals()["coffee"] > 0
@@ -0,0 +1,218 @@
+"""Closed-loop order confirmation from a small screen region.
+
+A recipe in recipes.json can carry a "verify" block::
+
+    "verify": {
+        "region": [x, y, width, height],   # relative to the game window's client area
+        "reference": "refs/coffee.png",    # what the region looks like when the order went through
+        "delay": 0.15,                     # seconds to give the game before sampling
+        "tolerance": 24,                   # per-channel difference still counted as a match
+        "min_match": 0.9                   # fraction of matching pixels needed to confirm
+    }
+
+After each order the verifier grabs only that region and compares it with
+the reference patch in one vectorised NumPy operation. NumPy (and mss or
+Pillow for the capture) are optional and only imported when a recipe asks
+for verification. ImageGrabber crops regions out of saved screenshots, so
+the comparison can be checked offline against fixture images.
+"""
+import os
+import time
+import threading
+from queue import SimpleQueue
+from collections import namedtuple
+
+from recipes import RECIPES_PATH
+
+# One recipe's compiled check; `reference` is an (h, w, 3) uint8 array
+VerifySpec = namedtuple("VerifySpec", ["region", "reference", "delay", "tolerance", "min_match"])
+# Outcome of one check
+Check = namedtuple("Check", ["confirmed", "match", "seconds"])
+
+DEFAULT_VERIFY_DELAY = 0.15
+DEFAULT_TOLERANCE = 24
+DEFAULT_MIN_MATCH = 0.9
+
+
+def load_image(path):
+    """Load an image as an (h, w, 3) uint8 array (.npy with NumPy, anything else with Pillow)."""
+    import numpy as np
+    if path.endswith(".npy"):
+        image = np.load(path)
+    else:
+        from PIL import Image
+        with Image.open(path) as img:
+            image = np.asarray(img.convert("RGB"))
+    if image.ndim != 3 or image.shape[2] < 3:
+        raise ValueError(f"{path}: expected an RGB image, got shape {image.shape}")
+    return np.ascontiguousarray(image[:, :, :3], dtype=np.uint8)
+
+
+def compile_spec(spec, base_dir=os.path.dirname(RECIPES_PATH)):
+    """Validate a recipe's "verify" dict and load its reference patch."""
+    region = spec.get("region")
+    if not (isinstance(region, (list, tuple)) and len(region) == 4):
+        raise ValueError("'verify.region' must be [x, y, width, height]")
+    region = tuple(int(v) for v in region)
+    if region[2] <= 0 or region[3] <= 0:
+        raise ValueError("'verify.region' needs a positive width and height")
+    reference = spec.get("reference")
+    if not isinstance(reference, str) or not reference:
+        raise ValueError("'verify.reference' must be an image path")
+    reference = load_image(os.path.join(base_dir, reference))
+    if reference.shape[:2] != (region[3], region[2]):
+        raise ValueError(
+            f"reference is {reference.shape[1]}x{reference.shape[0]}, region is {region[2]}x{region[3]}"
+        )
+    return VerifySpec(
+        region,
+        reference,
+        float(spec.get("delay", DEFAULT_VERIFY_DELAY)),
+        int(spec.get("tolerance", DEFAULT_TOLERANCE)),
+        float(spec.get("min_match", DEFAULT_MIN_MATCH)),
+    )
+
+
+def match_fraction(patch, reference, tolerance):
+    """Fraction of pixels whose channels all lie within `tolerance` of the reference."""
+    import numpy as np
+    diff = np.abs(patch.astype(np.int16) - reference.astype(np.int16))
+    return float(np.count_nonzero(diff.max(axis=2) <= tolerance)) / (diff.shape[0] * diff.shape[1])
+
+
+# ======================= Grabbers =======================
+def bgra_to_rgb(pixels):
+    """(h, w, 4) BGRA capture (mss, Windows DIBs) -> (h, w, 3) RGB view."""
+    import numpy as np
+    return np.asarray(pixels)[:, :, 2::-1]
+
+
+class ScreenGrabber:
+    """Captures screen regions with mss (fast, any OS), or Pillow's ImageGrab."""
+
+    def __init__(self):
+        self._local = threading.local()  # mss handles are per thread
+
+    def grab(self, left, top, width, height):
+        import numpy as np
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            try:
+                import mss
+                sct = self._local.sct = mss.mss()
+            except ImportError:
+                sct = self._local.sct = False
+        if sct:
+            shot = sct.grab({"left": left, "top": top, "width": width, "height": height})
+            return bgra_to_rgb(shot)
+        from PIL import ImageGrab
+        img = ImageGrab.grab(bbox=(left, top, left + width, top + height))
+        return np.asarray(img.convert("RGB"))
+
+
+class ImageGrabber:
+    """Crops regions out of a fixed screenshot (for offline checks and fixtures)."""
+
+    def __init__(self, image):
+        self.set_image(image)
+
+    def set_image(self, image):
+        self.image = load_image(image) if isinstance(image, str) else image
+
+    def grab(self, left, top, width, height):
+        return self.image[top:top + height, left:left + width]
+
+
+# ======================= Verifier =======================
+class OrderVerifier:
+    """Confirms orders on a background thread, one region grab per order.
+
+    The engine calls submit() right after sending an order; that is a queue
+    append. The verifier thread waits out the recipe's delay, samples the
+    region and counts the order as confirmed or unconfirmed.
+    """
+
+    def __init__(self, specs, focus, grabber=None, events=None, metrics=None):
+        self.specs = dict(specs)  # mode -> VerifySpec
+        self.focus = focus
+        self.grabber = grabber if grabber is not None else ScreenGrabber()
+        self.events = events
+        self.metrics = metrics
+        self.confirmed = 0
+        self.unconfirmed = 0
+        self._listeners = []
+        self._queue = SimpleQueue()
+        self._thread = None
+
+    @classmethod
+    def from_recipes(cls, recipes, focus, **kwargs):
+        """Build a verifier for every recipe with a "verify" block; None if there are none.
+
+        Raises ImportError if verification is configured but NumPy is missing.
+        """
+        specs = {}
+        for recipe in recipes:
+            if recipe.verify:
+                try:
+                    specs[recipe.name] = compile_spec(recipe.verify)
+                except (OSError, ValueError) as e:
+                    print(f"⚠️ Recipe {recipe.name!r}: verification disabled: {e}")
+        return cls(specs, focus, **kwargs) if specs else None
+
+    def add_listener(self, fn):
+        """Call fn(hwnd, mode, confirmed) after every check (on the verifier thread)."""
+        self._listeners.append(fn)
+
+    def counts(self):
+        return self.confirmed, self.unconfirmed
+
+    def reset(self):
+        self.confirmed = self.unconfirmed = 0
+
+    def submit(self, hwnd, mode, sent_at):
+        """Queue a check for an order sent at `sent_at` (time.perf_counter())."""
+        if mode not in self.specs:
+            return
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        self._queue.put((hwnd, mode, sent_at))
+
+    def check(self, hwnd, mode):
+        """Sample the recipe's region of `hwnd` now and compare it with the reference."""
+        spec = self.specs[mode]
+        t0 = time.perf_counter()
+        x, y, w, h = spec.region
+        ox, oy = self.focus.client_origin(hwnd)
+        patch = self.grabber.grab(ox + x, oy + y, w, h)
+        if patch.shape[:2] != spec.reference.shape[:2]:
+            match = 0.0  # region is (partly) off screen
+        else:
+            match = match_fraction(patch, spec.reference, spec.tolerance)
+        return Check(match >= spec.min_match, match, time.perf_counter() - t0)
+
+    def _run(self):
+        while True:
+            hwnd, mode, sent_at = self._queue.get()
+            delay = sent_at + self.specs[mode].delay - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                result = self.check(hwnd, mode)
+            except Exception as e:
+                result = Check(False, 0.0, 0.0)
+                if self.events is not None:
+                    self.events.emit("error", hwnd=hwnd, message=f"Order check failed: {e}")
+            if result.confirmed:
+                self.confirmed += 1
+            else:
+                self.unconfirmed += 1
+            if self.metrics is not None:
+                self.metrics.inc("confirmed" if result.confirmed else "unconfirmed")
+                if self.metrics.enabled:
+                    self.metrics["verify_check"].record(result.seconds)
+            for fn in self._listeners:
+                fn(hwnd, mode, result.confirmed)
+            if self.events is not None:
+                self.events.emit("order_confirmed" if result.confirmed else "order_unconfirmed",
+                                 hwnd=hwnd, mode=mode, match=round(result.match, 3))
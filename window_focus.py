@@ -0,0 +1,244 @@
+import threading
+
+
+class FocusTracker:
+    """Tracks the foreground window from pushed focus-change events.
+
+    `foreground` is updated by the provider's event hook, so readers never
+    call into the OS. Listeners are called with the new HWND on every
+    change (on the provider's thread). Window titles are cached and only
+    re-read when a window gains focus.
+    """
+
+    def __init__(self, provider):
+        self.provider = provider
+        self.foreground = None
+        self._titles = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.foreground = self.provider.get_foreground()
+        self.provider.start(self._on_focus)
+        return self
+
+    def stop(self):
+        self.provider.stop()
+
+    def add_listener(self, fn):
+        with self._lock:
+            self._listeners.append(fn)
+
+    def current(self):
+        """Re-read the foreground window from the OS (used for explicit picks like F9)."""
+        hwnd = self.provider.get_foreground()
+        if hwnd != self.foreground:
+            self._on_focus(hwnd)
+        return hwnd
+
+    def activate(self, hwnd):
+        """Bring a window to the foreground; True if it now has focus."""
+        self.provider.activate(hwnd)
+        return self.current() == hwnd
+
+    def find_windows(self, title):
+        """HWNDs of visible top-level windows whose title contains `title` (case-insensitive)."""
+        return self.provider.find_windows(title)
+
+    def is_focused(self, hwnd):
+        return hwnd is not None and hwnd == self.foreground
+
+    def client_origin(self, hwnd):
+        """Screen (x, y) of the window's client area, for window-relative screen regions."""
+        return self.provider.client_origin(hwnd)
+
+    def title(self, hwnd):
+        """Cached window title; '(untitled)' / '(unknown)' like the old lookup."""
+        try:
+            return self._titles[hwnd]
+        except KeyError:
+            pass
+        title = self._read_title(hwnd)
+        self._titles[hwnd] = title
+        return title
+
+    def _read_title(self, hwnd):
+        try:
+            title = self.provider.window_title(hwnd)
+            return title if title else "(untitled)"
+        except Exception:
+            return "(unknown)"
+
+    def _on_focus(self, hwnd):
+        if hwnd:
+            # Titles change (e.g. game loading screens); refresh on activation only
+            self._titles[hwnd] = self._read_title(hwnd)
+        self.foreground = hwnd
+        with self._lock:
+            listeners = list(self._listeners)
+        for fn in listeners:
+            try:
+                fn(hwnd)
+            except Exception as e:
+                print(f"Focus listener failed: {e}")
+
+
+# ======================= Win32 provider =======================
+class Win32FocusProvider:
+    """Foreground changes via SetWinEventHook(EVENT_SYSTEM_FOREGROUND).
+
+    The hook runs out-of-context on its own thread with a message loop, so
+    focus events arrive without any polling.
+    """
+
+    EVENT_SYSTEM_FOREGROUND = 0x0003
+    WINEVENT_OUTOFCONTEXT = 0x0000
+    WM_QUIT = 0x0012
+
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+        import win32gui
+
+        self._ctypes = ctypes
+        self._wintypes = wintypes
+        self._win32gui = win32gui
+        self._user32 = ctypes.WinDLL("user32", use_last_error=True)
+        self._thread = None
+        self._thread_id = None
+        self._proc = None  # keep the callback alive while hooked
+
+    def get_foreground(self):
+        return self._win32gui.GetForegroundWindow()
+
+    def window_title(self, hwnd):
+        return self._win32gui.GetWindowText(hwnd)
+
+    def client_origin(self, hwnd):
+        return self._win32gui.ClientToScreen(hwnd, (0, 0))
+
+    def find_windows(self, title):
+        needle = title.lower()
+        found = []
+
+        def visit(hwnd, _):
+            if self._win32gui.IsWindowVisible(hwnd) and needle in self._win32gui.GetWindowText(hwnd).lower():
+                found.append(hwnd)
+            return True
+
+        self._win32gui.EnumWindows(visit, None)
+        return found
+
+    def activate(self, hwnd):
+        # Windows only lets the process that got the last input steal focus;
+        # a synthetic Alt tap satisfies that rule.
+        self._user32.keybd_event(0x12, 0, 0, 0)
+        self._user32.keybd_event(0x12, 0, 0x0002, 0)
+        self._win32gui.SetForegroundWindow(hwnd)
+
+    def start(self, callback):
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(callback, ready), daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def _run(self, callback, ready):
+        ctypes = self._ctypes
+        wintypes = self._wintypes
+        user32 = self._user32
+        kernel32 = ctypes.WinDLL("kernel32")
+
+        WinEventProc = ctypes.WINFUNCTYPE(
+            None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+            wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD,
+        )
+
+        def on_event(_hook, _event, hwnd, id_object, _id_child, _thread, _time):
+            if id_object == 0:  # OBJID_WINDOW
+                callback(hwnd or None)
+
+        self._proc = WinEventProc(on_event)
+        user32.SetWinEventHook.restype = wintypes.HANDLE
+        hook = user32.SetWinEventHook(
+            self.EVENT_SYSTEM_FOREGROUND, self.EVENT_SYSTEM_FOREGROUND,
+            0, self._proc, 0, 0, self.WINEVENT_OUTOFCONTEXT,
+        )
+        self._thread_id = kernel32.GetCurrentThreadId()
+        ready.set()
+        if not hook:
+            print("⚠️ Could not install focus hook")
+            return
+
+        msg = wintypes.MSG()
+        try:
+            while user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) > 0:
+                user32.TranslateMessage(ctypes.byref(msg))
+                user32.DispatchMessageW(ctypes.byref(msg))
+        finally:
+            user32.UnhookWinEvent(hook)
+
+    def stop(self):
+        if self._thread_id is not None:
+            self._user32.PostThreadMessageW(self._thread_id, self.WM_QUIT, 0, 0)
+            self._thread_id = None
+
+
+# ======================= Fake provider =======================
+class FakeFocusProvider:
+    """Scriptable focus source for running without Windows.
+
+    Call focus(hwnd) to switch windows immediately, or play() a script of
+    (delay_seconds, hwnd) pairs on a background thread.
+    """
+
+    def __init__(self, foreground=None, titles=None, origins=None):
+        self._foreground = foreground
+        self.titles = dict(titles or {})
+        self.origins = dict(origins or {})  # hwnd -> client (x, y); default (0, 0)
+        self.title_reads = 0
+        self._callback = None
+        self._stop = threading.Event()
+
+    def get_foreground(self):
+        return self._foreground
+
+    def window_title(self, hwnd):
+        self.title_reads += 1
+        return self.titles.get(hwnd, "")
+
+    def client_origin(self, hwnd):
+        return self.origins.get(hwnd, (0, 0))
+
+    def start(self, callback):
+        self._callback = callback
+
+    def stop(self):
+        self._stop.set()
+        self._callback = None
+
+    def find_windows(self, title):
+        needle = title.lower()
+        return [hwnd for hwnd, t in self.titles.items() if needle in t.lower()]
+
+    def activate(self, hwnd):
+        self.focus(hwnd)
+
+    def focus(self, hwnd):
+        self._foreground = hwnd
+        if self._callback is not None:
+            self._callback(hwnd)
+
+    def play(self, script):
+        def run():
+            for delay, hwnd in script:
+                if self._stop.wait(delay):
+                    return
+                self.focus(hwnd)
+        t = threading.Thread(target=run, daemon=True)
+        t.start()
+        return t
+
+
+def create_tracker():
+    """Start a tracker on the Win32 provider."""
+    return FocusTracker(Win32FocusProvider()).start()